@@ -2,26 +2,33 @@ import time
 from datetime import datetime
 
 import streamlit as st
-import yfinance as yf
 
 from crewai import Crew, Process
 
-from src.agents.dollar_agent import CurrencyAgent
 from src.agents.stock_internet_agent import StockInternetAgent
-from src.tasks.dollar_tasks import CurrencyTasks
 from src.tasks.post_task import PostTasks
 from src.tasks.stock_internet_task import StockInternetTask
-from src.services.portifolio_service import PortfolioService
-from src.services.asset_service import AssetService
-from src.services.stock_service import StockService
+from src.resources import (get_analysis_crew, get_asset_service, get_dividend_service, get_llm_context_builder,
+                           get_portfolio_service, get_stock_service, get_warmup_service)
+from src.services.asset_service import CONSOLIDATED
+from src.services.market_data_service import market_data_service
 from src.entities.stock_db import StockData, StockDataRepository
-from src.entities.caixa_db import CaixaRepository
+from src.entities.collector_status import collector_heartbeat_age, load_collector_status
 from app.settings import settings_page
 
 
-portifolio = PortfolioService()
-stock_service = StockService()
-caixa_repo = CaixaRepository()
+# Segundos sem ciclo do coletor para considerá-lo inativo
+COLLECTOR_TIMEOUT = 30
+# Segundos que um rerun espera o aquecimento dos caches antes de seguir sem ele
+WARMUP_TIMEOUT = 15
+
+# O script roda a cada rerun de cada sessão: os serviços são compartilhados pelo processo
+portifolio = get_portfolio_service()
+stock_service = get_stock_service()
+dividend_service = get_dividend_service()
+# Aquece os caches em paralelo uma vez por processo (já iniciado se o servidor subiu com python -m src.serve)
+warmup = get_warmup_service()
+warmup.start()
 
 
 # Função para buscar a cotação inicial
@@ -31,32 +38,16 @@ def logo():
 
 
 def get_analise_cotacao():
-    currency_agent = CurrencyAgent()
-    currency_tasks = CurrencyTasks()
-
-    agent_analisys_instance = currency_agent.currency_analisys_agent()
-    task_analisys_instance = currency_tasks.currency_task(agent=agent_analisys_instance)
-
-    crew = Crew(
-        agents=[agent_analisys_instance],
-        tasks=[task_analisys_instance],
-        process=Process.sequential,
-        verbose=True
-    )
+    crew = get_analysis_crew().currency_crew()
     st.write_stream(stream_data(str(crew.kickoff())))
 
 
 def get_symbols_from_database():
     """Obtém a lista de símbolos cadastrados na base de dados"""
-    asset_service = AssetService()
-    assets = asset_service.load_assets()
-    return [asset["symbol"] for asset in assets] if assets else []
+    return get_asset_service().get_symbols()
 
 
 def get_dados_financeiros():
-    stock_agent = StockInternetAgent()
-    stock_tasks = StockInternetTask()
-
     # Obter símbolos dinamicamente da base
     symbols = get_symbols_from_database()
     
@@ -64,15 +55,7 @@ def get_dados_financeiros():
         st.warning("Nenhum ativo cadastrado. Adicione ativos na aba de Configurações.")
         return
 
-    agent_stock_instance = stock_agent.stock_internet_agent()
-    task_stock_instance = stock_tasks.stock_internet_task(agent=agent_stock_instance, symbols=symbols)
-
-    crew = Crew(
-        agents=[agent_stock_instance],
-        tasks=[task_stock_instance],
-        process=Process.sequential,
-        verbose=True
-    )
+    crew = get_analysis_crew().market_crew(symbols)
     
     result = crew.kickoff()
     
@@ -156,10 +139,13 @@ def get_investment_tips():
         st.warning("Nenhum ativo cadastrado. Adicione ativos na aba de Configurações.")
         return
 
-    task = stock_agent.create_cache_analysis_task(symbols=symbols)
+    # Os dados da carteira vão prontos no prompt: o agente não precisa de ferramentas
+    agent = stock_agent.cache_analyzer_agent()
+    context = get_llm_context_builder().build(symbols)
+    task = StockInternetTask().create_cache_analysis_task(symbols=symbols, agent=agent, context=context)
 
     crew = Crew(
-        agents=[stock_agent.cache_analyzer_agent()],
+        agents=[agent],
         tasks=[task],
         process=Process.sequential,
         verbose=True
@@ -172,6 +158,27 @@ def get_investment_tips():
     except Exception as e:
         st.error(f"Erro ao gerar dicas de investimento: {e}")
 
+def relatorio_analises():
+    """Gera o relatório de câmbio e mercado em segundo plano, com as análises em paralelo.
+
+    O rerun não fica bloqueado: a cada atualização verifica se o relatório ficou pronto.
+    """
+    futuro = st.session_state.get('relatorio_futuro')
+    if futuro is not None and futuro.done():
+        try:
+            st.session_state['dados_financeiros'] = futuro.result()
+        except Exception as e:
+            st.error(f"Erro ao gerar o relatório de análises: {e}")
+        del st.session_state['relatorio_futuro']
+        futuro = None
+
+    if futuro is not None:
+        st.info("Gerando o relatório de análises (câmbio e mercado em paralelo)...")
+    elif st.button("Gerar relatório de análises"):
+        st.session_state['relatorio_futuro'] = get_analysis_crew().submit_report(get_symbols_from_database())
+        st.info("Gerando o relatório de análises (câmbio e mercado em paralelo)...")
+
+
 def stream_data(cotacao):
     for word in cotacao.split(" "):
         frases = " " + word + " "
@@ -179,48 +186,80 @@ def stream_data(cotacao):
         time.sleep(0.02)
 
 
+def cotacoes_atrasadas():
+    """Cotações que perderam o prazo do último ciclo do coletor (exibidas com o último valor gravado)."""
+    atrasadas = []
+    for name in (load_collector_status() or {}).get("stale", []):
+        if name == "fx":
+            atrasadas.append("Dólar")
+        elif name.startswith("stock:"):
+            atrasadas.append(name[len("stock:"):])
+    return atrasadas
+
+
+def carregar_dados():
+    """Lê uma vez os dados exibidos pelo dashboard e guarda na sessão.
+
+    Apenas lê o banco: a coleta nos provedores é feita pelo coletor (python -m src.collector).
+    """
+    # No primeiro rerun após o boot, aproveita as leituras do aquecimento em vez de repeti-las
+    warmup.wait(WARMUP_TIMEOUT)
+
+    # Cotação do dólar gravada pelo coletor
+    cotacao, variacao = portifolio.get_cotacao()
+    st.session_state["cotacao"] = f"R${cotacao:.4f}"
+    st.session_state["variacao_dolar"] = f"{variacao:.2f}"
+    fx = market_data_service.get_fx('USDBRL')
+    st.session_state["cotacao_idade"] = fx.age_seconds if fx else None
+    st.session_state["coletor_idade"] = collector_heartbeat_age()
+    st.session_state["atrasados"] = cotacoes_atrasadas()
+    st.session_state["dolar_metrica"] = portifolio.dolar_metrica()
+
+    # Sem coletor (MARKET_DATA_MODE=live), o próprio dashboard agenda os dividendos
+    if not market_data_service.read_only:
+        dividend_service.refresh_in_background(get_symbols_from_database())
+
+    # Atualiza portfólio; os totais por conta vêm da mesma agregação exibida na tabela
+    totals = portifolio.portfolio()
+    st.session_state["evolucao_carteira"] = portifolio.evolucao_carteira()
+
+    # Caixa e valor total (incluindo o caixa) da conta escolhida ou de todas as contas
+    conta = portifolio.conta_selecionada()
+    resumo = totals.loc[conta if conta in totals.index else CONSOLIDATED]
+    st.session_state["caixa"] = f"${resumo['cash']:,.2f}"
+    st.session_state["total_value"] = f"${resumo['total_value'] + resumo['cash']:,.2f}"
+
+
 def atualizar_dados():
     """Atualiza os dados periodicamente sem usar threads."""
     while True:
-        # Atualiza cotação do dólar
-        cotacao, variacao = portifolio.get_cotacao()
-        st.session_state["cotacao"] = f"R${cotacao:.4f}"
-        st.session_state["variacao_dolar"] = f"{variacao:.2f}"
-        st.session_state["dolar_metrica"] = portifolio.dolar_metrica()
-        
-        # Atualiza dados das ações
-        symbols = get_symbols_from_database()
-        if symbols:
-            for symbol in symbols:
-                try:
-                    stock_service.update_stock_data(symbol)
-                except Exception as e:
-                    print(f"Erro ao atualizar {symbol}: {str(e)}")
-        
-        # Atualiza portfólio
-        st.session_state["portfolio"] = portifolio.portfolio()
-        
-        # Get latest CAIXA value
-        caixa = caixa_repo.get_latest_caixa()
-        if caixa:
-            st.session_state["caixa"] = f"${float(caixa.valor):,.2f}"
-        else:
-            st.session_state["caixa"] = "$0.00"
-        
-        # Calculate total value including CAIXA
-        total_value = portifolio.get_total_value()
-        if caixa:
-            total_value += float(caixa.valor)
-        st.session_state["total_value"] = f"${total_value:,.2f}"
-
+        carregar_dados()
         time.sleep(3)
         st.rerun(scope="app")
 
 
+def status_aquecimento():
+    """Estado e duração do aquecimento dos caches do processo (ver WarmupService)."""
+    status = warmup.status()
+    if status["state"] == warmup.RUNNING:
+        st.caption("Aquecendo os caches do servidor...")
+    elif status["state"] == warmup.READY:
+        falhas = f", com erro: {', '.join(status['failed'])}" if status["failed"] else ""
+        st.caption(f"Caches aquecidos em {status['duration']:.1f}s ({status['tasks']} tarefa(s){falhas})")
+
+
 def tabs():
     financeiro, configuracoes = st.tabs(['Financeiro', 'Configurações'])
 
     with financeiro:
+        coletor_idade = st.session_state.get('coletor_idade')
+        if market_data_service.read_only and (coletor_idade is None or coletor_idade > COLLECTOR_TIMEOUT):
+            st.warning("Coletor de dados inativo: as cotações não estão sendo atualizadas. "
+                       "Execute `python -m src.collector`.")
+        elif st.session_state.get('atrasados'):
+            st.caption(f"Atualização atrasada, exibindo o último valor de: {', '.join(st.session_state['atrasados'])}")
+        status_aquecimento()
+
         col1, col2, col3 = st.columns(3)
 
         with col1:
@@ -230,6 +269,9 @@ def tabs():
                 st.session_state.get('cotacao'),
                 delta=st.session_state.get('variacao_dolar', 0.00)
             )
+            idade = st.session_state.get('cotacao_idade')
+            if idade is not None:
+                st.caption(f"Atualizado há {idade:.0f}s")
 
         with col2:
             # Valor do Caixa
@@ -256,6 +298,7 @@ def tabs():
             st.write(st.session_state.get('portfolio'))
 
         # Dados financeiros
+        relatorio_analises()
         if st.session_state.get('dados_financeiros'):
             st.write(st.session_state.get('dados_financeiros'))
 
@@ -1,25 +1,201 @@
+import tempfile
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-from src.services.asset_service import AssetService
-from src.entities.caixa_db import CaixaRepository
+from src.resources import get_alert_engine, get_asset_service, get_bulk_io_service, get_caixa_repository
+from src.services.bulk_io_service import DATASETS
 from src.entities.caixa_db import CaixaModel
+from src.model.account import DEFAULT_ACCOUNT, account_of
+
+# Shared, process-wide instances (see src/resources.py)
+asset_service = get_asset_service()
+caixa_repo = get_caixa_repository()
+bulk_io_service = get_bulk_io_service()
+alert_engine = get_alert_engine()
+
+ALERT_KIND_LABELS = {
+    "Preço acima de": "price_above",
+    "Preço abaixo de": "price_below",
+    "Alta no dia (%) acima de": "move_above",
+    "Queda no dia (%) abaixo de": "move_below",
+    "Dólar acima de": "fx_above",
+    "Dólar abaixo de": "fx_below",
+    "Queda da carteira desde o pico (%)": "drawdown",
+    "Caixa acima de": "caixa_above",
+    "Caixa abaixo de": "caixa_below",
+}
+# Tipos que se referem a um ativo (os demais têm símbolo fixo)
+ASSET_ALERT_KINDS = ("price_above", "price_below", "move_above", "move_below")
+
+ASSET_TYPES = ["Ação", "ETF", "Criptomoeda", "Commodity", "Outro"]
+ASSET_FIELDS = ["account", "symbol", "name", "type", "shares", "purchase_price", "purchase_date", "notes"]
+# Quantidade e preço médio vêm das transações (ledger); na grade só o cadastro é editável
+EDITABLE_ASSET_FIELDS = ["name", "type", "purchase_date", "notes"]
+PAGE_SIZES = [25, 50, 100]
+CAIXA_PAGE_SIZE = 50
+
+def asset_grid(assets):
+    """Grade editável e paginada dos ativos.
+
+    Apenas a página atual vira DataFrame e widget, então o custo do rerun não cresce
+    com a carteira. As edições e exclusões da página são gravadas juntas, em uma única
+    escrita, quando o usuário confirma. Quantidade e preço médio são os da posição no
+    ledger e só mudam registrando transações.
+    """
+    if 'grade_ativos_versao' not in st.session_state:
+        st.session_state['grade_ativos_versao'] = 0
+
+    search_col, size_col, page_col = st.columns([3, 1, 1])
+    with search_col:
+        search = st.text_input("Buscar", placeholder="Símbolo, nome ou conta", key="busca_ativos").strip().lower()
+    filtered = [asset for asset in assets
+                if not search or search in asset["symbol"].lower() or search in asset["name"].lower()
+                or search in account_of(asset).lower()]
+    with size_col:
+        page_size = st.selectbox("Por página", PAGE_SIZES, key="tamanho_pagina_ativos")
+    pages = max(1, -(-len(filtered) // page_size))
+    with page_col:
+        page = st.number_input("Página", min_value=1, max_value=pages, value=1, step=1, key="pagina_ativos")
+
+    page_assets = filtered[(page - 1) * page_size:page * page_size]
+    positions = asset_service.ledger_service.get_positions()
+    rows = []
+    for asset in page_assets:
+        row = {**asset, "account": account_of(asset)}
+        position = positions.get((row["account"], asset["symbol"]))
+        if position:
+            row["shares"], row["purchase_price"] = position.shares, position.average_cost
+        rows.append(row)
+    df = pd.DataFrame(rows, columns=ASSET_FIELDS)
+    df["purchase_date"] = pd.to_datetime(df["purchase_date"], errors="coerce").dt.date
+    df.insert(0, "delete", False)
+
+    edited = st.data_editor(
+        df,
+        key=f"grade_ativos_{st.session_state['grade_ativos_versao']}_{search}_{page_size}_{page}",
+        hide_index=True,
+        use_container_width=True,
+        disabled=["account", "symbol", "shares", "purchase_price"],
+        column_config={
+            "delete": st.column_config.CheckboxColumn("Excluir", width="small"),
+            "account": st.column_config.TextColumn("Conta"),
+            "symbol": st.column_config.TextColumn("Símbolo"),
+            "name": st.column_config.TextColumn("Nome", required=True),
+            "type": st.column_config.SelectboxColumn("Tipo", options=ASSET_TYPES, required=True),
+            "shares": st.column_config.NumberColumn("Quantidade", format="%.4f"),
+            "purchase_price": st.column_config.NumberColumn("Preço Médio ($)", format="%.2f"),
+            "purchase_date": st.column_config.DateColumn("Data de Compra", format="DD/MM/YYYY", required=True),
+            "notes": st.column_config.TextColumn("Observações"),
+        },
+    )
+    st.caption(f"{len(filtered)} de {len(assets)} ativo(s), página {page} de {pages}. "
+               "As alterações valem para a página atual e só são gravadas ao salvar. "
+               "Quantidade e preço médio mudam pelas transações (aba Transações).")
+
+    deleted = list(edited.loc[edited["delete"], ["account", "symbol"]].itertuples(index=False, name=None))
+    changed = ((edited[EDITABLE_ASSET_FIELDS].fillna("") != df[EDITABLE_ASSET_FIELDS].fillna("")).any(axis=1)
+               & ~edited["delete"])
+    updated = []
+    for original, row, is_changed in zip(page_assets, edited.to_dict("records"), changed):
+        if not is_changed:
+            continue
+        if not row["name"] or pd.isna(row["purchase_date"]):
+            st.error(f"{row['symbol']}: Nome e Data de Compra são obrigatórios.")
+            return
+        # Quantidade e preço de compra continuam os do cadastro (ver AssetService.apply_changes)
+        updated.append({
+            **original,
+            "name": row["name"],
+            "type": row["type"],
+            "purchase_date": row["purchase_date"].strftime("%Y-%m-%d"),
+            "notes": row["notes"] or ""
+        })
+
+    if not updated and not deleted:
+        return
+    if deleted:
+        st.warning("Serão excluídos (irreversível): "
+                   + ", ".join(f"{symbol} ({account})" for account, symbol in deleted))
+    if st.button(f"Salvar Alterações ({len(updated)} editado(s), {len(deleted)} excluído(s))", type="primary",
+                 key="salvar_grade_ativos"):
+        success, message = asset_service.apply_changes(updated, deleted)
+        if success:
+            st.session_state['grade_ativos_versao'] += 1
+            st.success(message)
+            st.rerun()
+        else:
+            st.error(message)
+
+
+def caixa_history(account):
+    """Histórico do caixa de uma conta paginado por chave, com saldo diário e totais mensais calculados no banco."""
+    period = st.date_input("Período", value=(), key="periodo_caixa", format="DD/MM/YYYY")
+    start = datetime.combine(period[0], time.min) if len(period) > 0 else None
+    end = datetime.combine(period[-1], time.min) + timedelta(days=1) if len(period) > 0 else None
+
+    # Pilha de cursores das páginas visitadas; volta à primeira página quando o período muda
+    if st.session_state.get('caixa_filtro') != (start, end, account):
+        st.session_state['caixa_filtro'] = (start, end, account)
+        st.session_state['caixa_cursores'] = [None]
+    cursors = st.session_state['caixa_cursores']
+
+    rows, next_cursor = caixa_repo.get_caixa_page(CAIXA_PAGE_SIZE, before=cursors[-1], start=start, end=end,
+                                                  account=account)
+    if not rows and len(cursors) == 1:
+        st.info("Nenhum registro no histórico do Caixa.")
+        return
+
+    balance = pd.DataFrame(caixa_repo.get_caixa_aggregates('%Y-%m-%d', start, end, account),
+                           columns=["Dia", "Saldo", "Soma", "Registros"])
+    balance["Dia"] = pd.to_datetime(balance["Dia"])
+    st.line_chart(balance.set_index("Dia")["Saldo"])
+
+    monthly = pd.DataFrame(caixa_repo.get_caixa_aggregates('%Y-%m', start, end, account),
+                           columns=["Mês", "Saldo no Fim do Mês (R$)", "Soma (R$)", "Registros"])
+    st.dataframe(monthly.iloc[::-1], use_container_width=True, hide_index=True, column_config={
+        "Saldo no Fim do Mês (R$)": st.column_config.NumberColumn(format="%.2f"),
+        "Soma (R$)": st.column_config.NumberColumn(format="%.2f"),
+    })
 
-# Initialize the asset service and caixa repository
-asset_service = AssetService()
-caixa_repo = CaixaRepository()
+    df = pd.DataFrame(rows, columns=["id", "Valor (R$)", "Data"])
+    df["Data"] = pd.to_datetime(df["Data"]).dt.strftime("%d/%m/%Y %H:%M:%S")
+    df["Valor (R$)"] = df["Valor (R$)"].astype(float)
+    st.dataframe(df[["Data", "Valor (R$)"]], use_container_width=True, hide_index=True, column_config={
+        "Valor (R$)": st.column_config.NumberColumn(format="%.2f"),
+    })
+
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("◀ Mais recentes", disabled=len(cursors) == 1, key="caixa_anterior"):
+            cursors.pop()
+            st.rerun()
+    with page_col:
+        st.caption(f"Página {len(cursors)}")
+    with next_col:
+        if st.button("Mais antigos ▶", disabled=next_cursor is None, key="caixa_proxima"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+    # Add option to clear all history of the account
+    if st.button("Limpar Todo o Histórico", type="secondary"):
+        if st.checkbox("Confirmar exclusão de todo o histórico"):
+            caixa_repo.clear_history(account)
+            st.session_state['caixa_cursores'] = [None]
+            st.success("Histórico do Caixa limpo com sucesso")
+            st.rerun()
+
+
+def known_accounts():
+    """Contas com ativos ou caixa cadastrados, incluindo a conta padrão."""
+    return sorted(set(asset_service.get_accounts()) | set(caixa_repo.get_accounts()) | {DEFAULT_ACCOUNT})
 
-# State to track which asset is being edited
-if 'edit_symbol' not in st.session_state:
-    st.session_state['edit_symbol'] = None
 
 def settings_page():
     """Display the settings page with asset registration form."""
     st.title("Configurações")
     
-    # Initialize 'edit_symbol' in session state if not present
-    if 'edit_symbol' not in st.session_state:
-        st.session_state['edit_symbol'] = None
-    
     # Explanation for the settings page
     st.markdown("""
     ### Bem-vindo à Tela de Configurações
@@ -27,7 +203,7 @@ def settings_page():
     """)
     
     # Create tabs for different settings
-    asset_tab, caixa_tab, notification_tab = st.tabs(["Ativos", "Caixa", "Notificações"])
+    asset_tab, caixa_tab, bulk_tab, notification_tab = st.tabs(["Ativos", "Caixa", "Importar/Exportar", "Notificações"])
     
     with asset_tab:
         st.header("Cadastro de Ativos")
@@ -35,35 +211,10 @@ def settings_page():
         # Load existing assets
         assets = asset_service.load_assets()
         
-        # Display existing assets in a table
+        # Display existing assets in a single editable grid
         if assets:
             st.subheader("Ativos Cadastrados")
-            df = pd.DataFrame(assets)
-            
-            # Add a column for edit and delete buttons
-            if 'symbol' in df.columns:
-                # Create a unique key for each row
-                for i, row in df.iterrows():
-                    col1, col2, col3 = st.columns([4, 1, 1])
-                    with col1:
-                        st.dataframe(pd.DataFrame([row]), use_container_width=True, hide_index=True)
-                    with col2:
-                        if st.button("✏️", key=f"edit_{row['symbol']}"):
-                            st.session_state['edit_symbol'] = row['symbol']
-                    with col3:
-                        if st.button("🗑️", key=f"delete_{row['symbol']}"):
-                            success, message = asset_service.delete_asset(row['symbol'])
-                            if success:
-                                st.success(message)
-                                st.rerun()
-                            else:
-                                st.error(message)
-                # Explanation for asset deletion
-                st.markdown("""
-                **Nota:** Clique no ícone de lixeira para excluir um ativo específico. Esta ação é irreversível.
-                """)
-            else:
-                st.dataframe(df, use_container_width=True)
+            asset_grid(assets)
             
             # Add delete all functionality
             if st.button("Limpar Todos os Ativos"):
@@ -78,53 +229,32 @@ def settings_page():
             st.info("Nenhum ativo cadastrado ainda.")
         
         # Asset registration form
-        st.subheader("Adicionar ou Editar Ativo")
-        
-        # Check if an asset is being edited
-        if st.session_state['edit_symbol']:
-            asset_to_edit = next((asset for asset in assets if asset['symbol'] == st.session_state['edit_symbol']), None)
-            if asset_to_edit:
-                symbol = asset_to_edit['symbol']
-                name = asset_to_edit['name']
-                asset_type = asset_to_edit['type']
-                shares = asset_to_edit['shares']
-                purchase_price = asset_to_edit['purchase_price']
-                purchase_date = pd.to_datetime(asset_to_edit['purchase_date'])
-                notes = asset_to_edit['notes']
-            else:
-                st.session_state['edit_symbol'] = None
-                symbol = name = asset_type = notes = ""
-                shares = purchase_price = 0.0
-                purchase_date = pd.to_datetime("today")
-        else:
-            symbol = name = asset_type = notes = ""
-            shares = purchase_price = 0.0
-            purchase_date = pd.to_datetime("today")
+        st.subheader("Adicionar Ativo")
         
-        with st.form("asset_form"):
+        with st.form("asset_form", clear_on_submit=True):
             col1, col2 = st.columns(2)
             
             with col1:
-                symbol_input = st.text_input("Símbolo (ex: AAPL)", value=symbol, placeholder="AAPL", disabled=bool(st.session_state['edit_symbol']))
-                name_input = st.text_input("Nome do Ativo", value=name, placeholder="Apple Inc.")
-                asset_type_input = st.selectbox(
-                    "Tipo de Ativo",
-                    ["Ação", "ETF", "Criptomoeda", "Commodity", "Outro"],
-                    index=["Ação", "ETF", "Criptomoeda", "Commodity", "Outro"].index(asset_type) if asset_type else 0
-                )
+                symbol_input = st.text_input("Símbolo (ex: AAPL)", placeholder="AAPL")
+                name_input = st.text_input("Nome do Ativo", placeholder="Apple Inc.")
+                asset_type_input = st.selectbox("Tipo de Ativo", ASSET_TYPES)
+                account_input = st.text_input("Conta", value=DEFAULT_ACCOUNT,
+                                              help="Corretora ou carteira do ativo. Contas existentes: "
+                                                   + ", ".join(known_accounts()))
             
             with col2:
-                shares_input = st.number_input("Quantidade", value=shares, min_value=0.0, step=0.01, format="%.4f")
-                purchase_price_input = st.number_input("Preço de Compra ($)", value=purchase_price, min_value=0.0, step=0.01, format="%.2f")
-                purchase_date_input = st.date_input("Data de Compra", value=purchase_date)
+                shares_input = st.number_input("Quantidade", value=0.0, min_value=0.0, step=0.01, format="%.4f")
+                purchase_price_input = st.number_input("Preço de Compra ($)", value=0.0, min_value=0.0, step=0.01, format="%.2f")
+                purchase_date_input = st.date_input("Data de Compra", value=pd.to_datetime("today"))
             
-            notes_input = st.text_area("Observações", value=notes, placeholder="Adicione notas sobre este ativo...")
+            notes_input = st.text_area("Observações", placeholder="Adicione notas sobre este ativo...")
             
             submitted = st.form_submit_button("Salvar Ativo")
             
             if submitted:
                 if symbol_input and name_input and shares_input > 0:
-                    updated_asset = {
+                    success, message = asset_service.add_asset({
+                        "account": account_input.strip() or DEFAULT_ACCOUNT,
                         "symbol": symbol_input.upper(),
                         "name": name_input,
                         "type": asset_type_input,
@@ -132,13 +262,7 @@ def settings_page():
                         "purchase_price": purchase_price_input,
                         "purchase_date": purchase_date_input.strftime("%Y-%m-%d"),
                         "notes": notes_input
-                    }
-                    
-                    if st.session_state['edit_symbol']:
-                        success, message = asset_service.update_asset(st.session_state['edit_symbol'], updated_asset)
-                        st.session_state['edit_symbol'] = None
-                    else:
-                        success, message = asset_service.add_asset(updated_asset)
+                    })
                     
                     if success:
                         st.success(message)
@@ -147,12 +271,74 @@ def settings_page():
                         st.warning(message)
                 else:
                     st.error("Por favor, preencha todos os campos obrigatórios (Símbolo, Nome e Quantidade).")
+
+        # Trade ledger: buys, sells, fees and splits
+        if assets:
+            st.subheader("Registrar Transação")
+            st.markdown("""
+            Registre compras, vendas, taxas e desdobramentos. A quantidade e o preço médio
+            exibidos no portfólio são calculados a partir dessas transações (FIFO).
+            """)
+
+            with st.form("trade_form"):
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    trade_account, trade_symbol = st.selectbox(
+                        "Ativo", [(account_of(asset), asset['symbol']) for asset in assets],
+                        format_func=lambda key: f"{key[1]} ({key[0]})")
+                    trade_type_labels = {"Compra": "buy", "Venda": "sell", "Taxa": "fee", "Desdobramento": "split"}
+                    trade_type = st.selectbox("Tipo de Transação", list(trade_type_labels.keys()))
+                    trade_date = st.date_input("Data da Transação", value=pd.to_datetime("today"))
+
+                with col2:
+                    trade_quantity = st.number_input("Quantidade (razão no desdobramento)", min_value=0.0, step=0.01, format="%.4f")
+                    trade_price = st.number_input("Preço ($)", min_value=0.0, step=0.01, format="%.2f")
+                    trade_fees = st.number_input("Taxas ($)", min_value=0.0, step=0.01, format="%.2f")
+
+                if st.form_submit_button("Registrar Transação"):
+                    success, message = asset_service.ledger_service.register_trade(
+                        trade_symbol,
+                        trade_type_labels[trade_type],
+                        trade_quantity,
+                        trade_price,
+                        trade_date,
+                        fees=trade_fees,
+                        account=trade_account
+                    )
+                    if success:
+                        st.success(message)
+                        st.rerun()
+                    else:
+                        st.error(message)
+
+            positions = asset_service.ledger_service.get_positions()
+            if positions:
+                st.dataframe(pd.DataFrame([
+                    {
+                        "Conta": position.account,
+                        "Símbolo": position.symbol,
+                        "Quantidade": position.shares,
+                        "Preço Médio ($)": position.average_cost,
+                        "Custo Total ($)": position.cost_basis,
+                        "Lucro Realizado ($)": position.realized_pnl,
+                        "Transações": position.trade_count
+                    }
+                    for position in positions.values()
+                ]), use_container_width=True, hide_index=True)
     
     with caixa_tab:
         st.header("Configuração do Caixa")
+
+        # Cada conta tem o seu caixa; o dashboard soma o de todas
+        account_col, new_account_col = st.columns(2)
+        with account_col:
+            caixa_account = st.selectbox("Conta", known_accounts(), key="conta_caixa")
+        with new_account_col:
+            caixa_account = st.text_input("Ou uma nova conta", key="nova_conta_caixa").strip() or caixa_account
         
         # Get current CAIXA value
-        current_caixa = caixa_repo.get_latest_caixa()
+        current_caixa = caixa_repo.get_latest_caixa(caixa_account)
         current_value = float(current_caixa.valor) if current_caixa else 0.0
         
         # Create tabs for different CAIXA operations
@@ -175,7 +361,7 @@ def settings_page():
                 submitted = st.form_submit_button("Adicionar Valor ao Caixa")
                 
                 if submitted:
-                    caixa_repo.save_caixa(CaixaModel(valor=caixa_value))
+                    caixa_repo.save_caixa(CaixaModel(valor=caixa_value, account=caixa_account))
                     st.success(f"Valor de ${caixa_value:.2f} adicionado ao Caixa")
                     st.rerun()
         
@@ -197,7 +383,7 @@ def settings_page():
                 submitted = st.form_submit_button("Atualizar Valor do Caixa")
                 
                 if submitted:
-                    caixa_repo.update_caixa(caixa_value)
+                    caixa_repo.update_caixa(caixa_value, caixa_account)
                     st.success(f"Valor do Caixa atualizado para ${caixa_value:.2f}")
                     st.rerun()
             
@@ -216,30 +402,127 @@ def settings_page():
             Visualize o histórico de alterações do seu caixa.
             """)
             
-            # Get all CAIXA records
-            caixa_history = caixa_repo.get_all_caixa()
-            
-            if caixa_history:
-                # Create a DataFrame for better visualization
-                history_data = []
-                for record in caixa_history:
-                    history_data.append({
-                        "Data": record.date.strftime("%d/%m/%Y %H:%M:%S"),
-                        "Valor (R$)": f"{float(record.valor):.2f}"
-                    })
-                
-                df = pd.DataFrame(history_data)
-                st.dataframe(df, use_container_width=True)
-                
-                # Add option to clear all history
-                if st.button("Limpar Todo o Histórico", type="secondary"):
-                    if st.checkbox("Confirmar exclusão de todo o histórico"):
-                        caixa_repo.clear_history()
-                        st.success("Histórico do Caixa limpo com sucesso")
-                        st.rerun()
-            else:
-                st.info("Nenhum registro no histórico do Caixa.")
+            caixa_history(caixa_account)
     
+    with bulk_tab:
+        st.header("Importação e Exportação em Lote")
+        st.markdown("""
+        Importe ou exporte ativos, histórico do caixa, cotações do dólar e dados de ações em CSV ou Parquet.
+        Os arquivos são processados em blocos, então exportações grandes de corretoras podem ser carregadas.
+        """)
+
+        dataset_labels = {
+            "Ativos": "assets",
+            "Histórico do Caixa": "caixa",
+            "Cotações do Dólar": "dollar",
+            "Dados de Ações": "stock_data"
+        }
+        dataset_label = st.selectbox("Conjunto de Dados", list(dataset_labels.keys()))
+        dataset = dataset_labels[dataset_label]
+        st.caption(f"Colunas esperadas: {', '.join(DATASETS[dataset])}")
+
+        import_col, export_col = st.columns(2)
+
+        with import_col:
+            st.subheader("Importar")
+            uploaded_file = st.file_uploader("Arquivo", type=["csv", "parquet"], key=f"upload_{dataset}")
+            if uploaded_file is not None and st.button("Importar Arquivo"):
+                file_format = "parquet" if uploaded_file.name.endswith(".parquet") else "csv"
+                try:
+                    with st.spinner("Importando..."):
+                        result = bulk_io_service.import_file(dataset, uploaded_file, file_format)
+                    st.success(f"{result.imported} linha(s) importada(s) em {result.chunks} bloco(s).")
+                    if result.rejected:
+                        st.warning(f"{result.rejected} linha(s) rejeitada(s).")
+                        for error in result.errors:
+                            st.text(error)
+                except (ValueError, ImportError) as e:
+                    st.error(f"Erro ao importar arquivo: {e}")
+
+        with export_col:
+            st.subheader("Exportar")
+            export_format = st.radio("Formato", ["csv", "parquet"], horizontal=True)
+            if st.button("Gerar Exportação"):
+                export_path = Path(tempfile.gettempdir()) / f"{dataset}.{export_format}"
+                try:
+                    with st.spinner("Exportando..."):
+                        count = bulk_io_service.export_file(dataset, str(export_path), export_format)
+                    with open(export_path, "rb") as export_file:
+                        st.download_button(
+                            f"Baixar {count} linha(s)",
+                            data=export_file,
+                            file_name=export_path.name,
+                            mime="text/csv" if export_format == "csv" else "application/octet-stream"
+                        )
+                except ImportError as e:
+                    st.error(f"Erro ao exportar: {e}")
+
     with notification_tab:
         st.header("Configurações de Notificações")
-        st.info("Em desenvolvimento. Em breve você poderá configurar notificações para seus ativos.") 
\ No newline at end of file
+        st.markdown("""
+        Cadastre alertas de preço, variação no dia, dólar, queda da carteira e caixa. O coletor
+        avalia as regras a cada ciclo; cada regra dispara uma vez ao cruzar o limite e só volta
+        a disparar depois que o valor recuar além da histerese.
+        """)
+
+        with st.form("alert_form"):
+            col1, col2 = st.columns(2)
+
+            with col1:
+                alert_label = st.selectbox("Tipo de Alerta", list(ALERT_KIND_LABELS.keys()))
+                asset_symbols = asset_service.get_symbols()
+                alert_symbol = st.selectbox("Ativo (alertas de preço e variação)", asset_symbols or [""])
+
+            with col2:
+                alert_threshold = st.number_input("Limite", value=0.0, step=0.01, format="%.4f")
+                alert_hysteresis = st.number_input("Histerese", value=0.0, min_value=0.0, step=0.01, format="%.4f",
+                                                   help="Quanto o valor precisa voltar para a regra poder disparar de novo")
+
+            if st.form_submit_button("Adicionar Alerta"):
+                alert_kind = ALERT_KIND_LABELS[alert_label]
+                if alert_kind in ASSET_ALERT_KINDS and not alert_symbol:
+                    st.error("Cadastre um ativo antes de criar alertas de preço ou variação.")
+                else:
+                    alert_engine.add_rule(alert_kind, alert_symbol, alert_threshold, alert_hysteresis)
+                    st.success("Alerta cadastrado.")
+                    st.rerun()
+
+        rules = alert_engine.repository.get_rules()
+        if rules:
+            st.subheader("Alertas Cadastrados")
+            kind_labels = {kind: label for label, kind in ALERT_KIND_LABELS.items()}
+            st.dataframe(pd.DataFrame([
+                {
+                    "ID": rule.id,
+                    "Tipo": kind_labels[rule.kind],
+                    "Símbolo": rule.symbol,
+                    "Limite": rule.threshold,
+                    "Histerese": rule.hysteresis,
+                    "Armado": rule.armed,
+                    "Disparos": rule.fired_count,
+                    "Último Disparo": rule.last_fired_at.strftime("%d/%m/%Y %H:%M:%S") if rule.last_fired_at else ""
+                }
+                for rule in rules
+            ]), use_container_width=True, hide_index=True)
+
+            selected_rules = st.multiselect("Alertas para excluir", [rule.id for rule in rules])
+            if selected_rules and st.button("Excluir Alertas Selecionados"):
+                alert_engine.remove_rules(selected_rules)
+                st.success(f"{len(selected_rules)} alerta(s) excluído(s).")
+                st.rerun()
+        else:
+            st.info("Nenhum alerta cadastrado.")
+
+        st.subheader("Alertas Disparados")
+        outbox = alert_engine.repository.get_outbox(limit=50)
+        if outbox:
+            st.dataframe(pd.DataFrame([
+                {
+                    "Data": alert.fired_at.strftime("%d/%m/%Y %H:%M:%S"),
+                    "Alerta": alert.message,
+                    "Entregue": alert.delivered_at is not None
+                }
+                for alert in outbox
+            ]), use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhum alerta disparado ainda.")
\ No newline at end of file
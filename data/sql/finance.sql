@@ -13,4 +13,17 @@ CREATE TABLE IF NOT EXISTS `dollar` (
    bid DECIMAL(10, 4) NOT NULL,
    ask DECIMAL(10, 4) NOT NULL,
    date_hour DATETIME NOT NULL
-);
\ No newline at end of file
+);
+
+-- Consultas por janela de tempo (gráfico do dólar)
+CREATE INDEX IF NOT EXISTS idx_dollar_date_hour ON `dollar` (date_hour);
+
+-- -----------------------------------------------------
+-- Table `dollar_stats`
+-- Estado persistido das estatísticas incrementais da cotação
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `dollar_stats` (
+   name TEXT PRIMARY KEY,
+   state TEXT NOT NULL,
+   updated_at DATETIME NOT NULL
+);
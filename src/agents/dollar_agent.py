@@ -1,6 +1,7 @@
 from crewai import Agent
-from crewai import LLM
 from crewai.project import CrewBase, agent
+
+from src.agents.llm import get_llm
 from src.services.dollar_service import CurrencyApi
 
 
@@ -21,6 +22,6 @@ class CurrencyAgent:
             response_template="""<|start_header_id|>assistant<|end_header_id|>
                         {{ .Response }}<|eot_id|>""",
             tools=[CurrencyApi()],
-            llm=LLM(model='ollama/llama3.1', api_base='http://localhost:11434'),
+            llm=get_llm('ollama/llama3.1'),
             max_iter=2
         )
@@ -0,0 +1,17 @@
+import threading
+
+from crewai import LLM
+
+OLLAMA_BASE = 'http://localhost:11434'
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_llm(model: str = 'ollama/llama3.1', api_base: str = OLLAMA_BASE) -> LLM:
+    """Cliente LLM compartilhado por modelo: os agentes reutilizam o mesmo em vez de criar um por agente."""
+    key = (model, api_base)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = LLM(model=model, api_base=api_base)
+        return _clients[key]
@@ -1,6 +1,8 @@
-from crewai import Agent, LLM
+from crewai import Agent
 from crewai.project import agent
 
+from src.agents.llm import get_llm
+
 from src.services.selenium_service import SeleniumPostAgent
 
 selenium_post_agent = SeleniumPostAgent()
@@ -19,7 +21,7 @@ class PostAgents:
                     {{ .Prompt }}<|eot_id|>""",
             response_template="""<|start_header_id|>assistant<|end_header_id|>
                     {{ .Response }}<|eot_id|>""",
-            llm=LLM(model='ollama/llama3.2', api_base='http://localhost:11434'),
+            llm=get_llm('ollama/llama3.2'),
             max_iter=2
         )
 
@@ -36,6 +38,6 @@ class PostAgents:
             response_template="""<|start_header_id|>assistant<|end_header_id|>
                     {{ .Response }}<|eot_id|>""",
             tools=[selenium_post_agent],  # criar uma instância da classe
-            llm=LLM(model='ollama/llama3.2', api_base='http://localhost:11434'),
+            llm=get_llm('ollama/llama3.2'),
             max_iter=2
         )
\ No newline at end of file
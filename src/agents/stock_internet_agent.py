@@ -1,6 +1,7 @@
 from crewai.project import agent
-from crewai import Agent, LLM, Task
+from crewai import Agent
 
+from src.agents.llm import get_llm
 from src.services.duckduckgo_service import SearchDuckDuckGoSearchApi
 
 search_tool = SearchDuckDuckGoSearchApi()
@@ -20,7 +21,23 @@ class StockInternetAgent:
             response_template="""<|start_header_id|>assistant<|end_header_id|>
                     {{ .Response }}<|eot_id|>""",
             tools=[search_tool],
-            llm=LLM(model='ollama/llama3.1', api_base='http://localhost:11434'),
+            llm=get_llm('ollama/llama3.1'),
             max_iter=2
         )
 
+    @agent
+    def cache_analyzer_agent(self):
+        """Analisa a carteira a partir do contexto já calculado, sem ferramentas (nenhuma consulta ao yfinance)."""
+        return Agent(
+            role="Analista de carteira",
+            goal="Dar dicas de investimento a partir dos dados da carteira",
+            backstory="Experiência em análise de desempenho de carteiras e dividendos",
+            system_template="""<|start_header_id|>system<|end_header_id|>
+                    {{ .System }}<|eot_id|>""",
+            prompt_template="""<|start_header_id|>user<|end_header_id|>
+                    {{ .Prompt }}<|eot_id|>""",
+            response_template="""<|start_header_id|>assistant<|end_header_id|>
+                    {{ .Response }}<|eot_id|>""",
+            llm=get_llm('ollama/llama3.1'),
+            max_iter=1
+        )
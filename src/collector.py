@@ -0,0 +1,186 @@
+"""Coletor de dados de mercado, independente do Streamlit.
+
+Concentra todas as consultas aos provedores (AwesomeAPI e yfinance) e grava os
+resultados no banco. O dashboard apenas lê esses dados, então um único coletor
+atende qualquer quantidade de usuários e o histórico continua sendo gravado
+mesmo sem nenhum navegador aberto.
+
+Cada ciclo consulta o dólar, os ativos, os índices e os dividendos ao mesmo tempo,
+com prazo (por padrão, o intervalo): o que não termina no prazo fica com o último
+valor gravado e é listado como atrasado no status do coletor.
+
+Uso:
+    python -m src.collector [--interval 3] [--deadline 3] [--once]
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from functools import partial
+
+from src.entities.collector_status import save_collector_status
+from src.resources import (get_alert_engine, get_asset_service, get_caixa_repository, get_currency_api,
+                           get_dividend_service, get_response_cache, get_stock_service)
+from src.services.alert_service import CAIXA, FX_SYMBOL, PORTFOLIO
+from src.services.circuit_breaker import CircuitOpenError, get_breaker
+from src.services.equity_service import BENCHMARKS
+from src.services.market_data_service import AWESOMEAPI, fetch_currency
+from src.services.provider_gateway import gateway_metrics
+from src.services.refresh_pipeline import RefreshPipeline
+
+# Intervalo padrão entre ciclos, o mesmo que o dashboard usava
+DEFAULT_INTERVAL = 3.0
+
+
+class Collector:
+    """Consulta os provedores periodicamente e grava tudo no banco."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, deadline: float = None):
+        self.interval = interval
+        self.deadline = deadline or interval
+        self.currency_api = get_currency_api()
+        self.asset_service = get_asset_service()
+        self.stock_service = get_stock_service()
+        self.dividend_service = get_dividend_service()
+        self.alert_engine = get_alert_engine()
+        self.pipeline = RefreshPipeline()
+        self.started_at = datetime.now()
+        self.ticks = 0
+        self.running = False
+
+    def collect_fx(self) -> bool:
+        """Busca e grava a cotação USD-BRL (atualiza também as estatísticas incrementais)."""
+        try:
+            cotacao = get_breaker(AWESOMEAPI).call(fetch_currency, 'USDBRL')
+            self.currency_api.put_currency(cotacao)
+            return True
+        except CircuitOpenError:
+            logging.debug("AwesomeAPI indisponível, cotação não coletada")
+        except Exception as e:
+            logging.error(f"Erro ao coletar cotação do dólar: {e}")
+        return False
+
+    def refresh_jobs(self, symbols) -> dict:
+        """Tarefas de atualização de um ciclo, executadas em paralelo pelo RefreshPipeline."""
+        jobs = {"fx": self.collect_fx}
+        # Índices de referência da curva de patrimônio, gravados como os ativos
+        for symbol in symbols + [symbol for symbol in BENCHMARKS if symbol not in symbols]:
+            jobs[f"stock:{symbol}"] = partial(self.stock_service.update_stock_data, symbol)
+        # Dividendos e desdobramentos: no máximo uma vez por dia por símbolo
+        for symbol in self.dividend_service.due_symbols(symbols):
+            jobs[f"dividends:{symbol}"] = partial(self.dividend_service.refresh, [symbol])
+        return jobs
+
+    def evaluate_alerts(self, symbols) -> int:
+        """Avalia as regras de alerta com os dados recém-gravados.
+
+        Só lê os valores das chaves que têm regras; a carteira e o caixa são
+        calculados apenas se houver regras de drawdown ou de caixa.
+        """
+        engine = self.alert_engine
+        try:
+            engine.refresh_rules()
+            observations = []
+            for symbol in symbols:
+                if not engine.watches(symbol):
+                    continue
+                summary = self.stock_service.stock_repo.get_session_summary(symbol)
+                if summary is None:
+                    continue
+                observations.append((symbol, "price", summary['close']))
+                if summary['open']:
+                    observations.append((symbol, "move", (summary['close'] - summary['open']) / summary['open'] * 100))
+            if engine.watches(FX_SYMBOL):
+                observations.append((FX_SYMBOL, "price", self.currency_api.get_currency_stats()['last']))
+            if engine.watches(CAIXA):
+                # Caixa somado de todas as contas
+                observations.append((CAIXA, "value", sum(get_caixa_repository().get_balances().values())))
+
+            fired = engine.observe_many(observations)
+            if engine.watches(PORTFOLIO):
+                fired += engine.observe_portfolio(self.asset_service.get_portfolio_summary()['total_value'])
+            return len(fired)
+        except Exception as e:
+            logging.error(f"Erro ao avaliar alertas: {e}")
+            return 0
+
+    def tick(self) -> dict:
+        """Executa um ciclo completo de coleta."""
+        started = time.monotonic()
+        symbols = self.asset_service.get_symbols()
+
+        refresh = self.pipeline.run(self.refresh_jobs(symbols), self.deadline)
+        fx_ok = bool(refresh.results.get("fx"))
+        stocks_ok = len([name for name in refresh.ok("stock:") if name[len("stock:"):] in symbols])
+        dividends = sum(sum(saved.values()) for name, saved in refresh.results.items()
+                        if name.startswith("dividends:"))
+        alerts = self.evaluate_alerts(symbols)
+
+        self.ticks += 1
+        summary = {
+            "pid": os.getpid(),
+            "started_at": self.started_at.isoformat(),
+            "heartbeat_at": datetime.now().isoformat(),
+            "interval": self.interval,
+            "ticks": self.ticks,
+            "symbols": len(symbols),
+            "fx_ok": fx_ok,
+            "stocks_ok": stocks_ok,
+            "new_dividends": dividends,
+            # Tarefas que perderam o prazo do ciclo (ex.: "stock:AAPL"): seguem com o último valor gravado
+            "deadline": self.deadline,
+            "stale": sorted(refresh.stale),
+            "alerts": alerts,
+            # Requisições aos provedores, pedidos reaproveitados e espera pelo limite de taxa
+            "providers": gateway_metrics(),
+            "response_cache": get_response_cache().stats(),
+            "tick_seconds": round(time.monotonic() - started, 3),
+        }
+        save_collector_status(summary)
+        return summary
+
+    def run(self, once: bool = False) -> None:
+        """Executa ciclos a cada `interval` segundos até receber SIGINT/SIGTERM."""
+        self.running = True
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        logging.info(f"Coletor iniciado (pid {os.getpid()}, intervalo {self.interval}s)")
+        try:
+            while self.running:
+                started = time.monotonic()
+                summary = self.tick()
+                logging.info(f"Ciclo {summary['ticks']}: dólar={'ok' if summary['fx_ok'] else 'falhou'}, "
+                             f"ações={summary['stocks_ok']}/{summary['symbols']}, "
+                             f"{len(summary['stale'])} atrasada(s) em {summary['tick_seconds']}s")
+                if once:
+                    break
+                time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.running = False
+            self.pipeline.close()
+            logging.info("Coletor finalizado")
+
+    def stop(self) -> None:
+        self.running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coletor de dados de mercado do dashboard")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Segundos entre ciclos de coleta")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Prazo de cada ciclo em segundos (padrão: o intervalo)")
+    parser.add_argument("--once", action="store_true", help="Executa um único ciclo e sai")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    Collector(interval=args.interval, deadline=args.deadline).run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from crewai import Crew, Process
+
+from src.agents.dollar_agent import CurrencyAgent
+from src.agents.stock_internet_agent import StockInternetAgent
+from src.resources import get_llm_context_builder
+from src.tasks.dollar_tasks import CurrencyTasks
+from src.tasks.stock_internet_task import StockInternetTask
+
+# Crews executadas ao mesmo tempo; o Ollama atende em paralelo até OLLAMA_NUM_PARALLEL requisições
+MAX_PARALLEL_CREWS = 4
+
+
+@dataclass
+class AnalysisResult:
+    name: str
+    title: str
+    output: Optional[str] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+class AnalysisCrew:
+    """Monta as análises independentes (câmbio e mercado) e as executa em paralelo.
+
+    Cada análise é uma crew separada, então nenhuma espera a outra: o tempo total é o
+    da análise mais lenta, e as saídas são reunidas em um único relatório.
+    """
+
+    def __init__(self, max_workers: int = MAX_PARALLEL_CREWS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew")
+        # Relatórios esperam pelas crews: ficam em outro pool para não ocupar os workers delas
+        self._reports = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crew-report")
+
+    def currency_crew(self, context: str = None) -> Crew:
+        agent = CurrencyAgent().currency_analisys_agent()
+        return Crew(
+            agents=[agent],
+            tasks=[CurrencyTasks().currency_task(agent=agent, context=context)],
+            process=Process.sequential,
+            verbose=True
+        )
+
+    def market_crew(self, symbols: List[str], context: str = None) -> Crew:
+        agent = StockInternetAgent().stock_internet_agent()
+        return Crew(
+            agents=[agent],
+            tasks=[StockInternetTask().stock_internet_task(agent=agent, symbols=symbols, context=context)],
+            process=Process.sequential,
+            verbose=True
+        )
+
+    def analyses(self, symbols: List[str], context: str = None) -> Dict[str, tuple]:
+        """Análises disponíveis: nome -> (título, função que monta a crew)."""
+        analyses = {"cambio": ("Câmbio USD/BRL", lambda: self.currency_crew(context))}
+        if symbols:
+            analyses["mercado"] = ("Mercado e ativos", lambda: self.market_crew(symbols, context))
+        return analyses
+
+    def run(self, symbols: List[str]) -> List[AnalysisResult]:
+        """Executa todas as análises ao mesmo tempo e espera a última terminar.
+
+        O contexto (carteira, estatísticas e candles do dólar) é calculado uma vez e
+        entra na descrição das duas tarefas.
+        """
+        context = get_llm_context_builder().build(symbols or None)
+        futures = [
+            self._executor.submit(self._kickoff, name, title, build)
+            for name, (title, build) in self.analyses(symbols, context).items()
+        ]
+        return [future.result() for future in futures]
+
+    def submit_report(self, symbols: List[str]) -> Future:
+        """Agenda o relatório combinado sem bloquear quem chama (ex.: o rerun do Streamlit)."""
+        return self._reports.submit(lambda: self.merge_report(self.run(symbols)))
+
+    def close(self) -> None:
+        self._reports.shutdown(wait=False, cancel_futures=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _kickoff(name: str, title: str, build: Callable[[], Crew]) -> AnalysisResult:
+        started = time.monotonic()
+        result = AnalysisResult(name=name, title=title)
+        try:
+            result.output = str(build().kickoff())
+        except Exception as e:
+            logging.error(f"Erro na análise {name}: {e}")
+            result.error = str(e)
+        result.seconds = time.monotonic() - started
+        return result
+
+    @staticmethod
+    def merge_report(results: List[AnalysisResult]) -> str:
+        """Reúne as saídas das análises em um relatório em Markdown."""
+        sections = [f"## Relatório de análises - {datetime.now().strftime('%d/%m/%Y %H:%M')}"]
+        for result in results:
+            body = result.output if result.error is None else f"Análise indisponível: {result.error}"
+            sections.append(f"### {result.title}\n\n{body}\n\n_Concluída em {result.seconds:.1f}s_")
+        return "\n\n".join(sections)
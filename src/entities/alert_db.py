@@ -0,0 +1,257 @@
+import sqlite3
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+RULE_KINDS = ("price_above", "price_below", "move_above", "move_below", "fx_above", "fx_below",
+              "drawdown", "caixa_above", "caixa_below")
+# Contador incrementado a cada alteração das regras: os processos que avaliam recarregam ao vê-lo mudar
+RULES_VERSION = "rules_version"
+
+
+@dataclass
+class AlertRule:
+    kind: str  # um de RULE_KINDS
+    symbol: str  # ticker, USDBRL, PORTFOLIO ou CAIXA
+    threshold: float
+    hysteresis: float = 0.0  # distância que o valor precisa voltar para a regra poder disparar de novo
+    armed: bool = True
+    fired_count: int = 0
+    last_fired_at: Optional[datetime] = None
+    id: Optional[int] = None
+
+
+@dataclass
+class Alert:
+    rule_id: int
+    kind: str
+    symbol: str
+    value: float
+    threshold: float
+    message: str
+    fired_at: datetime
+    episode: int  # disparo de número `episode` da regra: chave de de-duplicação na caixa de saída
+    delivered_at: Optional[datetime] = None
+    id: Optional[int] = None
+
+
+class AlertRepository:
+    """Regras de alerta, o seu estado (armada ou não) e a caixa de saída dos alertas disparados.
+
+    A caixa de saída é a fila lida pelos canais de entrega: cada alerta fica pendente
+    até ser marcado como entregue. Um alerta é identificado por (regra, disparo), então
+    gravar o mesmo disparo duas vezes não o duplica.
+    """
+
+    def __init__(self, db_path: str = "data/db/alerts.db"):
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.create_tables()
+
+    def _connect(self):
+        # O coletor e o dashboard usam o mesmo banco: espera o lock em vez de falhar
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def create_tables(self):
+        """Create the alert tables if they don't exist"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS alert_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL CHECK (kind IN ({', '.join(f"'{kind}'" for kind in RULE_KINDS)})),
+                symbol TEXT NOT NULL,
+                threshold REAL NOT NULL,
+                hysteresis REAL NOT NULL DEFAULT 0 CHECK (hysteresis >= 0),
+                armed INTEGER NOT NULL DEFAULT 1,
+                fired_count INTEGER NOT NULL DEFAULT 0,
+                last_fired_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alert_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rule_id INTEGER NOT NULL,
+                episode INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                value REAL NOT NULL,
+                threshold REAL NOT NULL,
+                message TEXT NOT NULL,
+                fired_at TIMESTAMP NOT NULL,
+                delivered_at TIMESTAMP,
+                UNIQUE(rule_id, episode)
+            )
+        """)
+        # Alertas pendentes de entrega, em ordem de disparo
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_alert_outbox_pending
+            ON alert_outbox(delivered_at, id)
+        """)
+        # Valores mantidos entre execuções (versão das regras, pico da carteira)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alert_state (
+                name TEXT PRIMARY KEY,
+                value REAL NOT NULL
+            )
+        """)
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _bump_version(conn) -> None:
+        conn.execute("""
+            INSERT INTO alert_state (name, value) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1
+        """, (RULES_VERSION,))
+
+    def add_rules(self, rules: Iterable[AlertRule]) -> List[int]:
+        """Save new rules in a single transaction and return their ids"""
+        conn = self._connect()
+        try:
+            with conn:
+                ids = []
+                for rule in rules:
+                    if rule.kind not in RULE_KINDS:
+                        raise ValueError(f"Tipo de alerta inválido: {rule.kind}")
+                    cursor = conn.execute("""
+                        INSERT INTO alert_rules (kind, symbol, threshold, hysteresis, armed)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (rule.kind, rule.symbol, float(rule.threshold), float(rule.hysteresis), int(rule.armed)))
+                    ids.append(cursor.lastrowid)
+                self._bump_version(conn)
+            return ids
+        finally:
+            conn.close()
+
+    def delete_rules(self, rule_ids: Iterable[int]) -> int:
+        """Delete rules by id (their alerts stay in the outbox)"""
+        rule_ids = [int(rule_id) for rule_id in rule_ids]
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.executemany("DELETE FROM alert_rules WHERE id = ?", [(rule_id,) for rule_id in rule_ids])
+                self._bump_version(conn)
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def get_rules(self) -> List[AlertRule]:
+        """Get every rule ordered by id"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, kind, symbol, threshold, hysteresis, armed, fired_count, last_fired_at
+            FROM alert_rules ORDER BY id
+        """)
+        results = cursor.fetchall()
+        conn.close()
+        return [
+            AlertRule(
+                id=rule_id,
+                kind=kind,
+                symbol=symbol,
+                threshold=threshold,
+                hysteresis=hysteresis,
+                armed=bool(armed),
+                fired_count=fired_count,
+                last_fired_at=datetime.fromisoformat(last_fired_at) if last_fired_at else None
+            )
+            for rule_id, kind, symbol, threshold, hysteresis, armed, fired_count, last_fired_at in results
+        ]
+
+    def get_rules_version(self) -> int:
+        return int(self.get_state(RULES_VERSION) or 0)
+
+    def save_evaluation(self, rearmed: Iterable[int], alerts: Iterable[Alert]) -> int:
+        """Persist one evaluation in a single transaction
+
+        Re-arms the rules in `rearmed`, disarms the rules of the fired alerts and
+        appends the alerts to the outbox. Returns how many alerts were new.
+        """
+        alerts = list(alerts)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("UPDATE alert_rules SET armed = 1 WHERE id = ?",
+                                 [(rule_id,) for rule_id in rearmed])
+                conn.executemany("""
+                    UPDATE alert_rules SET armed = 0, fired_count = ?, last_fired_at = ? WHERE id = ?
+                """, [(alert.episode, alert.fired_at.isoformat(), alert.rule_id) for alert in alerts])
+                before = conn.total_changes
+                conn.executemany("""
+                    INSERT OR IGNORE INTO alert_outbox
+                    (rule_id, episode, kind, symbol, value, threshold, message, fired_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (alert.rule_id, alert.episode, alert.kind, alert.symbol, alert.value,
+                     alert.threshold, alert.message, alert.fired_at.isoformat())
+                    for alert in alerts
+                ])
+                return conn.total_changes - before
+        finally:
+            conn.close()
+
+    def get_outbox(self, limit: int = 100, pending_only: bool = False) -> List[Alert]:
+        """Get the most recent alerts (or the oldest pending ones, in firing order)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        if pending_only:
+            cursor.execute("""
+                SELECT * FROM alert_outbox WHERE delivered_at IS NULL ORDER BY id LIMIT ?
+            """, (limit,))
+        else:
+            cursor.execute("SELECT * FROM alert_outbox ORDER BY id DESC LIMIT ?", (limit,))
+        results = cursor.fetchall()
+        conn.close()
+        return [
+            Alert(
+                id=alert_id,
+                rule_id=rule_id,
+                episode=episode,
+                kind=kind,
+                symbol=symbol,
+                value=value,
+                threshold=threshold,
+                message=message,
+                fired_at=datetime.fromisoformat(fired_at),
+                delivered_at=datetime.fromisoformat(delivered_at) if delivered_at else None
+            )
+            for alert_id, rule_id, episode, kind, symbol, value, threshold, message, fired_at, delivered_at
+            in results
+        ]
+
+    def mark_delivered(self, alert_ids: Iterable[int]) -> None:
+        """Mark outbox alerts as delivered"""
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("UPDATE alert_outbox SET delivered_at = ? WHERE id = ? AND delivered_at IS NULL",
+                                 [(now, int(alert_id)) for alert_id in alert_ids])
+        finally:
+            conn.close()
+
+    def get_state(self, name: str) -> Optional[float]:
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM alert_state WHERE name = ?", (name,))
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result else None
+
+    def set_state(self, values: Iterable[Tuple[str, float]]) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO alert_state (name, value) VALUES (?, ?)
+                    ON CONFLICT(name) DO UPDATE SET value = excluded.value
+                """, list(values))
+        finally:
+            conn.close()
@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import List, Optional
-from sqlalchemy import create_engine, Column, Integer, Numeric, DateTime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import create_engine, inspect, select, text, and_, or_, Column, Index, Integer, Numeric, \
+    DateTime, String
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from src.model.account import DEFAULT_ACCOUNT
 from src.model.caixa import CaixaModel
 
 Base = declarative_base()
@@ -13,58 +15,188 @@ class Caixa(Base):
     id = Column(Integer, primary_key=True)
     valor = Column(Numeric(10, 2), nullable=False)
     date = Column(DateTime, default=datetime.now)
+    account = Column(String, nullable=False, default=DEFAULT_ACCOUNT, server_default=DEFAULT_ACCOUNT)
+
+    # Paginação do histórico por (data, id) e filtros por período; saldo atual de cada conta
+    __table_args__ = (Index('idx_caixa_date_id', 'date', 'id'), Index('idx_caixa_account_date', 'account', 'date'))
+
+# Saldo de fechamento, soma e quantidade de registros por período de uma conta. Com um único MAX(),
+# o SQLite devolve as colunas sem agregação (valor) da linha do máximo: o último registro do período
+AGGREGATES_SQL = """
+    SELECT strftime(:fmt, date) AS period, valor, SUM(valor), COUNT(*), MAX(date)
+    FROM caixa
+    WHERE account = :account AND date >= :start AND date < :end
+    GROUP BY period
+    ORDER BY period
+"""
+
+# Saldo atual (último registro) de cada conta, com o mesmo recurso do MAX()
+BALANCES_SQL = """
+    SELECT account, valor, MAX(date) FROM caixa GROUP BY account ORDER BY account
+"""
+
+# Impressão digital barata (coberta por idx_caixa_account_date) dos registros de uma conta: muda a cada
+# inserção e exclusão (COUNT, MAX(id)) e a cada update_caixa, que move o registro para agora (MAX(date))
+FINGERPRINT_SQL = """
+    SELECT COUNT(*), MAX(id), MAX(date) FROM caixa WHERE account = :account
+"""
+
+# Combinações de (formato, período) de agregados mantidas em cache
+MAX_CACHED_AGGREGATES = 16
 
 class CaixaRepository:
+    """Repositório do caixa, seguro para uso compartilhado entre threads.
+
+    Cada operação abre a sua própria sessão; o engine (e o seu pool de conexões)
+    é compartilhado.
+    """
+
     def __init__(self):
         # Use the same database URL as other repositories
         self.engine = create_engine('sqlite:///finance.db')
         Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        # Bancos anteriores às contas: os registros existentes ficam na conta padrão
+        if 'account' not in [column['name'] for column in inspect(self.engine).get_columns('caixa')]:
+            with self.engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE caixa ADD COLUMN account VARCHAR NOT NULL "
+                                  f"DEFAULT '{DEFAULT_ACCOUNT}'"))
+        # create_all não cria índices novos em tabelas que já existem
+        for index in Caixa.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        # Agregados por (formato, início, fim, conta), válidos enquanto a impressão digital da conta não mudar
+        self._aggregates = {}
 
     def save_caixa(self, caixa: CaixaModel) -> None:
         db_caixa = Caixa(
             valor=caixa.valor,
-            date=caixa.date
+            date=caixa.date,
+            account=caixa.account
         )
-        self.session.add(db_caixa)
-        self.session.commit()
+        with self.Session.begin() as session:
+            session.add(db_caixa)
 
-    def get_latest_caixa(self) -> Optional[CaixaModel]:
-        caixa = self.session.query(Caixa).order_by(Caixa.date.desc()).first()
+    def get_latest_caixa(self, account: str = DEFAULT_ACCOUNT) -> Optional[CaixaModel]:
+        with self.Session() as session:
+            caixa = session.query(Caixa).filter(Caixa.account == account).order_by(Caixa.date.desc()).first()
         if caixa:
             return CaixaModel(
                 id=caixa.id,
                 valor=caixa.valor,
-                date=caixa.date
+                date=caixa.date,
+                account=caixa.account
             )
         return None
 
-    def update_caixa(self, valor: float) -> None:
-        caixa = self.session.query(Caixa).order_by(Caixa.date.desc()).first()
-        if caixa:
-            caixa.valor = valor
-            caixa.date = datetime.now()
-        else:
-            new_caixa = Caixa(valor=valor)
-            self.session.add(new_caixa)
-        self.session.commit()
+    def get_balances(self) -> Dict[str, float]:
+        """Saldo atual de cada conta, lido em uma única consulta agrupada"""
+        with self.engine.connect() as conn:
+            return {account: float(valor) for account, valor, _ in conn.execute(text(BALANCES_SQL))}
+
+    def get_accounts(self) -> List[str]:
+        """Contas com algum registro de caixa"""
+        return list(self.get_balances())
+
+    def update_caixa(self, valor: float, account: str = DEFAULT_ACCOUNT) -> None:
+        with self.Session.begin() as session:
+            caixa = session.query(Caixa).filter(Caixa.account == account).order_by(Caixa.date.desc()).first()
+            if caixa:
+                caixa.valor = valor
+                caixa.date = datetime.now()
+            else:
+                new_caixa = Caixa(valor=valor, account=account)
+                session.add(new_caixa)
 
     def get_all_caixa(self) -> List[Caixa]:
         """Retorna todos os registros de caixa ordenados por data (mais recente primeiro)"""
-        return self.session.query(Caixa).order_by(Caixa.date.desc()).all()
+        with self.Session() as session:
+            return session.query(Caixa).order_by(Caixa.date.desc()).all()
+
+    def get_caixa_page(self, limit: int = 50, before: Tuple[datetime, int] = None,
+                       start: datetime = None, end: datetime = None, account: str = None):
+        """Uma página do histórico (id, valor, data), do mais recente para o mais antigo.
+
+        Paginação por chave: `before` é o (data, id) do último registro da página
+        anterior, então cada página custa o mesmo que a primeira. Sem `account`, inclui
+        todas as contas. Retorna as linhas e o cursor da próxima página (None quando não
+        há mais registros).
+        """
+        table = Caixa.__table__
+        query = select(table.c.id, table.c.valor, table.c.date)
+        if account is not None:
+            query = query.where(table.c.account == account)
+        if start is not None:
+            query = query.where(table.c.date >= start)
+        if end is not None:
+            query = query.where(table.c.date < end)
+        if before is not None:
+            before_date, before_id = before
+            query = query.where(or_(table.c.date < before_date,
+                                    and_(table.c.date == before_date, table.c.id < before_id)))
+        query = query.order_by(table.c.date.desc(), table.c.id.desc()).limit(limit + 1)
+        with self.engine.connect() as conn:
+            rows = [tuple(row) for row in conn.execute(query)]
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, (rows[-1][2], rows[-1][0])
+        return rows, None
+
+    def get_caixa_aggregates(self, bucket_format: str = '%Y-%m', start: datetime = None,
+                             end: datetime = None, account: str = DEFAULT_ACCOUNT) -> List[tuple]:
+        """Agregados por período de uma conta, calculados no SQLite: (período, saldo de fechamento, soma, registros).
+
+        `bucket_format` é o formato do strftime que define o período (padrão: por mês). O
+        resultado fica em cache enquanto os registros da conta não mudarem, conferidos a cada
+        chamada por uma impressão digital do banco (FINGERPRINT_SQL), então escritas de outros
+        processos (coletor, importação pela linha de comando) também invalidam o cache.
+        """
+        key = (bucket_format, start, end, account)
+        params = {
+            "fmt": bucket_format,
+            "account": account,
+            "start": str(start or datetime.min),
+            "end": str(end or datetime.max),
+        }
+        with self.engine.connect() as conn:
+            fingerprint = tuple(conn.execute(text(FINGERPRINT_SQL), {"account": account}).one())
+            cached = self._aggregates.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+            rows = [row[:4] for row in conn.execute(text(AGGREGATES_SQL), params)]
+        if len(self._aggregates) >= MAX_CACHED_AGGREGATES:
+            self._aggregates.clear()
+        self._aggregates[key] = (fingerprint, rows)
+        return rows
+
+    def save_caixa_batch(self, rows: List[dict]) -> int:
+        """Insere vários registros ({'valor', 'date', 'account'}) em uma única transação"""
+        with self.engine.begin() as conn:
+            conn.execute(Caixa.__table__.insert(), rows)
+        return len(rows)
+
+    def iter_caixa(self, chunk_size: int = 10000):
+        """Percorre o histórico do caixa em blocos, sem carregar tudo em memória"""
+        table = Caixa.__table__
+        query = select(table.c.valor, table.c.date, table.c.account).order_by(table.c.id)
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+            for partition in result.partitions(chunk_size):
+                yield [tuple(row) for row in partition]
 
     def delete_caixa(self, caixa_id: int) -> None:
         """Deleta um registro específico de caixa pelo ID"""
-        caixa = self.session.query(Caixa).filter(Caixa.id == caixa_id).first()
-        if caixa:
-            self.session.delete(caixa)
-            self.session.commit()
+        with self.Session.begin() as session:
+            caixa = session.query(Caixa).filter(Caixa.id == caixa_id).first()
+            if caixa:
+                session.delete(caixa)
 
-    def clear_history(self) -> None:
-        """Remove todos os registros de caixa"""
-        self.session.query(Caixa).delete()
-        self.session.commit()
+    def clear_history(self, account: str = None) -> None:
+        """Remove todos os registros de caixa (de todas as contas, sem `account`)"""
+        with self.Session.begin() as session:
+            query = session.query(Caixa)
+            if account is not None:
+                query = query.filter(Caixa.account == account)
+            query.delete()
 
-    def __del__(self):
-        self.session.close() 
\ No newline at end of file
+    def close(self) -> None:
+        self.engine.dispose()
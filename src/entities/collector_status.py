@@ -0,0 +1,36 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+# Arquivo de status compartilhado entre o coletor e o dashboard
+COLLECTOR_STATUS_PATH = Path("data/db/collector_status.json")
+
+
+def save_collector_status(status: dict) -> None:
+    """Grava o status do coletor de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(os.path.dirname(COLLECTOR_STATUS_PATH), exist_ok=True)
+    tmp_path = COLLECTOR_STATUS_PATH.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(status, f, indent=4, default=str)
+    os.replace(tmp_path, COLLECTOR_STATUS_PATH)
+
+
+def load_collector_status() -> Optional[dict]:
+    """Lê o último status gravado pelo coletor (ou None se ele nunca rodou)."""
+    if not COLLECTOR_STATUS_PATH.exists():
+        return None
+    try:
+        with open(COLLECTOR_STATUS_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def collector_heartbeat_age() -> Optional[float]:
+    """Segundos desde o último ciclo do coletor (None se não houver status)."""
+    status = load_collector_status()
+    if not status or not status.get("heartbeat_at"):
+        return None
+    return (datetime.now() - datetime.fromisoformat(status["heartbeat_at"])).total_seconds()
@@ -0,0 +1,114 @@
+import sqlite3
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ACTION_TYPES = ("dividend", "split")
+
+
+class DividendRepository:
+    """Local store of dividends and splits (corporate actions) per symbol."""
+
+    def __init__(self, db_path: str = "data/db/stock_market.db"):
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.create_tables()
+
+    def create_tables(self):
+        """Create the corporate actions tables if they don't exist"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS corporate_actions (
+                symbol TEXT NOT NULL,
+                action_date TIMESTAMP NOT NULL,
+                action_type TEXT NOT NULL CHECK (action_type IN ('dividend', 'split')),
+                value REAL NOT NULL,
+                PRIMARY KEY (symbol, action_type, action_date)
+            )
+        """)
+
+        # Last time each symbol was checked with the provider
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS corporate_actions_refresh (
+                symbol TEXT PRIMARY KEY,
+                refreshed_at TIMESTAMP NOT NULL
+            )
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def save_actions(self, symbol: str, actions: Iterable[Tuple[datetime, str, float]]) -> int:
+        """Upsert (date, type, value) actions of a symbol and mark it as refreshed"""
+        rows = [(symbol, date.isoformat(), action_type, float(value)) for date, action_type, value in actions]
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("""
+            INSERT INTO corporate_actions (symbol, action_date, action_type, value)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(symbol, action_type, action_date) DO UPDATE SET value = excluded.value
+        """, rows)
+        conn.execute("""
+            INSERT INTO corporate_actions_refresh (symbol, refreshed_at) VALUES (?, ?)
+            ON CONFLICT(symbol) DO UPDATE SET refreshed_at = excluded.refreshed_at
+        """, (symbol, datetime.now().isoformat()))
+        conn.commit()
+        conn.close()
+        return len(rows)
+
+    def get_last_action_date(self, symbol: str) -> Optional[datetime]:
+        """Get the date of the most recent stored action of a symbol"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(action_date) FROM corporate_actions WHERE symbol = ?", (symbol,))
+        result = cursor.fetchone()
+        conn.close()
+        return datetime.fromisoformat(result[0]) if result and result[0] else None
+
+    def get_refreshed_at(self) -> Dict[str, datetime]:
+        """Get the last refresh time of every symbol"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT symbol, refreshed_at FROM corporate_actions_refresh")
+        results = cursor.fetchall()
+        conn.close()
+        return {symbol: datetime.fromisoformat(refreshed_at) for symbol, refreshed_at in results}
+
+    def get_latest_dividends(self) -> Dict[str, float]:
+        """Get the most recent dividend of every symbol in a single query"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT symbol, value FROM corporate_actions AS ca
+            WHERE action_type = 'dividend'
+              AND action_date = (
+                  SELECT MAX(action_date) FROM corporate_actions
+                  WHERE symbol = ca.symbol AND action_type = 'dividend'
+              )
+        """)
+        results = cursor.fetchall()
+        conn.close()
+        return dict(results)
+
+    def get_actions(self, symbol: str, action_type: str = None,
+                    start_date: datetime = None) -> List[Tuple[datetime, str, float]]:
+        """Get the stored actions of a symbol ordered by date"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        query = "SELECT action_date, action_type, value FROM corporate_actions WHERE symbol = ?"
+        params = [symbol]
+        if action_type:
+            query += " AND action_type = ?"
+            params.append(action_type)
+        if start_date:
+            query += " AND action_date >= ?"
+            params.append(start_date.isoformat())
+        query += " ORDER BY action_date"
+
+        cursor.execute(query, params)
+        results = cursor.fetchall()
+        conn.close()
+        return [(datetime.fromisoformat(date), kind, value) for date, kind, value in results]
@@ -1,10 +1,21 @@
+import json
 import sqlite3
 import logging
+import threading
+from datetime import datetime
+
+import numpy as np
 
 from src.model.currency import CurrencyQuoteModel
+from src.services.rolling_stats_service import RollingStats
 
 DB_PATH = './data/db/dollar.db'
 SQL_PATH = './data/sql/finance.sql'
+STATS_NAME = 'USDBRL'
+DOLLAR_COLUMNS = ('code', 'codein', 'name', 'high', 'low', 'varBid', 'pctChange', 'bid', 'ask', 'date_hour')
+
+_stats = None
+_stats_lock = threading.Lock()
 
 
 def connect_db():
@@ -25,27 +36,42 @@ def create_tables(conn):
 
 
 def save_dollar(quote: CurrencyQuoteModel):
+    global _stats
     conn = connect_db()
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO dollar (code, codein, name, high, low, varBid, pctChange, bid, ask, date_hour)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            quote.code,
-            quote.codein,
-            quote.name,
-            float(quote.high),
-            float(quote.low),
-            float(quote.varBid),
-            float(quote.pctChange),
-            float(quote.bid),
-            float(quote.ask),
-            quote.date
-        ))
+        with _stats_lock:
+            # Carrega as estatísticas antes de inserir para não contar a cotação duas vezes
+            stats = _load_stats(conn)
+            _insert_dollar(conn, quote)
+            # Atualiza as estatísticas na mesma transação da cotação
+            stats.push(quote.bid, quote.date)
+            _save_stats(conn, stats)
         conn.commit()
     except sqlite3.Error as e:
         logging.error(f"Erro ao salvar cotação: {e}")
+        # Descarta o estado em memória para recarregá-lo do banco
+        _stats = None
+    finally:
+        conn.close()
+
+
+def _insert_dollar(conn, quote: CurrencyQuoteModel):
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO dollar (code, codein, name, high, low, varBid, pctChange, bid, ask, date_hour)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        quote.code,
+        quote.codein,
+        quote.name,
+        float(quote.high),
+        float(quote.low),
+        float(quote.varBid),
+        float(quote.pctChange),
+        float(quote.bid),
+        float(quote.ask),
+        quote.date
+    ))
 
 
 def get_dollar(conn):
@@ -58,6 +84,64 @@ def get_dollar(conn):
         logging.error(f"Erro ao obter cotação: {e}")
 
 
+def save_dollar_batch(rows):
+    """Insere várias cotações (tuplas na ordem de DOLLAR_COLUMNS) em uma única transação.
+
+    Usado na importação em lote de histórico; as estatísticas incrementais
+    acompanham apenas as cotações ingeridas por `save_dollar`.
+    """
+    conn = connect_db()
+    try:
+        with conn:
+            conn.executemany(f"""
+                INSERT INTO dollar ({', '.join(DOLLAR_COLUMNS)})
+                VALUES ({', '.join('?' for _ in DOLLAR_COLUMNS)})
+            """, rows)
+        return len(rows)
+    finally:
+        conn.close()
+
+
+def iter_dollar(chunk_size=10000):
+    """Percorre a tabela dollar em blocos de `chunk_size` linhas, sem carregar tudo em memória."""
+    conn = connect_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(DOLLAR_COLUMNS)} FROM dollar ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def iter_dollar_range(after_id: int, until_id: int, chunk_size=10000):
+    """Percorre em blocos as cotações com `after_id` < id <= `until_id`, em ordem de id."""
+    conn = connect_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(DOLLAR_COLUMNS)} FROM dollar WHERE id > ? AND id <= ? ORDER BY id",
+                       (after_id, until_id))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def get_latest_dollar():
+    """Retorna a última cotação salva (ou None)."""
+    conn = connect_db()
+    try:
+        return get_dollar(conn)
+    finally:
+        conn.close()
+
+
 def get_daily_dollar():
     conn = connect_db()
     try:
@@ -69,6 +153,180 @@ def get_daily_dollar():
         logging.error(f"Erro ao obter cotação do dia todo: {e}")
 
 
+def _fetch_points(query: str, params) -> tuple:
+    conn = connect_db()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao obter cotações: {e}")
+        rows = []
+    finally:
+        conn.close()
+
+    if not rows:
+        return np.array([], dtype=np.int64), np.array([], dtype='datetime64[us]'), np.array([], dtype=np.float64)
+    ids, dates, bids = zip(*rows)
+    return (np.array(ids, dtype=np.int64), np.array(dates, dtype='datetime64[us]'),
+            np.array(bids, dtype=np.float64))
+
+
+def get_dollar_range(start: datetime = None, end: datetime = None) -> tuple:
+    """Cotações válidas (bid > 0) entre `start` e `end`, em ordem cronológica.
+
+    Retorna arrays NumPy (ids, datas, bids). O filtro, a ordenação e a conversão do
+    bid para número são feitos pelo SQLite (usando o índice de date_hour), então só
+    as linhas da janela chegam ao Python.
+    """
+    query = "SELECT id, date_hour, CAST(bid AS REAL) FROM dollar WHERE bid > 0"
+    params = []
+    if start is not None:
+        query += " AND date_hour >= ?"
+        params.append(start.isoformat(sep=' '))
+    if end is not None:
+        query += " AND date_hour <= ?"
+        params.append(end.isoformat(sep=' '))
+    query += " ORDER BY date_hour"
+    return _fetch_points(query, params)
+
+
+def get_dollar_points(after_id: int) -> tuple:
+    """Cotações válidas gravadas depois da cotação `after_id`, em ordem de inserção.
+
+    Percorre apenas o final da tabela (pela chave primária), qualquer que seja o seu tamanho.
+    """
+    return _fetch_points(
+        "SELECT id, date_hour, CAST(bid AS REAL) FROM dollar WHERE id > ? AND bid > 0 ORDER BY id",
+        (after_id,),
+    )
+
+
+def get_dollar_candles(start: datetime, bucket_format: str = '%Y-%m-%d %H:00'):
+    """Candles (período, abertura, máxima, mínima, fechamento, cotações) agregados no SQLite.
+
+    `bucket_format` é o formato do strftime que define o período (padrão: por hora).
+    """
+    conn = connect_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT g.bucket, CAST(f.bid AS REAL), g.high, g.low, CAST(l.bid AS REAL), g.n
+            FROM (
+                SELECT strftime(?, date_hour) AS bucket, MIN(id) AS first_id, MAX(id) AS last_id,
+                       MAX(CAST(bid AS REAL)) AS high, MIN(CAST(bid AS REAL)) AS low, COUNT(*) AS n
+                FROM dollar
+                WHERE date_hour >= ? AND bid > 0
+                GROUP BY bucket
+            ) AS g
+            JOIN dollar AS f ON f.id = g.first_id
+            JOIN dollar AS l ON l.id = g.last_id
+            ORDER BY g.bucket
+        """, (bucket_format, start.isoformat(sep=' ')))
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao obter candles da cotação: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_dollar_daily_closes(start: datetime = None):
+    """Último bid de cada dia como (dia, bid), mais o último bid anterior a `start` (valor no primeiro dia)."""
+    start = start.isoformat(sep=' ') if start else ''
+    conn = connect_db()
+    try:
+        cursor = conn.cursor()
+        # Com um único MAX(), o SQLite devolve as colunas sem agregação da linha do máximo
+        cursor.execute("""
+            SELECT substr(MAX(date_hour), 1, 10), CAST(bid AS REAL) FROM dollar
+            WHERE date_hour < ? AND bid > 0
+            UNION ALL
+            SELECT day, bid FROM (
+                SELECT substr(date_hour, 1, 10) AS day, CAST(bid AS REAL) AS bid, MAX(date_hour) FROM dollar
+                WHERE date_hour >= ? AND bid > 0
+                GROUP BY day
+            )
+        """, (start, start))
+        return [row for row in cursor.fetchall() if row[0] is not None]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao obter fechamentos diários do dólar: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_dollar_changes(after_id: int):
+    """(maior id, data mais antiga) das cotações gravadas depois de `after_id`."""
+    conn = connect_db()
+    try:
+        max_id, min_date = conn.execute("SELECT MAX(id), MIN(date_hour) FROM dollar WHERE id > ?",
+                                        (after_id,)).fetchone()
+        return max_id or after_id, datetime.fromisoformat(str(min_date)) if min_date else None
+    finally:
+        conn.close()
+
+
+def _load_stats(conn) -> RollingStats:
+    """Carrega o estado das estatísticas uma vez por processo.
+
+    Sem estado salvo, reconstrói a partir das cotações do dia e das últimas
+    cotações necessárias para preencher as janelas (apenas na primeira vez).
+    """
+    global _stats
+    if _stats is not None:
+        return _stats
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT state FROM dollar_stats WHERE name = ?", (STATS_NAME,))
+    row = cursor.fetchone()
+    if row:
+        try:
+            _stats = RollingStats.from_state(json.loads(row[0]))
+            return _stats
+        except (ValueError, KeyError) as e:
+            logging.error(f"Estado das estatísticas inválido, reconstruindo: {e}")
+
+    stats = RollingStats()
+    max_window = max(stats.windows)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    cursor.execute("""
+        SELECT bid, date_hour FROM dollar
+        WHERE id > (SELECT COALESCE(MAX(id), 0) FROM dollar) - ? OR date_hour >= ?
+        ORDER BY id
+    """, (max_window, today))
+    for bid, date_hour in cursor.fetchall():
+        stats.push(bid, datetime.fromisoformat(str(date_hour)))
+    _stats = stats
+    return _stats
+
+
+def _save_stats(conn, stats: RollingStats) -> None:
+    conn.execute("""
+        INSERT INTO dollar_stats (name, state, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at
+    """, (STATS_NAME, json.dumps(stats.to_state()), datetime.now()))
+
+
+def get_dollar_stats() -> dict:
+    """Retorna o snapshot das estatísticas da cotação sem consultar o histórico.
+
+    Lê o estado persistido, que pode ter sido gravado por outro processo (o coletor).
+    """
+    conn = connect_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT state FROM dollar_stats WHERE name = ?", (STATS_NAME,))
+        row = cursor.fetchone()
+        if row:
+            return RollingStats.from_state(json.loads(row[0])).snapshot()
+        with _stats_lock:
+            return _load_stats(conn).snapshot()
+    except (sqlite3.Error, ValueError, KeyError) as e:
+        logging.error(f"Erro ao obter estatísticas da cotação: {e}")
+        return RollingStats().snapshot()
+    finally:
+        conn.close()
+
+
 def init_db():
     conn = connect_db()
     if conn is not None:
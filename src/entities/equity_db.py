@@ -0,0 +1,134 @@
+import sqlite3
+import os
+from typing import Dict, Iterable, List, Optional
+
+
+class EquityCurveRepository:
+    """Cache diário da curva de patrimônio da carteira.
+
+    Guarda um ponto por conta e dia (valor em dólares, fluxo de caixa do dia e câmbio) e os
+    marcadores dos dados de origem (últimos ids lidos do livro de transações, das
+    barras e das cotações), usados para saber a partir de que dia recalcular. A posição
+    de fechamento de cada dia (quantidade e preço por conta e símbolo) também fica gravada,
+    para que o recálculo comece do dia anterior sem reprocessar o livro inteiro.
+    """
+
+    def __init__(self, db_path: str = "data/db/equity.db"):
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.create_tables()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def create_tables(self):
+        """Create the equity curve tables if they don't exist"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        # Cache anterior às contas: é descartado e recalculado a partir do livro de transações
+        cursor.execute("PRAGMA table_info(equity_curve)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if columns and "account" not in columns:
+            cursor.execute("DROP TABLE equity_curve")
+            cursor.execute("DROP TABLE IF EXISTS equity_meta")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS equity_curve (
+                day TEXT NOT NULL,
+                account TEXT NOT NULL,
+                value_usd REAL NOT NULL,
+                flow_usd REAL NOT NULL,
+                fx REAL,
+                PRIMARY KEY (day, account)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS equity_holdings (
+                day TEXT NOT NULL,
+                account TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                shares REAL NOT NULL,
+                price REAL,
+                PRIMARY KEY (day, account, symbol)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS equity_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def get_points(self, start_day: str = None) -> List[tuple]:
+        """Get the cached (day, account, value_usd, flow_usd, fx) points ordered by day and account"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT day, account, value_usd, flow_usd, fx FROM equity_curve WHERE day >= ? ORDER BY day, account
+        """, (start_day or '',))
+        results = cursor.fetchall()
+        conn.close()
+        return results
+
+    def get_holdings(self, day: str) -> List[tuple]:
+        """Get the closing (account, symbol, shares, price) holdings of `day`"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT account, symbol, shares, price FROM equity_holdings WHERE day = ? ORDER BY account, symbol
+        """, (day,))
+        results = cursor.fetchall()
+        conn.close()
+        return results
+
+    def get_last_day(self) -> Optional[str]:
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(day) FROM equity_curve")
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result else None
+
+    def get_meta(self) -> Dict[str, int]:
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT key, value FROM equity_meta")
+        results = cursor.fetchall()
+        conn.close()
+        return dict(results)
+
+    def replace_from(self, start_day: str, points: Iterable[tuple], holdings: Iterable[tuple],
+                     meta: Dict[str, int]) -> None:
+        """Replace every point and holding from `start_day` on and save the source markers in one transaction"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM equity_curve WHERE day >= ?", (start_day,))
+                conn.execute("DELETE FROM equity_holdings WHERE day >= ?", (start_day,))
+                conn.executemany("""
+                    INSERT INTO equity_curve (day, account, value_usd, flow_usd, fx) VALUES (?, ?, ?, ?, ?)
+                """, points)
+                conn.executemany("""
+                    INSERT INTO equity_holdings (day, account, symbol, shares, price) VALUES (?, ?, ?, ?, ?)
+                """, holdings)
+                conn.executemany("""
+                    INSERT INTO equity_meta (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """, meta.items())
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM equity_curve")
+                conn.execute("DELETE FROM equity_holdings")
+                conn.execute("DELETE FROM equity_meta")
+        finally:
+            conn.close()
@@ -0,0 +1,482 @@
+import sqlite3
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from src.model.account import DEFAULT_ACCOUNT
+
+TRADE_TYPES = ("buy", "sell", "fee", "split")
+COST_METHODS = ("fifo", "average")
+
+
+@dataclass
+class Trade:
+    symbol: str
+    trade_type: str  # buy, sell, fee ou split
+    quantity: float  # no split, é a razão (ex.: 2.0 para um desdobramento 2:1)
+    price: float
+    trade_date: datetime
+    fees: float = 0.0
+    notes: str = ""
+    account: str = DEFAULT_ACCOUNT
+    id: Optional[int] = None
+
+
+@dataclass
+class Position:
+    symbol: str
+    account: str = DEFAULT_ACCOUNT
+    shares: float = 0.0
+    cost_basis: float = 0.0
+    realized_pnl: float = 0.0
+    fees: float = 0.0
+    trade_count: int = 0
+    last_trade_date: Optional[datetime] = None
+    last_trade_id: Optional[int] = None
+
+    @property
+    def average_cost(self) -> float:
+        return self.cost_basis / self.shares if self.shares else 0.0
+
+
+class LedgerRepository:
+    """Livro de transações por lote com posições mantidas incrementalmente.
+
+    Cada transação nova atualiza o agregado da posição (quantidade, custo e lucro
+    realizado) na mesma transação do banco, sem reprocessar o livro. Apenas uma
+    transação com data anterior à última do símbolo força o reprocessamento
+    daquele símbolo. Posições e lotes são separados por conta: o mesmo símbolo
+    pode estar em várias contas.
+    """
+
+    def __init__(self, db_path: str = "data/db/ledger.db", cost_method: str = "fifo"):
+        if cost_method not in COST_METHODS:
+            raise ValueError(f"Método de custo inválido: {cost_method}")
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.cost_method = cost_method
+        self.create_tables()
+
+    def _connect(self):
+        # Várias sessões podem registrar transações ao mesmo tempo: espera o lock em vez de falhar
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def create_tables(self):
+        """Create the ledger tables if they don't exist"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                trade_type TEXT NOT NULL CHECK (trade_type IN ('buy', 'sell', 'fee', 'split')),
+                quantity REAL NOT NULL DEFAULT 0,
+                price REAL NOT NULL DEFAULT 0,
+                fees REAL NOT NULL DEFAULT 0,
+                trade_date TIMESTAMP NOT NULL,
+                notes TEXT,
+                account TEXT NOT NULL DEFAULT '{DEFAULT_ACCOUNT}',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_trades_symbol_date
+            ON trades(symbol, trade_date, id)
+        """)
+
+        # Livros anteriores às contas: as transações ficam na conta padrão e as posições e
+        # os lotes (derivados das transações) são recriados com a conta e reprocessados
+        cursor.execute("PRAGMA table_info(trades)")
+        migrate = "account" not in [column[1] for column in cursor.fetchall()]
+        if migrate:
+            cursor.execute(f"ALTER TABLE trades ADD COLUMN account TEXT NOT NULL DEFAULT '{DEFAULT_ACCOUNT}'")
+            cursor.execute("DROP TABLE IF EXISTS positions")
+            cursor.execute("DROP TABLE IF EXISTS lots")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_trades_account_symbol_date
+            ON trades(account, symbol, trade_date, id)
+        """)
+        # Curva de patrimônio: transações a partir de um dia
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_date ON trades(trade_date, id)")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS positions (
+                account TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                shares REAL NOT NULL DEFAULT 0,
+                cost_basis REAL NOT NULL DEFAULT 0,
+                realized_pnl REAL NOT NULL DEFAULT 0,
+                fees REAL NOT NULL DEFAULT 0,
+                trade_count INTEGER NOT NULL DEFAULT 0,
+                last_trade_date TIMESTAMP,
+                last_trade_id INTEGER,
+                PRIMARY KEY (account, symbol)
+            )
+        """)
+
+        # Lotes abertos por conta e símbolo, consumidos do mais antigo para o mais novo no FIFO
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                account TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                trade_id INTEGER NOT NULL,
+                quantity REAL NOT NULL,
+                unit_cost REAL NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_lots_account_symbol
+            ON lots(account, symbol, id)
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ledger_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        cursor.execute("SELECT value FROM ledger_meta WHERE key = 'cost_method'")
+        row = cursor.fetchone()
+        conn.commit()
+        conn.close()
+
+        # Mudar o método de custo invalida os agregados salvos
+        if row is None:
+            self.set_meta("cost_method", self.cost_method)
+        if migrate or (row is not None and row[0] != self.cost_method):
+            self.rebuild_all()
+            self.set_meta("cost_method", self.cost_method)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM ledger_meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def set_meta(self, key: str, value: str):
+        conn = self._connect()
+        conn.execute("""
+            INSERT INTO ledger_meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """, (key, value))
+        conn.commit()
+        conn.close()
+
+    def record_trade(self, trade: Trade) -> int:
+        """Save a trade and update its position in a single transaction"""
+        return self.record_trades([trade])[0]
+
+    def record_trades(self, trades: List[Trade], if_absent: bool = False) -> List[int]:
+        """Save several trades and update their positions in a single transaction
+
+        With `if_absent`, a trade is skipped when its account and symbol already have
+        trades (checked inside the transaction, so concurrent callers record it once).
+        Returns the ids of the saved trades.
+        """
+        conn = self._connect()
+        try:
+            # Reserva a escrita antes de ler as posições, evitando atualizações perdidas
+            conn.execute("BEGIN IMMEDIATE")
+            positions = {}
+            rebuild = set()
+            ids = []
+            for trade in trades:
+                self._validate(trade)
+                if if_absent and conn.execute("SELECT 1 FROM trades WHERE account = ? AND symbol = ? LIMIT 1",
+                                              (trade.account, trade.symbol)).fetchone():
+                    continue
+                trade_id = self._insert_trade(conn, trade)
+                ids.append(trade_id)
+
+                key = (trade.account, trade.symbol)
+                if key in rebuild:
+                    continue
+                if key not in positions:
+                    positions[key] = self._load_position(conn, trade.account, trade.symbol)
+                position = positions[key]
+
+                if position.last_trade_date and trade.trade_date < position.last_trade_date:
+                    # Transação retroativa: o símbolo é reprocessado ao final
+                    rebuild.add(key)
+                    continue
+                trade.id = trade_id
+                self._apply(conn, position, trade)
+
+            for key, position in positions.items():
+                if key not in rebuild:
+                    self._save_position(conn, position)
+            for account, symbol in rebuild:
+                self._rebuild(conn, account, symbol)
+            conn.commit()
+            return ids
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def get_position(self, symbol: str, account: str = DEFAULT_ACCOUNT) -> Optional[Position]:
+        conn = self._connect()
+        try:
+            position = self._load_position(conn, account, symbol)
+            return position if position.trade_count else None
+        finally:
+            conn.close()
+
+    def get_positions(self) -> List[Position]:
+        """Get the aggregated position of every symbol (one row per account and symbol)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT symbol, shares, cost_basis, realized_pnl, fees, trade_count, last_trade_date, last_trade_id,
+                   account
+            FROM positions ORDER BY account, symbol
+        """)
+        rows = cursor.fetchall()
+        conn.close()
+        return [self._position_from_row(row) for row in rows]
+
+    def get_trades_since(self, start_date: datetime) -> List[Trade]:
+        """Get the trades of every account and symbol from `start_date` on, ordered by date"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, symbol, trade_type, quantity, price, fees, trade_date, notes, account
+            FROM trades WHERE trade_date >= ? ORDER BY trade_date, id
+        """, (start_date.isoformat(),))
+        rows = cursor.fetchall()
+        conn.close()
+        return [self._trade_from_row(row) for row in rows]
+
+    def get_summary(self) -> Tuple[int, int, Optional[datetime]]:
+        """Get (trade count, max id, first trade date) of the whole ledger"""
+        conn = self._connect()
+        try:
+            count, max_id, first_date = conn.execute(
+                "SELECT COUNT(*), MAX(id), MIN(trade_date) FROM trades").fetchone()
+        finally:
+            conn.close()
+        return count, max_id or 0, datetime.fromisoformat(first_date) if first_date else None
+
+    def get_changes_since(self, after_id: int) -> Tuple[int, Optional[datetime]]:
+        """Get (count, earliest trade date) of the trades inserted after `after_id`"""
+        conn = self._connect()
+        try:
+            count, min_date = conn.execute("SELECT COUNT(*), MIN(trade_date) FROM trades WHERE id > ?",
+                                           (after_id,)).fetchone()
+        finally:
+            conn.close()
+        return count, datetime.fromisoformat(min_date) if min_date else None
+
+    def get_symbols(self) -> List[str]:
+        """Get the symbols with trades in any account"""
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute("SELECT DISTINCT symbol FROM trades ORDER BY symbol")]
+        finally:
+            conn.close()
+
+    def delete_symbol(self, symbol: str, account: str = DEFAULT_ACCOUNT) -> None:
+        """Remove all trades, lots and the position of a symbol in an account"""
+        conn = self._connect()
+        for table in ("trades", "lots", "positions"):
+            conn.execute(f"DELETE FROM {table} WHERE account = ? AND symbol = ?", (account, symbol))
+        conn.commit()
+        conn.close()
+
+    def rebuild_position(self, symbol: str, account: str = DEFAULT_ACCOUNT) -> None:
+        """Replay the trades of a single symbol to rebuild its position"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._rebuild(conn, account, symbol)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def rebuild_all(self) -> None:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT account, symbol FROM trades")
+            for account, symbol in cursor.fetchall():
+                self._rebuild(conn, account, symbol)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _validate(self, trade: Trade) -> None:
+        if trade.trade_type not in TRADE_TYPES:
+            raise ValueError(f"Tipo de transação inválido: {trade.trade_type}")
+        if trade.trade_type in ("buy", "sell", "split") and trade.quantity <= 0:
+            raise ValueError(f"Quantidade inválida para {trade.trade_type}: {trade.quantity}")
+        if trade.price < 0 or trade.fees < 0:
+            raise ValueError("Preço e taxas não podem ser negativos")
+
+    def _apply(self, conn, position: Position, trade: Trade) -> None:
+        """Update the running aggregate of a position with one trade"""
+        if trade.trade_type == "buy":
+            cost = trade.quantity * trade.price + trade.fees
+            position.shares += trade.quantity
+            position.cost_basis += cost
+            if self.cost_method == "fifo":
+                conn.execute("""
+                    INSERT INTO lots (account, symbol, trade_id, quantity, unit_cost) VALUES (?, ?, ?, ?, ?)
+                """, (trade.account, trade.symbol, trade.id, trade.quantity, cost / trade.quantity))
+
+        elif trade.trade_type == "sell":
+            if trade.quantity > position.shares + 1e-9:
+                raise ValueError(
+                    f"Venda de {trade.quantity} {trade.symbol} maior que a posição ({position.shares})")
+            if self.cost_method == "fifo":
+                cost_sold = self._consume_lots(conn, trade.account, trade.symbol, trade.quantity)
+            else:
+                cost_sold = position.average_cost * trade.quantity
+            proceeds = trade.quantity * trade.price - trade.fees
+            position.shares -= trade.quantity
+            position.cost_basis -= cost_sold
+            position.realized_pnl += proceeds - cost_sold
+            if position.shares <= 1e-9:
+                position.shares = 0.0
+                position.cost_basis = 0.0
+
+        elif trade.trade_type == "fee":
+            position.realized_pnl -= trade.fees + trade.quantity * trade.price
+
+        elif trade.trade_type == "split":
+            position.shares *= trade.quantity
+            if self.cost_method == "fifo":
+                conn.execute("""
+                    UPDATE lots SET quantity = quantity * ?, unit_cost = unit_cost / ?
+                    WHERE account = ? AND symbol = ?
+                """, (trade.quantity, trade.quantity, trade.account, trade.symbol))
+
+        position.fees += trade.fees
+        position.trade_count += 1
+        position.last_trade_date = trade.trade_date
+        position.last_trade_id = trade.id
+
+    def _consume_lots(self, conn, account: str, symbol: str, quantity: float) -> float:
+        """Consume open lots oldest-first and return the cost of the shares sold.
+
+        Only the lots actually touched by the sale are read.
+        """
+        cost = 0.0
+        remaining = quantity
+        cursor = conn.cursor()
+        while remaining > 1e-9:
+            cursor.execute("""
+                SELECT id, quantity, unit_cost FROM lots WHERE account = ? AND symbol = ? ORDER BY id LIMIT 1
+            """, (account, symbol))
+            lot = cursor.fetchone()
+            if lot is None:
+                break
+            lot_id, lot_quantity, unit_cost = lot
+            taken = min(lot_quantity, remaining)
+            cost += taken * unit_cost
+            remaining -= taken
+            if lot_quantity - taken <= 1e-9:
+                conn.execute("DELETE FROM lots WHERE id = ?", (lot_id,))
+            else:
+                conn.execute("UPDATE lots SET quantity = ? WHERE id = ?", (lot_quantity - taken, lot_id))
+        return cost
+
+    def _load_position(self, conn, account: str, symbol: str) -> Position:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT symbol, shares, cost_basis, realized_pnl, fees, trade_count, last_trade_date, last_trade_id,
+                   account
+            FROM positions WHERE account = ? AND symbol = ?
+        """, (account, symbol))
+        row = cursor.fetchone()
+        return self._position_from_row(row) if row else Position(symbol=symbol, account=account)
+
+    def _save_position(self, conn, position: Position) -> None:
+        conn.execute("""
+            INSERT INTO positions
+            (account, symbol, shares, cost_basis, realized_pnl, fees, trade_count, last_trade_date, last_trade_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(account, symbol) DO UPDATE SET
+                shares = excluded.shares,
+                cost_basis = excluded.cost_basis,
+                realized_pnl = excluded.realized_pnl,
+                fees = excluded.fees,
+                trade_count = excluded.trade_count,
+                last_trade_date = excluded.last_trade_date,
+                last_trade_id = excluded.last_trade_id
+        """, (
+            position.account,
+            position.symbol,
+            position.shares,
+            position.cost_basis,
+            position.realized_pnl,
+            position.fees,
+            position.trade_count,
+            position.last_trade_date.isoformat() if position.last_trade_date else None,
+            position.last_trade_id
+        ))
+
+    def _rebuild(self, conn, account: str, symbol: str) -> None:
+        conn.execute("DELETE FROM lots WHERE account = ? AND symbol = ?", (account, symbol))
+        conn.execute("DELETE FROM positions WHERE account = ? AND symbol = ?", (account, symbol))
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, symbol, trade_type, quantity, price, fees, trade_date, notes, account
+            FROM trades WHERE account = ? AND symbol = ? ORDER BY trade_date, id
+        """, (account, symbol))
+
+        position = Position(symbol=symbol, account=account)
+        for row in cursor.fetchall():
+            self._apply(conn, position, self._trade_from_row(row))
+        if position.trade_count:
+            self._save_position(conn, position)
+
+    def _insert_trade(self, conn, trade: Trade) -> int:
+        cursor = conn.execute("""
+            INSERT INTO trades (symbol, trade_type, quantity, price, fees, trade_date, notes, account)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            trade.symbol,
+            trade.trade_type,
+            trade.quantity,
+            trade.price,
+            trade.fees,
+            trade.trade_date.isoformat(),
+            trade.notes,
+            trade.account
+        ))
+        return cursor.lastrowid
+
+    @staticmethod
+    def _trade_from_row(row) -> Trade:
+        return Trade(
+            id=row[0],
+            symbol=row[1],
+            trade_type=row[2],
+            quantity=row[3],
+            price=row[4],
+            fees=row[5],
+            trade_date=datetime.fromisoformat(row[6]),
+            notes=row[7] or "",
+            account=row[8]
+        )
+
+    @staticmethod
+    def _position_from_row(row) -> Position:
+        return Position(
+            symbol=row[0],
+            shares=row[1],
+            cost_basis=row[2],
+            realized_pnl=row[3],
+            fees=row[4],
+            trade_count=row[5],
+            last_trade_date=datetime.fromisoformat(row[6]) if row[6] else None,
+            last_trade_id=row[7],
+            account=row[8]
+        )
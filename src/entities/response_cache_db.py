@@ -0,0 +1,191 @@
+import sqlite3
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# Acessos (accessed_at) acumulados em memória e gravados juntos, em uma única transação
+ACCESS_BATCH_SIZE = 100
+ACCESS_FLUSH_SECONDS = 30
+
+
+class ResponseCacheRepository:
+    """Respostas dos provedores gravadas em disco, com validade por entrada.
+
+    Cada entrada guarda a resposta serializada, o tipo de dado (que define a validade),
+    o tamanho em bytes e o último acesso, usado para descartar as menos usadas quando o
+    cache passa do tamanho máximo.
+
+    A leitura não escreve no banco: os acessos ficam em memória e são gravados em lote
+    (a cada ACCESS_BATCH_SIZE acessos ou ACCESS_FLUSH_SECONDS segundos, e antes de
+    qualquer descarte). O tamanho total é mantido por triggers na tabela responses_size,
+    então é o mesmo para todos os processos que usam o banco.
+    """
+
+    def __init__(self, db_path: str = "data/db/provider_cache.db"):
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self._accesses = {}
+        self._flushed_at = time.monotonic()
+        self._accesses_lock = threading.Lock()
+        self.create_tables()
+
+    def _connect(self):
+        # Coletor, dashboard e a linha de comando usam o mesmo banco: espera o lock em vez de falhar
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def create_tables(self):
+        """Create the response cache table if it doesn't exist"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        # Descarte das menos usadas
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        # Tamanho total mantido a cada gravação, em vez de somado a cada put
+        cursor.execute("CREATE TABLE IF NOT EXISTS responses_size (id INTEGER PRIMARY KEY CHECK (id = 1), "
+                       "total INTEGER NOT NULL)")
+        cursor.execute("INSERT OR IGNORE INTO responses_size (id, total) "
+                       "SELECT 1, COALESCE(SUM(size), 0) FROM responses")
+        cursor.executescript("""
+            CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+                UPDATE responses_size SET total = total + new.size WHERE id = 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN
+                UPDATE responses_size SET total = total + new.size - old.size WHERE id = 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+                UPDATE responses_size SET total = total - old.size WHERE id = 1;
+            END;
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a payload that has not expired yet and record the access (written in batches)"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            result = conn.execute("SELECT payload FROM responses WHERE key = ? AND expires_at > ?",
+                                  (key, now)).fetchone()
+            if result is None:
+                return None
+            with self._accesses_lock:
+                self._accesses[key] = now
+                due = (len(self._accesses) >= ACCESS_BATCH_SIZE
+                       or time.monotonic() - self._flushed_at >= ACCESS_FLUSH_SECONDS)
+            if due:
+                with conn:
+                    self._flush_accesses(conn)
+            return result[0]
+        finally:
+            conn.close()
+
+    def flush_accesses(self) -> None:
+        """Write the pending accesses now"""
+        conn = self._connect()
+        try:
+            with conn:
+                self._flush_accesses(conn)
+        finally:
+            conn.close()
+
+    def _flush_accesses(self, conn) -> None:
+        with self._accesses_lock:
+            accesses, self._accesses = self._accesses, {}
+            self._flushed_at = time.monotonic()
+        if accesses:
+            conn.executemany("UPDATE responses SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                             [(accessed_at, key) for key, accessed_at in accesses.items()])
+
+    def put(self, key: str, kind: str, payload: bytes, ttl: float, max_bytes: int = None) -> int:
+        """Save a payload valid for `ttl` seconds
+
+        With `max_bytes`, removes expired entries and then the least recently used ones
+        until the cache fits. Returns how many entries were evicted.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT INTO responses (key, kind, payload, size, created_at, expires_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET kind = excluded.kind, payload = excluded.payload,
+                        size = excluded.size, created_at = excluded.created_at,
+                        expires_at = excluded.expires_at, accessed_at = excluded.accessed_at
+                """, (key, kind, payload, len(payload), now, now + ttl, now))
+                if max_bytes is None:
+                    return 0
+                return self._evict(conn, max_bytes, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn, max_bytes: int, now: float) -> int:
+        total = self._total_size(conn)
+        if total <= max_bytes:
+            return 0
+        evicted = conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        total = self._total_size(conn)
+        if total > max_bytes:
+            # Os acessos pendentes definem quais são as menos usadas
+            self._flush_accesses(conn)
+            # Menos usadas primeiro, até caber
+            rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+            keys = []
+            for key, size in rows:
+                if total <= max_bytes:
+                    break
+                keys.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+            evicted += len(keys)
+        return evicted
+
+    @staticmethod
+    def _total_size(conn) -> int:
+        return conn.execute("SELECT total FROM responses_size WHERE id = 1").fetchone()[0]
+
+    def purge(self, kind: str = None, expired_only: bool = False) -> int:
+        """Delete entries (of one kind, or only the expired ones) and return how many were removed"""
+        conditions, params = [], []
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+        if expired_only:
+            conditions.append("expires_at <= ?")
+            params.append(time.time())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(f"DELETE FROM responses {where}", params).rowcount
+        finally:
+            conn.close()
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Entries, bytes and expired entries per kind"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT kind, COUNT(*), SUM(size), SUM(expires_at <= ?), MIN(created_at), MAX(created_at)
+            FROM responses GROUP BY kind ORDER BY kind
+        """, (time.time(),))
+        results = cursor.fetchall()
+        conn.close()
+        return {
+            kind: {"entries": entries, "bytes": size, "expired": expired, "oldest": oldest, "newest": newest}
+            for kind, entries, size, expired, oldest, newest in results
+        }
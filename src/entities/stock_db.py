@@ -1,10 +1,33 @@
 import sqlite3
-from datetime import datetime
-from dataclasses import dataclass
-from typing import Optional
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
 import os
 
-@dataclass
+import numpy as np
+
+STOCK_COLUMNS = ('symbol', 'price', 'volume', 'high', 'low', 'open', 'close', 'date')
+# Schema version (PRAGMA user_version) after dropping the rows of the old polling code
+SCHEMA_VERSION = 1
+# Days of legacy polling rows kept as daily closes: older than the 1m bar retention of
+# yfinance (29 days), so they are never mixed with backfilled bars
+LEGACY_HISTORY_DAYS = 30
+# NumPy dtype of every column that can be read in columnar form
+COLUMN_DTYPES = {
+    'id': np.int64,
+    'symbol': object,
+    'price': np.float64,
+    'volume': np.int64,
+    'high': np.float64,
+    'low': np.float64,
+    'open': np.float64,
+    'close': np.float64,
+    'date': 'datetime64[us]',
+    'created_at': 'datetime64[us]',
+}
+
+
+@dataclass(slots=True)
 class StockData:
     id: Optional[int]
     symbol: str
@@ -15,7 +38,23 @@ class StockData:
     open: float
     close: float
     date: datetime
-    created_at: datetime = datetime.now()
+    created_at: datetime = field(default_factory=datetime.now)
+
+    @classmethod
+    def from_row(cls, row) -> "StockData":
+        """Build an instance from a full `SELECT *` row"""
+        return cls(
+            id=row[0],
+            symbol=row[1],
+            price=row[2],
+            volume=row[3],
+            high=row[4],
+            low=row[5],
+            open=row[6],
+            close=row[7],
+            date=datetime.fromisoformat(row[8]),
+            created_at=datetime.fromisoformat(row[9])
+        )
 
 class StockDataRepository:
     def __init__(self, db_path: str = "data/db/stock_market.db"):
@@ -50,10 +89,39 @@ class StockDataRepository:
             CREATE INDEX IF NOT EXISTS idx_stock_symbol_date 
             ON stock_data(symbol, date)
         """)
+        # Exportação incremental das barras por data (ver src/services/export_service.py)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_date ON stock_data(date)")
         
         conn.commit()
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._drop_legacy_rows(conn)
         conn.close()
 
+    @staticmethod
+    def _drop_legacy_rows(conn):
+        """Remove the rows written by the old polling code (one-time migration)
+
+        They held the whole day's quote (daily volume included) stamped with the fetch
+        time (datetime.now(), so never on a whole minute), and would be summed with the
+        intraday bars of the same day and taken as the resume point of the bar fetch.
+        Within the bar retention they are dropped and the bars are backfilled; older
+        days keep their last row as the day's close.
+        """
+        cutoff = (datetime.now() - timedelta(days=LEGACY_HISTORY_DAYS)).date().isoformat()
+        with conn:
+            # With a single MAX(), SQLite returns the bare column (id) of the row holding the maximum
+            conn.execute("""
+                DELETE FROM stock_data
+                WHERE substr(date, 18) <> '00' AND (date >= :cutoff OR id NOT IN (
+                    SELECT id FROM (
+                        SELECT id, MAX(date) FROM stock_data
+                        WHERE substr(date, 18) <> '00' AND date < :cutoff
+                        GROUP BY symbol, substr(date, 1, 10)
+                    )
+                ))
+            """, {"cutoff": cutoff})
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
     def save_stock_data(self, stock: StockData):
         """Save stock data to the database"""
         conn = sqlite3.connect(self.db_path)
@@ -77,40 +145,261 @@ class StockDataRepository:
         conn.commit()
         conn.close()
 
-    def get_stock_data(self, symbol: str, start_date: datetime = None, end_date: datetime = None):
-        """Get stock data for a specific symbol and date range"""
+    def save_stock_data_batch(self, rows) -> int:
+        """Save many rows (tuples in STOCK_COLUMNS order) in a single transaction"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany(f"""
+                    INSERT OR REPLACE INTO stock_data ({', '.join(STOCK_COLUMNS)})
+                    VALUES ({', '.join('?' for _ in STOCK_COLUMNS)})
+                """, rows)
+            return len(rows)
+        finally:
+            conn.close()
+
+    def upsert_bars(self, rows) -> int:
+        """Insert or update bars (tuples in STOCK_COLUMNS order) keyed on (symbol, bar time)
+
+        Fetching the same bars again only overwrites them, so repeated polls never add rows.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany(f"""
+                    INSERT INTO stock_data ({', '.join(STOCK_COLUMNS)})
+                    VALUES ({', '.join('?' for _ in STOCK_COLUMNS)})
+                    ON CONFLICT(symbol, date) DO UPDATE SET
+                        price = excluded.price,
+                        volume = excluded.volume,
+                        high = excluded.high,
+                        low = excluded.low,
+                        open = excluded.open,
+                        close = excluded.close
+                """, rows)
+            return len(rows)
+        finally:
+            conn.close()
+
+    def get_last_bar_date(self, symbol: str) -> Optional[datetime]:
+        """Get the timestamp of the most recent stored bar of a symbol"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        
-        query = "SELECT * FROM stock_data WHERE symbol = ?"
+        cursor.execute("SELECT MAX(date) FROM stock_data WHERE symbol = ?", (symbol,))
+        result = cursor.fetchone()
+        conn.close()
+        return datetime.fromisoformat(result[0]) if result and result[0] else None
+
+    def get_session_summary(self, symbol: str) -> Optional[dict]:
+        """Aggregate the bars of the most recent stored day into a quote
+
+        Returns open (first bar), high, low, close (last bar), volume (sum) and the
+        time of the last bar, or None when the symbol has no data.
+        """
+        latest = self.get_latest_stock_data(symbol)
+        if latest is None:
+            return None
+
+        day_start = latest.date.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT open FROM stock_data
+            WHERE symbol = ? AND date >= ?
+            ORDER BY date
+            LIMIT 1
+        """, (symbol, day_start))
+        day_open = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT MAX(high), MIN(low), SUM(volume) FROM stock_data
+            WHERE symbol = ? AND date >= ?
+        """, (symbol, day_start))
+        high, low, volume = cursor.fetchone()
+        conn.close()
+
+        return {
+            'close': latest.close,
+            'open': day_open,
+            'high': high,
+            'low': low,
+            'volume': volume,
+            'date': latest.date,
+        }
+
+    def iter_stock_data(self, chunk_size: int = 10000):
+        """Iterate over all stored rows in chunks without loading the table in memory"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {', '.join(STOCK_COLUMNS)} FROM stock_data ORDER BY symbol, date")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def get_max_id(self) -> int:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(id) FROM stock_data")
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] or 0
+
+    def iter_settled_bars(self, after_id: int, until_id: int, after_date: datetime, until_date: datetime,
+                          chunk_size: int = 10000):
+        """Iterate in chunks, ordered by date, over the bars not exported yet
+
+        A bar is exported once its date is at most `until_date` (it no longer changes).
+        Bars left out by the last export are the ones dated after `after_date` plus the
+        ones inserted after `after_id` (backfilled); rows inserted after `until_id`
+        are left for the next export.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {', '.join(STOCK_COLUMNS)} FROM stock_data
+                WHERE id <= ? AND date <= ? AND (id > ? OR date > ?)
+                ORDER BY date
+            """, (until_id, until_date.isoformat(), after_id, after_date.isoformat()))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _range_query(columns: Iterable[str], symbol: str, start_date: datetime = None,
+                     end_date: datetime = None, ascending: bool = False):
+        query = f"SELECT {', '.join(columns)} FROM stock_data WHERE symbol = ?"
         params = [symbol]
-        
+
         if start_date:
             query += " AND date >= ?"
             params.append(start_date.isoformat())
-        
+
         if end_date:
             query += " AND date <= ?"
             params.append(end_date.isoformat())
-        
-        query += " ORDER BY date DESC"
-        
+
+        query += f" ORDER BY date {'ASC' if ascending else 'DESC'}"
+        return query, params
+
+    def get_stock_data(self, symbol: str, start_date: datetime = None, end_date: datetime = None):
+        """Get stock data for a specific symbol and date range"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        query, params = self._range_query("*", symbol, start_date, end_date)
         cursor.execute(query, params)
         results = cursor.fetchall()
         conn.close()
-        
-        return [StockData(
-            id=row[0],
-            symbol=row[1],
-            price=row[2],
-            volume=row[3],
-            high=row[4],
-            low=row[5],
-            open=row[6],
-            close=row[7],
-            date=datetime.fromisoformat(row[8]),
-            created_at=datetime.fromisoformat(row[9])
-        ) for row in results]
+
+        return [StockData.from_row(row) for row in results]
+
+    def get_stock_columns(self, symbol: str, start_date: datetime = None, end_date: datetime = None,
+                          columns: Iterable[str] = STOCK_COLUMNS, ascending: bool = False,
+                          chunk_size: int = 10000) -> Dict[str, np.ndarray]:
+        """Get stock data as one typed NumPy array per column, without building row objects
+
+        Only the requested `columns` are selected. Rows are fetched in chunks, so the
+        intermediate Python tuples never hold more than `chunk_size` rows; timestamps are
+        parsed by NumPy instead of one datetime.fromisoformat call per value.
+        """
+        columns = list(columns)
+        unknown = [name for name in columns if name not in COLUMN_DTYPES]
+        if not columns or unknown:
+            raise ValueError(f"Invalid columns {unknown or columns}. Options: {', '.join(COLUMN_DTYPES)}")
+
+        query, params = self._range_query(columns, symbol, start_date, end_date, ascending)
+        chunks = {name: [] for name in columns}
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for name, values in zip(columns, zip(*rows)):
+                    chunks[name].append(np.array(values, dtype=COLUMN_DTYPES[name]))
+        finally:
+            conn.close()
+
+        return {
+            name: np.concatenate(parts) if parts else np.array([], dtype=COLUMN_DTYPES[name])
+            for name, parts in chunks.items()
+        }
+
+    def get_daily_closes(self, symbols: Iterable[str], start: datetime = None) -> list:
+        """Get the close of the last bar of each day as (symbol, day, close), aggregated in SQLite
+
+        With `start`, also returns the last close before it for each symbol (the as-of
+        price on the first day), so the caller never needs to read older bars.
+        """
+        symbols = list(symbols)
+        if not symbols:
+            return []
+        placeholders = ', '.join('?' for _ in symbols)
+        start = start.isoformat() if start else ''
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        # With a single MAX(), SQLite returns the bare columns (close) of the row holding the maximum
+        cursor.execute(f"""
+            SELECT symbol, substr(MAX(date), 1, 10), close FROM stock_data
+            WHERE symbol IN ({placeholders}) AND date < ?
+            GROUP BY symbol
+            UNION ALL
+            SELECT symbol, day, close FROM (
+                SELECT symbol, substr(date, 1, 10) AS day, close, MAX(date) FROM stock_data
+                WHERE symbol IN ({placeholders}) AND date >= ?
+                GROUP BY symbol, day
+            )
+        """, (*symbols, start, *symbols, start))
+        results = cursor.fetchall()
+        conn.close()
+        return [row for row in results if row[1] is not None]
+
+    def get_changes_since(self, after_id: int, symbols: Iterable[str]):
+        """Get (max id, earliest bar date among `symbols`) of the rows inserted after `after_id`
+
+        Updated bars keep their id, so this only sees new bars (including backfilled days).
+        """
+        symbols = list(symbols)
+        placeholders = ', '.join('?' for _ in symbols) or "NULL"
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT MAX(id), MIN(CASE WHEN symbol IN ({placeholders}) THEN date END)
+            FROM stock_data WHERE id > ?
+        """, (*symbols, after_id))
+        max_id, min_date = cursor.fetchone()
+        conn.close()
+        return max_id or after_id, datetime.fromisoformat(min_date) if min_date else None
+
+    def get_latest_stock_data(self, symbol: str) -> Optional[StockData]:
+        """Get the most recent stored row for a given symbol"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT * FROM stock_data
+            WHERE symbol = ?
+            ORDER BY date DESC
+            LIMIT 1
+        """, (symbol,))
+
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        return StockData.from_row(row)
 
     def get_latest_stock_price(self, symbol: str) -> Optional[float]:
         """Get the latest stock price for a given symbol"""
@@ -0,0 +1,265 @@
+"""Teste de carga do dashboard com várias sessões simultâneas.
+
+Simula N usuários com o dashboard aberto, cada um executando reruns seguidos do
+script (o mesmo ciclo de `carregar_dados`), enquanto um coletor grava cotações
+em segundo plano. Os provedores (yfinance e AwesomeAPI) são substituídos por
+geradores locais com latência configurável, então o teste não usa a rede e
+roda em um diretório temporário, sem tocar nos bancos em data/db. Com --tape,
+os provedores respondem a partir de uma gravação (ver src/services/provider_tape.py).
+
+Mede a latência dos reruns (p50, p95 e máximo) e a memória retida por sessão.
+
+Uso:
+    python -m src.load_test [--sessions 10] [--reruns 5] [--latency 0.05]
+    python -m src.load_test --tape data/tapes/pregao --speed 390
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Arquivos que o dashboard precisa no diretório de trabalho
+FIXTURES = ("data/sql/finance.sql", "data/db/assets.json", "app/images")
+
+
+class ProviderStandIn:
+    """Substitui os provedores por um passeio aleatório local com latência fixa."""
+
+    def __init__(self, latency: float = 0.05, seed: int = 42):
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.prices = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _request(self) -> None:
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+
+    def _step(self, key: str, start: float) -> float:
+        with self._lock:
+            price = self.prices.get(key, start) * (1 + self.random.gauss(0, 0.001))
+            self.prices[key] = price
+            return price
+
+    def fetch_intraday_bars(self, symbol: str, interval: str = "1m", since: datetime = None) -> list:
+        # Uma barra por minuto desde a última salva (no máximo uma hora), como o yfinance
+        self._request()
+        now = datetime.now().replace(second=0, microsecond=0)
+        start = max(since or now, now - timedelta(hours=1)).replace(second=0, microsecond=0)
+        rows = []
+        while start <= now:
+            price = self._step(symbol, 100.0)
+            rows.append((symbol, price, 1000, price * 1.001, price * 0.999, price, price, start.isoformat()))
+            start += timedelta(minutes=1)
+        return rows
+
+    def fetch_corporate_actions(self, symbol: str, since: datetime = None) -> list:
+        self._request()
+        return []
+
+    def fetch_currency(self, coin: str) -> dict:
+        self._request()
+        bid = self._step(coin, 5.5)
+        return {coin: {
+            'code': coin[:3], 'codein': coin[3:], 'name': coin,
+            'high': f"{bid * 1.01:.4f}", 'low': f"{bid * 0.99:.4f}", 'varBid': "0",
+            'pctChange': "0", 'bid': f"{bid:.4f}", 'ask': f"{bid * 1.001:.4f}",
+        }}
+
+    def install(self) -> None:
+        """Troca as funções de consulta nos módulos que as importaram."""
+        import src.collector
+        import src.services.dividend_service
+        import src.services.market_data_service
+        import src.services.stock_service
+
+        for module in (src.services.market_data_service, src.services.stock_service,
+                       src.services.dividend_service, src.collector):
+            for name in ("fetch_intraday_bars", "fetch_corporate_actions", "fetch_currency"):
+                if hasattr(module, name):
+                    setattr(module, name, getattr(self, name))
+
+
+def _session_script():
+    # Executado pelo AppTest a cada rerun, como o bloco __main__ de app/dashboard.py
+    from app.dashboard import carregar_dados, initialize_default_values, logo, tabs
+    initialize_default_values()
+    logo()
+    tabs()
+    carregar_dados()
+
+
+def prepare_workdir() -> Path:
+    """Cria um diretório temporário com os arquivos de que o dashboard precisa."""
+    workdir = Path(tempfile.mkdtemp(prefix="dashboard-load-"))
+    for fixture in FIXTURES:
+        source, target = ROOT / fixture, workdir / fixture
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if source.is_dir():
+            shutil.copytree(source, target)
+        elif source.exists():
+            shutil.copy(source, target)
+    return workdir
+
+
+def _run_session(reruns: int, latencies: list, errors: list, start: threading.Barrier) -> None:
+    """Uma sessão: executa `carregar_dados` (a parte de dados de cada rerun) `reruns` vezes."""
+    from app.dashboard import carregar_dados
+    start.wait()
+    for _ in range(reruns):
+        began = time.perf_counter()
+        try:
+            carregar_dados()
+        except Exception as e:
+            errors.append(repr(e))
+            continue
+        latencies.append(time.perf_counter() - began)
+
+
+def _summary(latencies) -> dict:
+    if not latencies:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(latencies)
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "max": ordered[-1],
+    }
+
+
+def run_load_test(sessions: int, reruns: int, latency: float, interval: float, timeout: float,
+                  tape: str = None, speed: float = 1.0) -> dict:
+    """Executa o teste no diretório de trabalho atual e retorna as métricas.
+
+    O AppTest usa um runtime global do Streamlit e não roda scripts em paralelo,
+    então a concorrência é medida em duas etapas: as N sessões executam a parte
+    de dados do rerun ao mesmo tempo (em threads, como o servidor faz) e depois
+    cada sessão executa o script completo no AppTest, que mede a renderização e
+    a memória retida (session_state e árvore de elementos) por sessão.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    from src.collector import Collector
+    from src.resources import close_all
+    from src.services import provider_tape
+    from src.services.ttl_cache import cache_stats
+
+    if tape:
+        provider_tape.install("replay", tape, speed)
+        providers = None
+    else:
+        providers = ProviderStandIn(latency=latency)
+        providers.install()
+
+    collector = Collector(interval=interval)
+    collector.tick()  # Garante dados no banco antes da primeira sessão
+    collector_thread = threading.Thread(target=collector.run, name="collector", daemon=True)
+    collector_thread.start()
+
+    try:
+        # Aquecimento: importa os módulos e cria os recursos compartilhados
+        AppTest.from_function(_session_script, default_timeout=timeout).run()
+
+        latencies, errors = [], []
+        start = threading.Barrier(sessions)
+        threads = [threading.Thread(target=_run_session, args=(reruns, latencies, errors, start))
+                   for _ in range(sessions)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        # Rerun completo de cada sessão; a memória fica retida enquanto as sessões existem
+        render_latencies = []
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        kept = []
+        for _ in range(sessions):
+            session = AppTest.from_function(_session_script, default_timeout=timeout)
+            began_render = time.perf_counter()
+            session.run()
+            render_latencies.append(time.perf_counter() - began_render)
+            errors.extend(exception.message for exception in session.exception)
+            kept.append(session)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+    finally:
+        collector.stop()
+        collector_thread.join(timeout=interval + 5)
+        close_all()
+
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "errors": errors,
+        "elapsed": elapsed,
+        "data": _summary(latencies),
+        "render": _summary(render_latencies),
+        "memory_per_session": retained / sessions,
+        "collector_ticks": collector.ticks,
+        "provider_calls": providers.calls if providers else None,
+        "caches": cache_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard com sessões simultâneas")
+    parser.add_argument("--sessions", type=int, default=10, help="Sessões simultâneas")
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns por sessão")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência simulada dos provedores (s)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Intervalo do coletor (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Tempo máximo de um rerun (s)")
+    parser.add_argument("--tape", default=None, help="Reproduz uma gravação dos provedores em vez de simulá-los")
+    parser.add_argument("--speed", type=float, default=1.0, help="Aceleração da reprodução (com --tape)")
+    parser.add_argument("--keep", action="store_true", help="Mantém o diretório temporário")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    # Fora do AppTest as threads rodam sem ScriptRunContext e o Streamlit avisa a cada chamada
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    tape = str(Path(args.tape).resolve()) if args.tape else None
+    workdir = prepare_workdir()
+    os.chdir(workdir)
+    sys.path.insert(0, str(ROOT))
+    try:
+        result = run_load_test(args.sessions, args.reruns, args.latency, args.interval, args.timeout,
+                               tape=tape, speed=args.speed)
+    finally:
+        os.chdir(ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Sessões: {result['sessions']}  reruns: {result['reruns']}  em {result['elapsed']:.1f}s")
+    for label, key in (("Dados do rerun (concorrente)", "data"), ("Rerun completo (AppTest, com tracemalloc)", "render")):
+        print(f"{label}: p50 {result[key]['p50'] * 1000:.0f} ms  "
+              f"p95 {result[key]['p95'] * 1000:.0f} ms  máx {result[key]['max'] * 1000:.0f} ms")
+    print(f"Memória por sessão: {result['memory_per_session'] / 1024:.0f} KiB (com tracemalloc)")
+    calls = "gravação" if result["provider_calls"] is None else f"{result['provider_calls']} consulta(s) simulada(s)"
+    print(f"Coletor: {result['collector_ticks']} ciclo(s), provedores: {calls}")
+    for name, stats in result["caches"].items():
+        print(f"Cache {name}: {stats['hits']} acerto(s), {stats['misses']} falta(s), "
+              f"{stats['evictions']} descarte(s), {stats['entries']} entrada(s)")
+    if result["errors"]:
+        print(f"Erros ({len(result['errors'])}):")
+        for error in result["errors"][:10]:
+            print(f"  - {error}")
+    if args.keep:
+        print(f"Diretório de trabalho: {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# Conta (corretora, pessoal, empresa...) dos registros sem conta informada, incluindo os
+# anteriores à separação por conta
+DEFAULT_ACCOUNT = "Principal"
+
+
+def account_of(record: dict) -> str:
+    """Conta de um ativo cadastrado (dicionário do assets.json)."""
+    return record.get("account") or DEFAULT_ACCOUNT
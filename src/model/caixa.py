@@ -2,10 +2,13 @@ from pydantic import BaseModel, Field
 from decimal import Decimal
 from datetime import datetime
 
+from src.model.account import DEFAULT_ACCOUNT
+
 class CaixaModel(BaseModel):
     id: int | None = Field(default=None, description="ID do registro")
     valor: Decimal = Field(..., ge=0, description="Valor total do caixa")
     date: datetime = Field(default_factory=datetime.now, description="Data do registro")
+    account: str = Field(default=DEFAULT_ACCOUNT, min_length=1, description="Conta do caixa")
 
     class Config:
         populate_by_name = True
@@ -15,4 +18,4 @@ class CaixaModel(BaseModel):
         }
 
     def __str__(self):
-        return f"CaixaModel(id={self.id}, valor={self.valor}, date={self.date})" 
\ No newline at end of file
+        return f"CaixaModel(id={self.id}, valor={self.valor}, date={self.date}, account={self.account})" 
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""Recursos compartilhados por processo (serviços e repositórios).
+
+Cada recurso é criado uma única vez por processo, na primeira chamada do seu
+getter, e reutilizado por todas as sessões do Streamlit e pelo coletor. Os
+recursos registrados aqui precisam ser thread-safe. `close_all` é chamado na
+saída do processo.
+"""
+import atexit
+import functools
+import logging
+import threading
+
+_instances = {}
+_lock = threading.RLock()
+
+
+def shared(factory):
+    """Transforma `factory` em um getter que cria o recurso uma única vez por processo."""
+    key = factory.__qualname__
+
+    @functools.wraps(factory)
+    def getter():
+        instance = _instances.get(key)
+        if instance is None:
+            with _lock:
+                instance = _instances.get(key)
+                if instance is None:
+                    instance = factory()
+                    _instances[key] = instance
+        return instance
+
+    return getter
+
+
+@shared
+def get_currency_api():
+    from src.services.dollar_service import CurrencyApi
+    return CurrencyApi()
+
+
+@shared
+def get_asset_service():
+    from src.services.asset_service import AssetService
+    return AssetService()
+
+
+@shared
+def get_stock_service():
+    from src.services.stock_service import StockService
+    return StockService()
+
+
+@shared
+def get_dividend_service():
+    from src.services.dividend_service import DividendService
+    return DividendService()
+
+
+@shared
+def get_portfolio_service():
+    from src.services.portifolio_service import PortfolioService
+    return PortfolioService()
+
+
+@shared
+def get_caixa_repository():
+    from src.entities.caixa_db import CaixaRepository
+    return CaixaRepository()
+
+
+@shared
+def get_dollar_chart_service():
+    from src.services.chart_service import DollarChartService
+    return DollarChartService()
+
+
+@shared
+def get_equity_service():
+    from src.services.equity_service import EquityCurveService
+    return EquityCurveService()
+
+
+@shared
+def get_alert_engine():
+    from src.services.alert_service import AlertEngine
+    return AlertEngine()
+
+
+@shared
+def get_llm_context_builder():
+    from src.services.llm_context_service import LLMContextBuilder
+    return LLMContextBuilder()
+
+
+@shared
+def get_analysis_crew():
+    from src.crew.analysis_crew import AnalysisCrew
+    return AnalysisCrew()
+
+
+@shared
+def get_response_cache():
+    from src.services.response_cache_service import ResponseCache
+    return ResponseCache()
+
+
+@shared
+def get_warmup_service():
+    from src.services.warmup_service import WarmupService
+    return WarmupService()
+
+
+@shared
+def get_bulk_io_service():
+    from src.services.bulk_io_service import BulkIOService
+    return BulkIOService()
+
+
+def close_all():
+    """Libera os recursos que têm `close` (conexões, sessões e pools de threads)."""
+    with _lock:
+        for key, instance in list(_instances.items()):
+            close = getattr(instance, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    logging.error(f"Erro ao liberar o recurso {key}: {e}")
+        _instances.clear()
+
+
+atexit.register(close_all)
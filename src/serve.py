@@ -0,0 +1,30 @@
+"""Inicia o dashboard com o aquecimento dos caches no boot do processo.
+
+Com `streamlit run`, o aquecimento só começa quando a primeira sessão executa o
+script. Este ponto de entrada inicia o aquecimento (ver src/services/warmup_service.py)
+e o servidor do Streamlit no mesmo processo, então o primeiro usuário encontra os
+caches prontos.
+
+Uso:
+    python -m src.serve [opções do streamlit run, ex.: --server.port 8502]
+"""
+import logging
+import sys
+from pathlib import Path
+
+from streamlit.web import cli
+
+from src.resources import get_warmup_service
+
+DASHBOARD = Path(__file__).resolve().parent.parent / "app" / "dashboard.py"
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    get_warmup_service().start()
+    sys.argv = ["streamlit", "run", str(DASHBOARD), *sys.argv[1:]]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
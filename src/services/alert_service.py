@@ -0,0 +1,195 @@
+import bisect
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.entities.alert_db import Alert, AlertRepository, AlertRule
+
+FX_SYMBOL = "USDBRL"
+PORTFOLIO = "PORTFOLIO"
+CAIXA = "CAIXA"
+PORTFOLIO_PEAK = "portfolio_peak"
+
+# Tipo da regra -> (métrica observada, dispara acima ou abaixo do limite)
+RULE_METRICS = {
+    "price_above": ("price", True),
+    "price_below": ("price", False),
+    "move_above": ("move", True),
+    "move_below": ("move", False),
+    "fx_above": ("price", True),
+    "fx_below": ("price", False),
+    "drawdown": ("drawdown", True),
+    "caixa_above": ("value", True),
+    "caixa_below": ("value", False),
+}
+
+MESSAGES = {
+    "price_above": "{symbol} subiu para ${value:,.2f} (limite ${threshold:,.2f})",
+    "price_below": "{symbol} caiu para ${value:,.2f} (limite ${threshold:,.2f})",
+    "move_above": "{symbol} com variação de {value:+.2f}% no dia (acima de {threshold:+.2f}%)",
+    "move_below": "{symbol} com variação de {value:+.2f}% no dia (abaixo de {threshold:+.2f}%)",
+    "fx_above": "Dólar subiu para R$ {value:.4f} (limite R$ {threshold:.4f})",
+    "fx_below": "Dólar caiu para R$ {value:.4f} (limite R$ {threshold:.4f})",
+    "drawdown": "Carteira {value:.2f}% abaixo do pico (limite {threshold:.2f}%)",
+    "caixa_above": "Caixa em ${value:,.2f} (acima de ${threshold:,.2f})",
+    "caixa_below": "Caixa em ${value:,.2f} (abaixo de ${threshold:,.2f})",
+}
+
+
+class _RuleBook:
+    """Regras de uma métrica de um símbolo em uma direção, ordenadas pelo limite.
+
+    Para regras "abaixo" os valores são negados, então tudo é tratado como "acima":
+    a regra dispara quando o valor chega ao limite e volta a ficar armada quando o
+    valor cai abaixo de `limite - histerese`. Entre duas observações só podem mudar
+    as regras com limite (ou ponto de rearme) entre o valor anterior e o novo, que
+    são localizadas por busca binária.
+    """
+
+    def __init__(self, above: bool):
+        self.sign = 1.0 if above else -1.0
+        self.rules: Dict[int, AlertRule] = {}
+        self._fire_levels: List[Tuple[float, int]] = []
+        self._rearm_levels: List[Tuple[float, int]] = []
+
+    def add(self, rule: AlertRule) -> None:
+        level = self.sign * rule.threshold
+        self.rules[rule.id] = rule
+        bisect.insort(self._fire_levels, (level, rule.id))
+        bisect.insort(self._rearm_levels, (level - rule.hysteresis, rule.id))
+
+    def evaluate(self, previous: Optional[float], value: float) -> Tuple[List[AlertRule], List[AlertRule]]:
+        """Regras que disparam e regras que voltam a ficar armadas com a passagem de `previous` para `value`."""
+        value = self.sign * value
+        if previous is None:
+            # Primeira observação: todas as regras são candidatas
+            fire = self._fire_levels[:bisect.bisect_right(self._fire_levels, (value, float("inf")))]
+            rearm = self._rearm_levels[bisect.bisect_right(self._rearm_levels, (value, float("inf"))):]
+        else:
+            previous = self.sign * previous
+            if value > previous:
+                fire = self._fire_levels[bisect.bisect_right(self._fire_levels, (previous, float("inf"))):
+                                         bisect.bisect_right(self._fire_levels, (value, float("inf")))]
+                rearm = []
+            elif value < previous:
+                fire = []
+                rearm = self._rearm_levels[bisect.bisect_right(self._rearm_levels, (value, float("inf"))):
+                                           bisect.bisect_right(self._rearm_levels, (previous, float("inf")))]
+            else:
+                return [], []
+        fired = [self.rules[rule_id] for _, rule_id in fire if self.rules[rule_id].armed]
+        rearmed = [self.rules[rule_id] for _, rule_id in rearm if not self.rules[rule_id].armed]
+        return fired, rearmed
+
+
+class AlertEngine:
+    """Avalia as regras de alerta a cada observação e grava os disparos na caixa de saída.
+
+    As regras ficam indexadas por (símbolo, métrica): uma observação só consulta as
+    regras daquela chave, e dentro dela apenas as que o valor cruzou. Cada regra dispara
+    uma vez ao cruzar o limite e só volta a disparar depois que o valor recua além da
+    histerese; o estado (armada ou não) fica no banco, então reiniciar o processo não
+    repete alertas. As regras são recarregadas quando outro processo as altera.
+    """
+
+    def __init__(self, repository: AlertRepository = None):
+        self.repository = repository or AlertRepository()
+        self._books: Dict[Tuple[str, str], List[_RuleBook]] = {}
+        self._last: Dict[Tuple[str, str], float] = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def watches(self, symbol: str, metric: str = None) -> bool:
+        """Se há alguma regra para o símbolo (e a métrica, se informada)."""
+        if metric is not None:
+            return (symbol, metric) in self._books
+        return any(key[0] == symbol for key in self._books)
+
+    def observe(self, symbol: str, metric: str, value: float) -> List[Alert]:
+        return self.observe_many([(symbol, metric, value)])
+
+    def observe_many(self, observations: Iterable[Tuple[str, str, float]]) -> List[Alert]:
+        """Avalia várias observações (símbolo, métrica, valor) e grava o resultado em uma transação.
+
+        Retorna os alertas disparados.
+        """
+        self.refresh_rules()
+        now = datetime.now()
+        alerts, rearmed = [], []
+        with self._lock:
+            for symbol, metric, value in observations:
+                if value is None:
+                    continue
+                key = (symbol, metric)
+                previous = self._last.get(key)
+                self._last[key] = value
+                for book in self._books.get(key, ()):
+                    fired, rules = book.evaluate(previous, value)
+                    for rule in rules:
+                        rule.armed = True
+                        rearmed.append(rule.id)
+                    for rule in fired:
+                        rule.armed = False
+                        rule.fired_count += 1
+                        rule.last_fired_at = now
+                        alerts.append(Alert(
+                            rule_id=rule.id,
+                            kind=rule.kind,
+                            symbol=rule.symbol,
+                            value=value,
+                            threshold=rule.threshold,
+                            message=MESSAGES[rule.kind].format(symbol=rule.symbol, value=value,
+                                                               threshold=rule.threshold),
+                            fired_at=now,
+                            episode=rule.fired_count
+                        ))
+        if alerts or rearmed:
+            try:
+                self.repository.save_evaluation(rearmed, alerts)
+            except Exception as e:
+                logging.error(f"Erro ao gravar alertas: {e}")
+                # O estado em memória diverge do banco: recarrega na próxima observação
+                self._version = None
+        for alert in alerts:
+            logging.info(f"Alerta: {alert.message}")
+        return alerts
+
+    def observe_portfolio(self, total_value: float) -> List[Alert]:
+        """Observa o valor da carteira e a queda em relação ao maior valor já visto (drawdown)."""
+        if total_value <= 0:
+            return []
+        peak = self.repository.get_state(PORTFOLIO_PEAK) or 0.0
+        if total_value > peak:
+            peak = total_value
+            self.repository.set_state([(PORTFOLIO_PEAK, peak)])
+        return self.observe(PORTFOLIO, "drawdown", (peak - total_value) / peak * 100)
+
+    def add_rule(self, kind: str, symbol: str, threshold: float, hysteresis: float = 0.0) -> int:
+        """Cadastra uma regra; ela é avaliada a partir da próxima observação."""
+        if kind not in RULE_METRICS:
+            raise ValueError(f"Tipo de alerta inválido: {kind}")
+        symbol = {"fx_above": FX_SYMBOL, "fx_below": FX_SYMBOL, "drawdown": PORTFOLIO,
+                  "caixa_above": CAIXA, "caixa_below": CAIXA}.get(kind, symbol.upper())
+        return self.repository.add_rules([AlertRule(kind=kind, symbol=symbol, threshold=threshold,
+                                                    hysteresis=abs(hysteresis))])[0]
+
+    def remove_rules(self, rule_ids: Iterable[int]) -> int:
+        return self.repository.delete_rules(rule_ids)
+
+    def refresh_rules(self) -> None:
+        """Recarrega as regras se elas mudaram desde a última leitura (uma consulta ao banco)."""
+        version = self.repository.get_rules_version()
+        if version == self._version:
+            return
+        books = {}
+        for rule in self.repository.get_rules():
+            metric, above = RULE_METRICS[rule.kind]
+            key = (rule.symbol, metric)
+            pair = books.setdefault(key, [_RuleBook(above=True), _RuleBook(above=False)])
+            pair[0 if above else 1].add(rule)
+        with self._lock:
+            self._books = {key: [book for book in pair if book.rules] for key, pair in books.items()}
+            # Sem valor anterior, a próxima observação avalia todas as regras (inclusive as novas)
+            self._last.clear()
+            self._version = version
@@ -1,18 +1,62 @@
+import functools
 import json
+import math
 import os
+import threading
 from pathlib import Path
 import pandas as pd
-import yfinance as yf
+
+from src.services.dividend_service import DividendService
+from src.services.ledger_service import LedgerService
+from src.model.account import DEFAULT_ACCOUNT, account_of
+from src.services.market_data_service import market_data_service
 
 # Define the path for the assets database
 ASSETS_DB_PATH = Path("data/db/assets.json")
+# Fields owned by the trade ledger once the asset has a position (seeded by LedgerService.seed_from_assets)
+LEDGER_FIELDS = ('shares', 'purchase_price')
+# Row of the account summaries with the totals of every account
+CONSOLIDATED = "Consolidado"
+# Portfolio columns summed per account (see get_account_summaries)
+SUMMARY_COLUMNS = {
+    'total_value': 'Market Value ($)',
+    'total_cost': 'Total Cost ($)',
+    'total_gain': 'Tot Gain UNRL ($)',
+    'day_gain': 'Day Gain UNRL ($)',
+    'realized': 'Realized ($)',
+}
+
+
+def _key(asset):
+    """Identity of an asset: the same symbol can be held in several accounts."""
+    return account_of(asset), asset["symbol"]
+
+
+def _synchronized(method):
+    """Run `method` holding the class lock, so concurrent sessions don't lose each other's edits."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class AssetService:
-    """Service for managing assets in the portfolio."""
+    """Service for managing assets in the portfolio.
+
+    Each asset belongs to an account (brokerage, personal, company...) stored in its
+    "account" field; assets without one belong to DEFAULT_ACCOUNT.
+    """
+
+    # Shared by every instance: serializes load-modify-save of the JSON file
+    _lock = threading.RLock()
     
     def __init__(self):
         # Ensure the directory exists
         os.makedirs(os.path.dirname(ASSETS_DB_PATH), exist_ok=True)
+        self.ledger_service = LedgerService()
+        self.dividend_service = DividendService()
+        # Assets registered before the ledger get their initial position once
+        self.ledger_service.migrate_assets(self.load_assets())
     
     def load_assets(self):
         """Load assets from the JSON file."""
@@ -22,110 +66,278 @@ class AssetService:
         return []
     
     def save_assets(self, assets):
-        """Save assets to the JSON file."""
-        with open(ASSETS_DB_PATH, 'w') as f:
-            json.dump(assets, f, indent=4)
+        """Save assets to the JSON file (atomically, so readers never see a partial file)."""
+        tmp_path = ASSETS_DB_PATH.with_suffix(".json.tmp")
+        with self._lock:
+            with open(tmp_path, 'w') as f:
+                json.dump(assets, f, indent=4)
+            os.replace(tmp_path, ASSETS_DB_PATH)
     
+    @_synchronized
     def add_asset(self, asset_data):
         """Add a new asset to the database."""
         assets = self.load_assets()
         
-        # Check if asset already exists
-        symbol_exists = any(asset["symbol"] == asset_data["symbol"] for asset in assets)
+        # Check if asset already exists in the account
+        symbol_exists = any(_key(asset) == _key(asset_data) for asset in assets)
         
         if symbol_exists:
-            return False, f"O ativo com símbolo {asset_data['symbol']} já existe."
+            return False, f"O ativo com símbolo {asset_data['symbol']} já existe na conta {account_of(asset_data)}."
         
         assets.append(asset_data)
         self.save_assets(assets)
+        self.ledger_service.seed_from_assets([asset_data])
         return True, f"Ativo {asset_data['symbol']} adicionado com sucesso!"
     
-    def update_asset(self, symbol, asset_data):
+    def _ledger_conflicts(self, changes, positions=None):
+        """(account, symbol) keys whose quantity or cost would change although the ledger owns them.
+
+        `changes` are (stored asset, new asset) pairs. Once an asset has a position, its
+        quantity and average cost come from the trades; assets.json keeps only the values
+        used to seed the position. New values equal to the stored ones or to the ledger
+        position (as exported by BulkIOService) are not a change.
+        """
+        positions = self.ledger_service.get_positions() if positions is None else positions
+        return [
+            _key(stored) for stored, new in changes
+            if _key(stored) in positions and not self._same_ledger_fields(new, (
+                [stored.get(name) for name in LEDGER_FIELDS],
+                [positions[_key(stored)].shares, positions[_key(stored)].average_cost],
+            ))
+        ]
+
+    @staticmethod
+    def _same_ledger_fields(asset, candidates):
+        values = [float(asset.get(name) or 0) for name in LEDGER_FIELDS]
+        return any(all(math.isclose(value, float(other or 0), rel_tol=1e-9, abs_tol=1e-9)
+                       for value, other in zip(values, candidate))
+                   for candidate in candidates)
+
+    @staticmethod
+    def _ledger_message(keys):
+        symbols = ', '.join(f"{symbol} ({account})" for account, symbol in keys)
+        return (f"Quantidade e preço de compra de {symbols} vêm das transações: "
+                "registre uma compra, venda ou desdobramento para alterá-los.")
+
+    @_synchronized
+    def upsert_assets(self, assets_data):
+        """Add or replace several assets (matched by account and symbol) in a single write.
+
+        Returns the number of saved assets and the symbols rejected because they would
+        change the quantity or cost of an asset that already has a ledger position.
+        """
+        assets = self.load_assets()
+        index = {_key(asset): i for i, asset in enumerate(assets)}
+        positions = self.ledger_service.get_positions()
+        rejected = set(self._ledger_conflicts(
+            ((assets[index[_key(asset_data)]], asset_data) for asset_data in assets_data if _key(asset_data) in index),
+            positions))
+        saved = 0
+        for asset_data in assets_data:
+            if _key(asset_data) in index:
+                if _key(asset_data) in rejected:
+                    continue
+                if _key(asset_data) in positions:
+                    # Keep the seed values: an exported ledger position must not replace them
+                    stored = assets[index[_key(asset_data)]]
+                    asset_data = {**asset_data, **{name: stored[name] for name in LEDGER_FIELDS if name in stored}}
+                assets[index[_key(asset_data)]] = asset_data
+            else:
+                index[_key(asset_data)] = len(assets)
+                assets.append(asset_data)
+            saved += 1
+        self.save_assets(assets)
+        self.ledger_service.seed_from_assets(
+            [asset_data for asset_data in assets_data if _key(asset_data) not in rejected])
+        return saved, sorted(symbol for _, symbol in rejected)
+    
+    @_synchronized
+    def update_asset(self, symbol, asset_data, account=DEFAULT_ACCOUNT):
         """Update an existing asset in the database."""
         assets = self.load_assets()
         
-        # Find the asset with the given symbol
+        # Find the asset with the given symbol in the account
         for i, asset in enumerate(assets):
-            if asset["symbol"] == symbol:
+            if _key(asset) == (account, symbol):
+                conflicts = self._ledger_conflicts([(asset, asset_data)])
+                if conflicts:
+                    return False, self._ledger_message(conflicts)
                 assets[i] = asset_data
                 self.save_assets(assets)
+                self.ledger_service.seed_from_assets([asset_data])
                 return True, f"Ativo {symbol} atualizado com sucesso!"
         
         return False, f"Ativo com símbolo {symbol} não encontrado."
     
-    def delete_asset(self, symbol):
+    @_synchronized
+    def delete_asset(self, symbol, account=DEFAULT_ACCOUNT):
         """Delete an asset from the database."""
         assets = self.load_assets()
         
-        # Filter out the asset with the given symbol
-        filtered_assets = [asset for asset in assets if asset["symbol"] != symbol]
+        # Filter out the asset with the given symbol in the account
+        filtered_assets = [asset for asset in assets if _key(asset) != (account, symbol)]
         
         if len(filtered_assets) < len(assets):
             self.save_assets(filtered_assets)
+            self.ledger_service.delete_symbol(symbol, account)
             return True, f"Ativo {symbol} removido com sucesso!"
         
         return False, f"Ativo com símbolo {symbol} não encontrado."
     
+    @_synchronized
+    def apply_changes(self, updated_assets, deleted_keys):
+        """Apply edits and deletions from the asset grid in a single write.
+
+        `updated_assets` replace the assets with the same account and symbol; assets
+        that no longer exist are ignored. `deleted_keys` are (account, symbol) pairs,
+        and deleted assets also lose their ledger history. Nothing is saved if an update
+        would change the quantity or cost of an asset that has a ledger position.
+        """
+        deleted_keys = set(deleted_keys)
+        updates = {_key(asset): asset for asset in updated_assets}
+        assets = self.load_assets()
+        existing = {_key(asset) for asset in assets}
+        conflicts = self._ledger_conflicts(
+            (asset, updates[_key(asset)]) for asset in assets
+            if _key(asset) in updates and _key(asset) not in deleted_keys)
+        if conflicts:
+            return False, self._ledger_message(conflicts)
+        assets = [updates.get(_key(asset), asset) for asset in assets if _key(asset) not in deleted_keys]
+        self.save_assets(assets)
+        for account, symbol in deleted_keys & existing:
+            self.ledger_service.delete_symbol(symbol, account)
+        self.ledger_service.seed_from_assets(
+            [asset for key, asset in updates.items() if key in existing - deleted_keys])
+        updated = len(set(updates) & existing - deleted_keys)
+        deleted = len(deleted_keys & existing)
+        return True, f"{updated} ativo(s) atualizado(s) e {deleted} removido(s)."
+
+    @_synchronized
     def clear_assets(self):
         """Clear all assets from the database."""
+        for asset in self.load_assets():
+            self.ledger_service.delete_symbol(asset["symbol"], account_of(asset))
         self.save_assets([])
         return True, "Todos os ativos foram removidos!"
+
+    def get_symbols(self, assets=None):
+        """Distinct symbols of every account, in registration order (one market data lookup each)."""
+        assets = self.load_assets() if assets is None else assets
+        return list(dict.fromkeys(asset["symbol"] for asset in assets))
+
+    def get_accounts(self, assets=None):
+        """Accounts that hold at least one asset."""
+        assets = self.load_assets() if assets is None else assets
+        return sorted({account_of(asset) for asset in assets})
     
     def get_portfolio_data(self):
-        """Get portfolio data for all assets with current market prices."""
+        """Get portfolio data for all assets with the last known market prices.
+
+        Prices come from the stale-while-revalidate market data layer, so this
+        never waits for yfinance. Assets without any known price are valued at
+        cost instead of being dropped from the portfolio. Each symbol is looked up
+        once, however many accounts hold it.
+        """
         assets = self.load_assets()
         portfolio_data = []
+        quotes = {symbol: market_data_service.get_quote(symbol) for symbol in self.get_symbols(assets)}
+
+        # Positions come from the trade ledger (one query for all symbols); seeded when assets are saved
+        positions = self.ledger_service.get_positions()
+
+        # Dividends come from the local store, refreshed daily
+        latest_dividends = self.dividend_service.get_latest_dividends()
         
         for asset in assets:
             try:
-                # Get current market data
-                ticker = yf.Ticker(asset["symbol"])
-                hist = ticker.history(period="1d")
-                
-                if not hist.empty:
-                    last_price = hist['Close'].iloc[-1]
-                    
-                    # Calculate values
+                position = positions.get(_key(asset))
+                if position is not None:
+                    shares = position.shares
+                    purchase_price = position.average_cost
+                    total_cost = position.cost_basis
+                    realized = position.realized_pnl
+                else:
                     shares = asset["shares"]
                     purchase_price = asset["purchase_price"]
                     total_cost = shares * purchase_price
-                    market_value = shares * last_price
-                    
-                    # Calculate gains/losses
-                    day_change = ((last_price - hist['Open'].iloc[0]) / hist['Open'].iloc[0]) * 100 if hist['Open'].iloc[0] != 0 else 0
-                    total_gain_percent = ((last_price - purchase_price) / purchase_price) * 100 if purchase_price != 0 else 0
-                    total_gain_dollars = market_value - total_cost
+                    realized = 0.0
+
+                # Last known market data (memory or database)
+                served = quotes[asset["symbol"]]
+                if served is not None:
+                    quote = served.value
+                    last_price = quote['close']
+                    day_open = quote['open']
+                    age = served.age_seconds
+                    stale = served.stale
+                else:
+                    last_price = day_open = purchase_price
+                    age = None
+                    stale = True
+
+                market_value = shares * last_price
+                dividends = latest_dividends.get(asset["symbol"], 0.0)
                     
-                    # Get dividends if available
-                    dividends = ticker.dividends.tail(1).sum() if not ticker.dividends.empty else 0.0
+                # Calculate gains/losses
+                day_change = ((last_price - day_open) / day_open) * 100 if day_open != 0 else 0
+                total_gain_percent = ((last_price - purchase_price) / purchase_price) * 100 if purchase_price != 0 and shares else 0
+                total_gain_dollars = market_value - total_cost
                     
-                    portfolio_data.append({
-                        'Symbol': asset["symbol"],
-                        'Name': asset["name"],
-                        'Type': asset["type"],
-                        'Shares': shares,
-                        'Last Price': last_price,
-                        'Ac/Share': purchase_price,
-                        'Total Cost ($)': total_cost,
-                        'Market Value ($)': market_value,
-                        'Tot Div': dividends,
-                        'Day Gain UNRL (%)': day_change,
-                        'Day Gain UNRL ($)': shares * (last_price - hist['Open'].iloc[0]),
-                        'Tot Gain UNRL (%)': total_gain_percent,
-                        'Tot Gain UNRL ($)': total_gain_dollars,
-                        'Purchase Date': asset["purchase_date"],
-                        'Notes': asset.get("notes", "")
-                    })
+                portfolio_data.append({
+                    'Account': account_of(asset),
+                    'Symbol': asset["symbol"],
+                    'Name': asset["name"],
+                    'Type': asset["type"],
+                    'Shares': shares,
+                    'Last Price': last_price,
+                    'Ac/Share': purchase_price,
+                    'Total Cost ($)': total_cost,
+                    'Market Value ($)': market_value,
+                    'Tot Div': dividends,
+                    'Day Gain UNRL (%)': day_change,
+                    'Day Gain UNRL ($)': shares * (last_price - day_open),
+                    'Tot Gain UNRL (%)': total_gain_percent,
+                    'Tot Gain UNRL ($)': total_gain_dollars,
+                    'Realized ($)': realized,
+                    'Purchase Date': asset["purchase_date"],
+                    'Notes': asset.get("notes", ""),
+                    'Price Age (s)': round(age) if age is not None else None,
+                    'Stale': stale
+                })
             except Exception as e:
-                print(f"Error fetching data for {asset['symbol']}: {e}")
+                print(f"Error building portfolio data for {asset['symbol']}: {e}")
         
         return portfolio_data
     
-    def get_portfolio_summary(self):
-        """Get a summary of the portfolio with total value and performance."""
-        portfolio_data = self.get_portfolio_data()
-        
-        if not portfolio_data:
+    def get_account_summaries(self, portfolio_data=None, cash=None):
+        """Per-account and consolidated totals from a single grouped aggregation.
+
+        `portfolio_data` defaults to get_portfolio_data(), where market data is read
+        once per symbol, so adding an account adds no price lookups. `cash` maps each
+        account to its cash balance. Returns a DataFrame indexed by account, plus a
+        CONSOLIDATED row, with the get_portfolio_summary keys and 'cash'.
+        """
+        portfolio_data = self.get_portfolio_data() if portfolio_data is None else portfolio_data
+        df = pd.DataFrame(portfolio_data, columns=['Account', 'Symbol', *SUMMARY_COLUMNS.values()])
+
+        totals = df.groupby('Account').agg(
+            asset_count=('Symbol', 'size'),
+            **{name: (column, 'sum') for name, column in SUMMARY_COLUMNS.items()}
+        )
+        cash = pd.Series(cash or {}, dtype=float)
+        totals = totals.reindex(totals.index.union(cash.index), fill_value=0).astype(float)
+        totals['cash'] = cash.reindex(totals.index, fill_value=0.0)
+        totals.loc[CONSOLIDATED] = totals.sum()
+
+        cost = totals['total_cost']
+        totals['total_gain_percent'] = (totals['total_gain'] / cost.where(cost > 0) * 100).fillna(0.0)
+        totals['asset_count'] = totals['asset_count'].astype(int)
+        return totals
+
+    def get_portfolio_summary(self, account=CONSOLIDATED):
+        """Get a summary of the portfolio (or of one account) with total value and performance."""
+        totals = self.get_account_summaries()
+        if account not in totals.index:
             return {
                 'total_value': 0,
                 'total_cost': 0,
@@ -133,13 +345,12 @@ class AssetService:
                 'total_gain_percent': 0,
                 'asset_count': 0
             }
-        
-        df = pd.DataFrame(portfolio_data)
-        
+
+        row = totals.loc[account]
         return {
-            'total_value': df['Market Value ($)'].sum(),
-            'total_cost': df['Total Cost ($)'].sum(),
-            'total_gain': df['Tot Gain UNRL ($)'].sum(),
-            'total_gain_percent': (df['Tot Gain UNRL ($)'].sum() / df['Total Cost ($)'].sum() * 100) if df['Total Cost ($)'].sum() > 0 else 0,
-            'asset_count': len(df)
-        } 
\ No newline at end of file
+            'total_value': float(row['total_value']),
+            'total_cost': float(row['total_cost']),
+            'total_gain': float(row['total_gain']),
+            'total_gain_percent': float(row['total_gain_percent']),
+            'asset_count': int(row['asset_count'])
+        }
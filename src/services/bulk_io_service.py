@@ -0,0 +1,297 @@
+import argparse
+import csv
+import io
+import logging
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.entities.dollar_db import DOLLAR_COLUMNS, init_db, iter_dollar, save_dollar_batch
+from src.entities.stock_db import STOCK_COLUMNS, StockDataRepository
+from src.model.account import DEFAULT_ACCOUNT, account_of
+
+# Linhas por bloco: limita a memória usada na importação e na exportação
+CHUNK_SIZE = 50000
+# Quantidade máxima de mensagens de erro guardadas por importação
+MAX_ERRORS = 20
+FORMATS = ("csv", "parquet")
+
+# Colunas de cada conjunto de dados e o tipo esperado de cada uma
+DATASETS = {
+    "assets": {
+        "symbol": "str", "name": "str", "type": "str", "shares": "float",
+        "purchase_price": "float", "purchase_date": "date", "notes": "str", "account": "str",
+    },
+    "caixa": {"valor": "float", "date": "datetime", "account": "str"},
+    "dollar": dict(zip(DOLLAR_COLUMNS, (
+        "str", "str", "str", "float", "float", "float", "float", "float", "float", "datetime"))),
+    "stock_data": dict(zip(STOCK_COLUMNS, (
+        "str", "float", "int", "float", "float", "float", "float", "datetime"))),
+}
+# Sem conta, as linhas vão para a conta padrão
+OPTIONAL_COLUMNS = {"assets": {"notes", "account"}, "caixa": {"account"}}
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    rejected: int = 0
+    chunks: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(message)
+
+
+def _isoformat(series: pd.Series, sep: str = "T") -> pd.Series:
+    """Formata datas como datetime.isoformat (sem fração quando os microssegundos são zero)."""
+    whole = series.dt.strftime(f"%Y-%m-%d{sep}%H:%M:%S")
+    fraction = series.dt.strftime(f"%Y-%m-%d{sep}%H:%M:%S.%f")
+    return pd.Series(np.where(series.dt.microsecond == 0, whole, fraction), index=series.index)
+
+
+class BulkIOService:
+    """Importação e exportação em lote (CSV e Parquet) de ativos, caixa, dólar e ações.
+
+    A leitura é feita em blocos, a validação é vetorizada por bloco e cada bloco
+    válido é gravado em uma única transação, então a memória usada não depende
+    do tamanho do arquivo. A exportação percorre o banco em blocos.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.stock_repo = StockDataRepository()
+        from src.resources import get_caixa_repository
+        self.caixa_repo = get_caixa_repository()
+
+    # ------------------------------------------------------------------ import
+
+    def import_file(self, dataset: str, source, file_format: str) -> ImportResult:
+        """Importa `source` (caminho ou arquivo aberto) para o conjunto `dataset`."""
+        self._check(dataset, file_format)
+        result = ImportResult()
+        for chunk in self._read_chunks(source, file_format):
+            result.chunks += 1
+            valid = self._validate(dataset, chunk, result)
+            if not valid.empty:
+                result.imported += self._write(dataset, valid, result)
+        return result
+
+    def _read_chunks(self, source, file_format: str):
+        if file_format == "csv":
+            yield from pd.read_csv(source, chunksize=self.chunk_size, dtype=str, keep_default_na=False)
+        else:
+            parquet_file = self._parquet().ParquetFile(source)
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_size):
+                yield batch.to_pandas()
+
+    def _validate(self, dataset: str, chunk: pd.DataFrame, result: ImportResult) -> pd.DataFrame:
+        """Converte os tipos do bloco inteiro de uma vez e descarta as linhas inválidas."""
+        columns = DATASETS[dataset]
+        optional = OPTIONAL_COLUMNS.get(dataset, set())
+        missing = [name for name in columns if name not in chunk.columns and name not in optional]
+        if missing:
+            result.rejected += len(chunk)
+            result.add_error(f"Bloco {result.chunks}: colunas ausentes {missing}")
+            return chunk.iloc[0:0]
+
+        valid = pd.DataFrame(index=chunk.index)
+        invalid = pd.Series(False, index=chunk.index)
+        for name, kind in columns.items():
+            raw = chunk[name] if name in chunk.columns else pd.Series("", index=chunk.index)
+            if kind == "str":
+                values = raw.fillna("").astype(str).str.strip()
+                bad = (values == "") if name not in optional else pd.Series(False, index=chunk.index)
+            elif kind in ("float", "int"):
+                values = pd.to_numeric(raw, errors="coerce")
+                bad = values.isna()
+                if kind == "int":
+                    values = values.fillna(0).astype("int64")
+            else:
+                values = pd.to_datetime(raw, errors="coerce", format="mixed")
+                if values.dt.tz is not None:
+                    values = values.dt.tz_localize(None)
+                bad = values.isna()
+            valid[name] = values
+            invalid |= bad
+
+        invalid |= self._domain_errors(dataset, valid)
+
+        rejected = int(invalid.sum())
+        if rejected:
+            result.rejected += rejected
+            first = chunk.index[invalid.to_numpy()][:5].tolist()
+            result.add_error(f"Bloco {result.chunks}: {rejected} linha(s) inválida(s), ex.: linhas {first}")
+        return valid[~invalid].copy()
+
+    @staticmethod
+    def _domain_errors(dataset: str, valid: pd.DataFrame) -> pd.Series:
+        """Mesmas restrições dos modelos (CaixaModel, CurrencyQuoteModel), aplicadas por coluna."""
+        if dataset == "caixa":
+            return valid["valor"] < 0
+        if dataset == "dollar":
+            prices = valid[["high", "low", "bid", "ask"]]
+            return (prices < 0).any(axis=1) | (valid["pctChange"].abs() > 100)
+        if dataset == "stock_data":
+            return (valid[["price", "high", "low", "open", "close"]] < 0).any(axis=1) | (valid["volume"] < 0)
+        return (valid["shares"] < 0) | (valid["purchase_price"] < 0)
+
+    def _write(self, dataset: str, valid: pd.DataFrame, result: ImportResult) -> int:
+        """Grava um bloco validado em uma única transação."""
+        if dataset == "dollar":
+            valid["date_hour"] = _isoformat(valid["date_hour"], sep=" ")
+            init_db()
+            return save_dollar_batch(list(valid.itertuples(index=False, name=None)))
+        if dataset == "stock_data":
+            valid["symbol"] = valid["symbol"].str.upper()
+            valid["date"] = _isoformat(valid["date"])
+            return self.stock_repo.save_stock_data_batch(list(valid.itertuples(index=False, name=None)))
+        if dataset == "caixa":
+            valid["valor"] = valid["valor"].round(2)
+            valid["date"] = valid["date"].astype(object)
+            valid["account"] = valid["account"].replace("", DEFAULT_ACCOUNT)
+            return self.caixa_repo.save_caixa_batch(valid.to_dict("records"))
+
+        from src.resources import get_asset_service
+        valid["symbol"] = valid["symbol"].str.upper()
+        valid["account"] = valid["account"].replace("", DEFAULT_ACCOUNT)
+        valid["purchase_date"] = valid["purchase_date"].dt.strftime("%Y-%m-%d")
+        saved, rejected = get_asset_service().upsert_assets(valid.to_dict("records"))
+        if rejected:
+            # Quantidade e custo de ativos com posição vêm das transações (ledger)
+            result.rejected += len(valid) - saved
+            result.add_error(f"Ativos com posição no ledger não foram alterados: {', '.join(rejected)}")
+        return saved
+
+    # ------------------------------------------------------------------ export
+
+    def export_file(self, dataset: str, target, file_format: str) -> int:
+        """Exporta o conjunto `dataset` para `target` (caminho ou arquivo binário aberto).
+
+        Retorna a quantidade de linhas exportadas.
+        """
+        self._check(dataset, file_format)
+        columns = list(DATASETS[dataset])
+        chunks = self._iter_rows(dataset)
+        if file_format == "csv":
+            return self._write_csv(target, columns, chunks)
+        return self._write_parquet(target, dataset, columns, chunks)
+
+    def _iter_rows(self, dataset: str):
+        if dataset == "dollar":
+            init_db()
+            return iter_dollar(self.chunk_size)
+        if dataset == "stock_data":
+            return self.stock_repo.iter_stock_data(self.chunk_size)
+        if dataset == "caixa":
+            return self.caixa_repo.iter_caixa(self.chunk_size)
+
+        from src.resources import get_asset_service
+        asset_service = get_asset_service()
+        columns = list(DATASETS["assets"])
+        # Quantidade e preço médio de ativos com posição vêm do ledger, não do cadastro
+        positions = asset_service.ledger_service.get_positions()
+        rows = []
+        for asset in asset_service.load_assets():
+            values = {**asset, "account": account_of(asset)}
+            position = positions.get((values["account"], asset["symbol"]))
+            if position is not None:
+                values["shares"], values["purchase_price"] = position.shares, position.average_cost
+            rows.append(tuple(values.get(name, "") for name in columns))
+        return iter([rows])
+
+    @staticmethod
+    def _write_csv(target, columns, chunks) -> int:
+        handle = open(target, "w", newline="", encoding="utf-8") if isinstance(target, str) \
+            else io.TextIOWrapper(target, encoding="utf-8", newline="", write_through=True)
+        total = 0
+        try:
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            for rows in chunks:
+                writer.writerows(rows)
+                total += len(rows)
+        finally:
+            if isinstance(target, str):
+                handle.close()
+            else:
+                handle.detach()
+        return total
+
+    def _write_parquet(self, target, dataset, columns, chunks) -> int:
+        pa = self._arrow()
+        schema = pa.schema([(name, self._arrow_type(kind)) for name, kind in DATASETS[dataset].items()])
+        total = 0
+        with self._parquet().ParquetWriter(target, schema) as writer:
+            for rows in chunks:
+                frame = pd.DataFrame.from_records(rows, columns=columns)
+                for name, kind in DATASETS[dataset].items():
+                    if kind in ("datetime", "date"):
+                        frame[name] = pd.to_datetime(frame[name], format="mixed")
+                    elif kind == "float":
+                        frame[name] = frame[name].astype("float64")
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                total += len(rows)
+        return total
+
+    def _arrow_type(self, kind: str):
+        pa = self._arrow()
+        return {
+            "str": pa.string(),
+            "float": pa.float64(),
+            "int": pa.int64(),
+            "datetime": pa.timestamp("us"),
+            "date": pa.timestamp("us"),
+        }[kind]
+
+    # ------------------------------------------------------------------ utils
+
+    @staticmethod
+    def _check(dataset: str, file_format: str) -> None:
+        if dataset not in DATASETS:
+            raise ValueError(f"Conjunto de dados inválido: {dataset}. Opções: {', '.join(DATASETS)}")
+        if file_format not in FORMATS:
+            raise ValueError(f"Formato inválido: {file_format}. Opções: {', '.join(FORMATS)}")
+
+    @staticmethod
+    def _arrow():
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError("O formato Parquet requer o pacote pyarrow (pip install pyarrow)") from e
+        return pyarrow
+
+    @staticmethod
+    def _parquet():
+        BulkIOService._arrow()
+        import pyarrow.parquet
+        return pyarrow.parquet
+
+
+if __name__ == "__main__":
+    # Ex.: python -m src.services.bulk_io_service import dollar historico.csv
+    #      python -m src.services.bulk_io_service export stock_data acoes.parquet
+    parser = argparse.ArgumentParser(description="Importação/exportação em lote do dashboard")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="Formato do arquivo (padrão: pela extensão)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    file_format = args.format or ("parquet" if args.path.endswith(".parquet") else "csv")
+    service = BulkIOService(chunk_size=args.chunk_size)
+
+    if args.action == "import":
+        outcome = service.import_file(args.dataset, args.path, file_format)
+        print(f"{outcome.imported} linha(s) importada(s), {outcome.rejected} rejeitada(s) em {outcome.chunks} bloco(s)")
+        for error in outcome.errors:
+            print(f"  - {error}")
+    else:
+        count = service.export_file(args.dataset, args.path, file_format)
+        print(f"{count} linha(s) exportada(s) para {args.path}")
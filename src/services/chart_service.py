@@ -0,0 +1,164 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+import plotly.graph_objects as go
+
+from src.entities.dollar_db import get_dollar_points, get_dollar_range, init_db
+from src.services.ttl_cache import get_cache
+
+# Máximo de pontos enviados ao navegador por gráfico, qualquer que seja a janela
+POINT_BUDGET = 1000
+# Séries (janelas e intervalos personalizados) mantidas em cache; as menos usadas são descartadas
+MAX_CHARTS = 16
+
+
+class MinMaxSeries:
+    """Série reduzida ao mínimo e ao máximo de cada intervalo fixo de tempo (bucket).
+
+    A janela é dividida em `budget / 2` buckets alinhados à época: acrescentar pontos
+    só altera os últimos buckets e deslizar a janela só descarta os primeiros, então a
+    série é mantida incrementalmente. Cada bucket gera no máximo dois pontos.
+    """
+
+    def __init__(self, window: timedelta, budget: int = POINT_BUDGET):
+        self.window = window
+        # Largura do bucket em microssegundos
+        self.width = max(1, int(window.total_seconds() * 1_000_000) // max(1, budget // 2))
+        self.last_time = None
+        # bucket -> [tempo do mínimo, mínimo, tempo do máximo, máximo], em ordem cronológica
+        self._buckets = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def extend(self, times: np.ndarray, values: np.ndarray) -> None:
+        """Acrescenta pontos em ordem cronológica (`times` em datetime64[us])."""
+        if len(times) == 0:
+            return
+        micros = times.astype(np.int64)
+        keys = micros // self.width
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        for start, end in zip(starts, ends):
+            chunk = values[start:end]
+            i_min = start + int(np.argmin(chunk))
+            i_max = start + int(np.argmax(chunk))
+            key = int(keys[start])
+            current = self._buckets.get(key)
+            if current is None:
+                self._buckets[key] = [micros[i_min], values[i_min], micros[i_max], values[i_max]]
+                continue
+            if values[i_min] < current[1]:
+                current[0], current[1] = micros[i_min], values[i_min]
+            if values[i_max] > current[3]:
+                current[2], current[3] = micros[i_max], values[i_max]
+        self.last_time = times[-1]
+
+    def trim(self, now: datetime) -> bool:
+        """Descarta os buckets que saíram da janela. Retorna True se algum foi removido."""
+        cutoff = int(np.datetime64(now - self.window, 'us').astype(np.int64)) // self.width
+        expired = []
+        for key in self._buckets:
+            if key >= cutoff:
+                break
+            expired.append(key)
+        for key in expired:
+            del self._buckets[key]
+        return bool(expired)
+
+    def points(self):
+        """Pontos da série reduzida (datas, valores) em ordem cronológica."""
+        if not self._buckets:
+            return np.array([], dtype='datetime64[us]'), np.array([], dtype=np.float64)
+        rows = np.array(list(self._buckets.values()), dtype=np.float64)
+        min_first = rows[:, 0] <= rows[:, 2]
+        first_t = np.where(min_first, rows[:, 0], rows[:, 2])
+        first_v = np.where(min_first, rows[:, 1], rows[:, 3])
+        second_t = np.where(min_first, rows[:, 2], rows[:, 0])
+        second_v = np.where(min_first, rows[:, 3], rows[:, 1])
+
+        times = np.column_stack((first_t, second_t)).ravel()
+        values = np.column_stack((first_v, second_v)).ravel()
+        # Bucket com um único ponto relevante gera apenas um ponto
+        keep = np.column_stack((np.ones(len(rows), dtype=bool), second_t != first_t)).ravel()
+        return times[keep].astype(np.int64).astype('datetime64[us]'), values[keep]
+
+
+@dataclass
+class _ChartEntry:
+    series: MinMaxSeries
+    last_id: int = 0
+    version: int = 0
+    figure: Optional[go.Figure] = None
+
+
+class DollarChartService:
+    """Gráfico da cotação do dólar por janela de tempo, com cache da figura.
+
+    A cada chamada busca apenas as cotações gravadas depois da última lida e as
+    acrescenta à série reduzida da janela; a figura só é refeita quando a série muda.
+    O cache ("dollar_charts" em ttl_cache) é compartilhado por todas as sessões do processo.
+    """
+
+    def __init__(self, budget: int = POINT_BUDGET):
+        self.budget = budget
+        self._entries = get_cache("dollar_charts", maxsize=MAX_CHARTS)
+        self._lock = threading.Lock()
+
+    def figure(self, window: timedelta = None, start: datetime = None,
+               end: datetime = None) -> Optional[go.Figure]:
+        """Figura da cotação na janela `window` até agora ou no intervalo fixo [start, end].
+
+        Retorna None se não houver cotações no período.
+        """
+        key = window if window is not None else (start, end)
+        span = window if window is not None else end - start
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                entry = _ChartEntry(MinMaxSeries(span, self.budget))
+                self._entries.set(key, entry)
+
+            now = datetime.now()
+            if window is not None:
+                start = now - window
+            init_db()
+            if entry.last_id == 0:
+                ids, times, bids = get_dollar_range(start, end)
+            else:
+                ids, times, bids = get_dollar_points(entry.last_id)
+            changed = False
+            if len(ids):
+                last_id = int(ids.max())
+                last_time = entry.series.last_time
+                if (last_time is not None and times[0] < last_time) or np.any(np.diff(times) < np.timedelta64(0)):
+                    # Cotações fora de ordem (ex.: importação de histórico): refaz a série do período
+                    ids, times, bids = get_dollar_range(start, end)
+                    entry.series = MinMaxSeries(span, self.budget)
+                else:
+                    inside = times >= np.datetime64(start, 'us')
+                    if end is not None:
+                        inside &= times <= np.datetime64(end, 'us')
+                    times, bids = times[inside], bids[inside]
+                entry.series.extend(times, bids)
+                entry.last_id = last_id
+                changed = len(times) > 0
+            if window is not None:
+                changed = entry.series.trim(now) or changed
+
+            if len(entry.series) == 0:
+                return None
+            if changed or entry.figure is None:
+                entry.figure = self._build(entry.series)
+                entry.version += 1
+            return entry.figure
+
+    @staticmethod
+    def _build(series: MinMaxSeries) -> go.Figure:
+        times, values = series.points()
+        fig = go.Figure(go.Scatter(x=times, y=values, mode='lines', name='Cotação'))
+        fig.update_layout(xaxis_title='Data/Hora', yaxis_title='Cotação', showlegend=False)
+        return fig
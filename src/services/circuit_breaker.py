@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Lançada quando o circuito do provedor está aberto e a chamada é recusada."""
+
+
+class CircuitBreaker:
+    """Circuit breaker simples por provedor.
+
+    Após `failure_threshold` falhas consecutivas o circuito abre e recusa chamadas
+    durante `cooldown` segundos. Depois disso uma única chamada de teste é liberada
+    (meio aberto): sucesso fecha o circuito, falha abre de novo.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Indica se uma chamada pode ser feita agora (reserva a chamada de teste no meio aberto)."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logging.info(f"Circuito {self.name} fechado")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                logging.warning(f"Circuito {self.name} aberto por {self.cooldown:.0f}s após {self.failures} falha(s)")
+
+    def call(self, func, *args, **kwargs):
+        """Executa `func` protegida pelo circuito."""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuito {self.name} aberto")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Retorna o circuit breaker compartilhado do provedor `name`."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
@@ -0,0 +1,74 @@
+import logging
+from datetime import datetime, timedelta
+
+from src.entities.dividend_db import DividendRepository
+from src.services.circuit_breaker import get_breaker
+from src.services.market_data_service import YFINANCE, fetch_corporate_actions, market_data_service
+from src.services.ttl_cache import get_cache
+
+# Dividendos mudam poucas vezes por ano: cada símbolo é consultado no máximo uma vez por dia
+REFRESH_INTERVAL = timedelta(days=1)
+# Segundos em que os últimos dividendos lidos do banco são reaproveitados (o coletor grava em outro processo)
+LATEST_TTL = 60.0
+
+
+class DividendService:
+    """Mantém a base local de dividendos e desdobramentos atualizada diariamente."""
+
+    def __init__(self):
+        self.dividend_repo = DividendRepository()
+        self._latest = get_cache("latest_dividends", ttl=LATEST_TTL, maxsize=1)
+
+    def due_symbols(self, symbols):
+        """Símbolos que não foram atualizados dentro do intervalo diário."""
+        refreshed_at = self.dividend_repo.get_refreshed_at()
+        limit = datetime.now() - REFRESH_INTERVAL
+        return [symbol for symbol in symbols if refreshed_at.get(symbol, datetime.min) < limit]
+
+    def refresh(self, symbols, force=False):
+        """Busca apenas os eventos posteriores ao último salvo de cada símbolo (bloqueante).
+
+        Retorna a quantidade de eventos novos por símbolo.
+        """
+        symbols = symbols if force else self.due_symbols(symbols)
+        saved = {}
+        for symbol in symbols:
+            try:
+                since = self.dividend_repo.get_last_action_date(symbol)
+                actions = get_breaker(YFINANCE).call(fetch_corporate_actions, symbol, since)
+                saved[symbol] = self.save_actions(symbol, actions)
+            except Exception as e:
+                logging.error(f"Erro ao atualizar dividendos de {symbol}: {e}")
+        return saved
+
+    def refresh_in_background(self, symbols):
+        """Agenda a atualização diária dos símbolos pendentes sem bloquear quem chama."""
+        for symbol in self.due_symbols(symbols):
+            since = self.dividend_repo.get_last_action_date(symbol)
+            market_data_service.revalidate(
+                ("dividends", symbol),
+                YFINANCE,
+                fetch=lambda symbol=symbol, since=since: fetch_corporate_actions(symbol, since),
+                on_fresh=lambda actions, symbol=symbol: self.save_actions(symbol, actions),
+            )
+
+    def save_actions(self, symbol, actions):
+        """Grava os eventos de um símbolo e descarta os últimos dividendos em cache."""
+        saved = self.dividend_repo.save_actions(symbol, actions)
+        if saved:
+            self._latest.clear()
+        return saved
+
+    def get_latest_dividends(self):
+        """Último dividendo de cada símbolo, lido da base local (em cache por LATEST_TTL segundos)."""
+        return self._latest.get_or_set("latest", self.dividend_repo.get_latest_dividends)
+
+
+if __name__ == "__main__":
+    # Job diário: python -m src.services.dividend_service
+    from src.services.asset_service import AssetService
+
+    logging.basicConfig(level=logging.INFO)
+    symbols = AssetService().get_symbols()
+    for symbol, count in DividendService().refresh(symbols).items():
+        print(f"{symbol}: {count} evento(s) novo(s)")
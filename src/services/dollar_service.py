@@ -10,7 +10,10 @@ from crewai.tools import BaseTool
 
 from src.model.currency import CurrencyQuoteModel
 from src.entities.dollar_db import init_db
-from src.entities.dollar_db import save_dollar, get_daily_dollar
+from src.entities.dollar_db import save_dollar, get_daily_dollar, get_dollar_stats
+
+# Tempo máximo (segundos) de espera pela AwesomeAPI
+REQUEST_TIMEOUT = 10
 
 class CurrencyApi(BaseTool, ABC):
     name: str = "CurrencyApi()"
@@ -34,14 +37,14 @@ class CurrencyApi(BaseTool, ABC):
 
     def get_currency(self, coin: str):
         url = f'https://economia.awesomeapi.com.br/json/last/{coin[0:3]}-{coin[3:6]}'
-        response = requests.get(url).content
+        response = requests.get(url, timeout=REQUEST_TIMEOUT).content
         currency = json.loads(response)
         return currency
 
 
     def get_save_currency(self, coin: str):
         url = f'https://economia.awesomeapi.com.br/json/last/{coin[0:3]}-{coin[3:6]}'
-        response = requests.get(url).content
+        response = requests.get(url, timeout=REQUEST_TIMEOUT).content
         currency_json = json.loads(response)
         currency = self.put_currency(currency_json)
         return currency
@@ -50,6 +53,11 @@ class CurrencyApi(BaseTool, ABC):
         init_db()
         return get_daily_dollar()
 
+    def get_currency_stats(self):
+        """Retorna as estatísticas incrementais da cotação (médias, mín/máx, variação da sessão)."""
+        init_db()
+        return get_dollar_stats()
+
     def put_currency(self, cotacao):
         currency = cotacao
         quote_data = {
@@ -1,8 +1,9 @@
-import yfinance as yf
 from abc import ABC
 from crewai.tools import BaseTool
-from datetime import datetime, timedelta
-import pandas as pd
+from datetime import datetime
+
+from src.services.market_data_service import yf_history
+
 
 class SearchDuckDuckGoSearchApi(BaseTool, ABC):
     name: str = "SearchDuckDuckGoSearchApi"
@@ -20,21 +21,12 @@ class SearchDuckDuckGoSearchApi(BaseTool, ABC):
             
             results = []
             for symbol, name in indices.items():
-                ticker = yf.Ticker(symbol)
-                info = ticker.history(period='1d')
+                info = yf_history(symbol, period='1d')
                 if not info.empty:
                     last_price = info['Close'].iloc[-1]
                     change = ((last_price - info['Open'].iloc[0]) / info['Open'].iloc[0]) * 100
                     results.append(f"{name}: {last_price:.2f} ({change:+.2f}%)")
 
-            # Get top gainers and losers
-            sp500 = yf.Ticker('^GSPC')
-            sp500_components = pd.DataFrame()
-            try:
-                sp500_components = sp500.history(period='2d')
-            except:
-                pass
-
             market_summary = "\n".join(results)
             current_date = datetime.now().strftime('%d/%m/%Y')
             
@@ -0,0 +1,235 @@
+import threading
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from src.entities.dollar_db import get_dollar_changes, get_dollar_daily_closes, init_db
+from src.entities.equity_db import EquityCurveRepository
+from src.entities.ledger_db import LedgerRepository
+from src.entities.stock_db import StockDataRepository
+
+# Índices de referência coletados junto com os ativos (ver src/collector.py)
+BENCHMARKS = {"^BVSP": "Ibovespa", "^GSPC": "S&P 500"}
+
+CURVE_COLUMNS = ["value_usd", "flow_usd", "fx"]
+# Pontos em cache: um por conta e dia
+POINT_COLUMNS = ["account"] + CURVE_COLUMNS
+
+
+class EquityCurveService:
+    """Curva de patrimônio diária da carteira, mantida incrementalmente.
+
+    As posições de cada dia vêm do livro de transações (desdobramentos incluídos), os
+    preços do fechamento diário das barras gravadas e o câmbio do último bid do dia;
+    tudo é alinhado por data com "último valor conhecido" (as-of). Os pontos são
+    calculados por conta, com os preços lidos uma vez por símbolo para todas as contas,
+    e a curva consolidada é a soma delas. Os dias calculados ficam em cache no banco, com
+    a posição de fechamento de cada dia: sem dados novos a chamada não recalcula nada; com
+    dados novos, só o último dia em cache (o de hoje ainda muda) e os dias afetados pelas
+    transações, barras ou cotações novas, partindo da posição do dia anterior.
+    """
+
+    def __init__(self):
+        self.ledger_repo = LedgerRepository()
+        self.stock_repo = StockDataRepository()
+        self.equity_repo = EquityCurveRepository()
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def curve(self, account: str = None) -> pd.DataFrame:
+        """Curva diária: valor em dólares e em reais, fluxo do dia, câmbio e retorno acumulado (base 100).
+
+        Sem `account`, consolida todas as contas. O retorno é ponderado no tempo: compras e
+        vendas do dia não contam como ganho.
+        """
+        with self._lock:
+            self._update()
+            points = self._frame if account is None else self._frame[self._frame["account"] == account]
+        # O câmbio do dia é o mesmo em todas as contas
+        frame = points.groupby(level="day").agg(
+            value_usd=("value_usd", "sum"), flow_usd=("flow_usd", "sum"), fx=("fx", "first"))
+        if frame.empty:
+            return frame.assign(value_brl=[], twr=[])
+
+        frame["value_brl"] = frame["value_usd"] * frame["fx"]
+        previous = frame["value_usd"].shift(1)
+        returns = np.where(previous > 0, (frame["value_usd"] - frame["flow_usd"]) / previous - 1, 0.0)
+        frame["twr"] = 100 * np.cumprod(1 + returns)
+        return frame
+
+    def benchmarks(self, index: pd.DatetimeIndex, symbols: Iterable[str] = BENCHMARKS) -> pd.DataFrame:
+        """Fechamentos dos índices de referência alinhados a `index`, em base 100 no primeiro dia com dados."""
+        if len(index) == 0:
+            return pd.DataFrame(index=index)
+        closes = self._pivot_closes(self.stock_repo.get_daily_closes(symbols, index[0].to_pydatetime()), index)
+        return 100 * closes / closes.bfill().iloc[0]
+
+    def _update(self) -> None:
+        count, trades_max_id, first_date = self.ledger_repo.get_summary()
+        if not count:
+            self._frame = pd.DataFrame(columns=POINT_COLUMNS, index=pd.DatetimeIndex([], name="day"))
+            return
+
+        symbols = self.ledger_repo.get_symbols()
+        meta = self.equity_repo.get_meta()
+        last_day = self.equity_repo.get_last_day()
+        new_count, trades_from = self.ledger_repo.get_changes_since(meta.get("trades_max_id", 0))
+
+        init_db()
+        stock_max_id, stock_from = self.stock_repo.get_changes_since(meta.get("stock_max_id", 0), symbols)
+        dollar_max_id, dollar_from = get_dollar_changes(meta.get("dollar_max_id", 0))
+
+        today = date.today()
+        unchanged = not new_count and count == meta.get("trades_count") and stock_from is None \
+            and dollar_from is None
+        if unchanged and self._frame is not None and last_day == today.isoformat():
+            # Nada novo desde a última chamada: a curva em memória está em dia
+            return
+
+        first_day = first_date.date()
+        if last_day is None or count - new_count != meta.get("trades_count"):
+            # Primeiro cálculo ou transações removidas: refaz a curva inteira
+            start = first_day
+        else:
+            candidates = [date.fromisoformat(last_day)]
+            candidates += [changed.date() for changed in (trades_from, stock_from, dollar_from)
+                           if changed is not None]
+            start = max(first_day, min(candidates))
+
+        # O recálculo parte da posição de fechamento do dia anterior, gravada no cálculo anterior
+        base = []
+        if start > first_day:
+            base = self.equity_repo.get_holdings((start - timedelta(days=1)).isoformat())
+            if not base:
+                # Cache anterior às posições diárias: refaz a curva inteira
+                start = first_day
+        trades = self.ledger_repo.get_trades_since(datetime.combine(start, datetime.min.time()))
+
+        points, holdings = self._compute(trades, base, start)
+        self.equity_repo.replace_from(start.isoformat(), points.itertuples(index=False, name=None),
+                                      holdings.itertuples(index=False, name=None), {
+            "trades_max_id": trades_max_id,
+            "trades_count": count,
+            "stock_max_id": stock_max_id,
+            "dollar_max_id": dollar_max_id,
+        })
+
+        if self._frame is None:
+            # Primeira chamada no processo: os dias anteriores vêm do cache no banco
+            self._frame = self._to_frame(self.equity_repo.get_points())
+        else:
+            new = self._to_frame(points.itertuples(index=False, name=None))
+            self._frame = pd.concat([self._frame[self._frame.index < pd.Timestamp(start)], new])
+
+    def _compute(self, trades, base, start: date):
+        """Calcula os pontos e as posições de fechamento de cada conta de `start` até hoje.
+
+        `trades` são as transações a partir de `start` e `base` a posição de fechamento
+        (conta, símbolo, quantidade, preço) do dia anterior.
+        Operações vetorizadas; retorna (pontos, posições diárias).
+        """
+        days = pd.date_range(start, date.today(), freq="D", name="day")
+        frame = pd.DataFrame({
+            "day": pd.to_datetime([trade.trade_date for trade in trades]).normalize(),
+            "account": [trade.account for trade in trades],
+            "symbol": [trade.symbol for trade in trades],
+            "type": [trade.trade_type for trade in trades],
+            "quantity": [trade.quantity for trade in trades],
+            "price": [trade.price for trade in trades],
+            "fees": [trade.fees for trade in trades],
+        })
+
+        # Quantidade após cada transação: o desdobramento multiplica a posição, então as
+        # quantidades são acumuladas (a partir da posição do dia anterior) na escala anterior
+        # aos desdobramentos seguintes
+        base = pd.DataFrame(base, columns=["account", "symbol", "shares", "price"]).astype(
+            {"shares": float, "price": float})
+        positions = [frame["account"], frame["symbol"]]
+        is_split = frame["type"] == "split"
+        factor = frame["quantity"].where(is_split, 1.0).groupby(positions).cumprod()
+        delta = frame["quantity"].where(frame["type"] == "buy", 0.0) \
+            - frame["quantity"].where(frame["type"] == "sell", 0.0)
+        opening = base.set_index(["account", "symbol"])["shares"] \
+            .reindex(pd.MultiIndex.from_arrays(positions)).fillna(0.0).to_numpy()
+        frame["shares"] = factor * (opening + (delta / factor).groupby(positions).cumsum())
+
+        # A posição do dia anterior entra como uma linha antes do primeiro dia
+        base["day"] = pd.Timestamp(start) - pd.Timedelta(days=1)
+        base["type"] = "base"
+        rows = pd.concat([base, frame], ignore_index=True)
+        if rows.empty:
+            return (pd.DataFrame(columns=["day"] + POINT_COLUMNS),
+                    pd.DataFrame(columns=["day", "account", "symbol", "shares", "price"]))
+        shares = self._as_of(rows.pivot_table(index="day", columns=["account", "symbol"], values="shares",
+                                              aggfunc="last"), days)
+        accounts = shares.columns.unique(level="account")
+        symbols = list(shares.columns.unique(level="symbol"))
+
+        # Dinheiro que entrou (compras) ou saiu (vendas) de cada conta em cada dia
+        gross = frame["quantity"] * frame["price"]
+        frame["flow"] = (gross + frame["fees"]).where(frame["type"] == "buy", 0.0) \
+            - (gross - frame["fees"]).where(frame["type"] == "sell", 0.0)
+        flows = frame.groupby(["day", "account"])["flow"].sum().unstack("account") \
+            .reindex(index=days, columns=accounts).fillna(0.0)
+
+        # Preço: fechamento gravado e, antes do primeiro, o preço das transações (ou o do dia anterior)
+        trade_prices = rows[rows["type"].isin(["buy", "sell", "base"])].pivot_table(
+            index="day", columns="symbol", values="price", aggfunc="last")
+        since = datetime.combine(start, datetime.min.time())
+        closes = self._pivot_closes(self.stock_repo.get_daily_closes(symbols, since), days)
+        prices = closes.combine_first(self._as_of(trade_prices, days)).reindex(columns=symbols)
+        # Um preço por símbolo, repetido para cada conta que o possui
+        account_prices = prices.reindex(columns=shares.columns.get_level_values("symbol"))
+
+        # Câmbio: último bid de cada dia
+        fx = pd.Series(dict(get_dollar_daily_closes(since)), dtype=float)
+        fx.index = pd.to_datetime(fx.index)
+        fx = self._as_of(fx, days) if len(fx) else pd.Series(np.nan, index=days)
+
+        holdings = shares.fillna(0.0) * account_prices.fillna(0.0).to_numpy()
+        values = holdings.T.groupby(level="account").sum().T.reindex(columns=accounts)
+
+        # Um ponto por conta e dia, a partir da primeira transação da conta
+        count = len(accounts)
+        points = pd.DataFrame({
+            "day": np.repeat(days.strftime("%Y-%m-%d"), count),
+            "account": np.tile(accounts, len(days)),
+            "value_usd": values.to_numpy().ravel(),
+            "flow_usd": flows.to_numpy().ravel(),
+            "fx": np.repeat(fx.to_numpy(), count),
+        })
+        opened = rows.groupby("account")["day"].min()
+        started = (days.to_numpy()[:, None] >= opened.reindex(accounts).to_numpy()[None, :]).ravel()
+
+        # Posição de fechamento de cada dia e símbolo das contas já abertas, ponto de partida
+        # do próximo recálculo
+        columns = shares.columns
+        closing = pd.DataFrame({
+            "day": np.repeat(days.strftime("%Y-%m-%d"), len(columns)),
+            "account": np.tile(columns.get_level_values("account"), len(days)),
+            "symbol": np.tile(columns.get_level_values("symbol"), len(days)),
+            "shares": shares.fillna(0.0).to_numpy().ravel(),
+            "price": account_prices.to_numpy().ravel(),
+        })
+        closing["price"] = closing["price"].astype(object).where(closing["price"].notna(), None)
+        held = (days.to_numpy()[:, None] >= opened.reindex(columns.get_level_values("account")).to_numpy()[None, :])
+        return points[started], closing[held.ravel()]
+
+    def _pivot_closes(self, rows, days: pd.DatetimeIndex) -> pd.DataFrame:
+        if not rows:
+            return pd.DataFrame(index=days)
+        closes = pd.DataFrame(rows, columns=["symbol", "day", "close"])
+        closes["day"] = pd.to_datetime(closes["day"])
+        return self._as_of(closes.pivot_table(index="day", columns="symbol", values="close", aggfunc="last"), days)
+
+    @staticmethod
+    def _as_of(data, days: pd.DatetimeIndex):
+        """Alinha `data` (indexado por dia) a `days`, usando o último valor conhecido até cada dia."""
+        return data.reindex(data.index.union(days)).ffill().reindex(days)
+
+    @staticmethod
+    def _to_frame(points) -> pd.DataFrame:
+        frame = pd.DataFrame(points, columns=["day"] + POINT_COLUMNS)
+        return frame.set_index(pd.to_datetime(frame.pop("day")).rename("day"))
@@ -0,0 +1,237 @@
+"""Exportação analítica incremental para Parquet, particionada por data.
+
+Grava em `data/exports/<conjunto>/dt=AAAA-MM-DD/part-*.parquet` (layout Hive, lido
+diretamente por pandas, pyarrow, DuckDB, Spark e ferramentas de BI):
+
+- portfolio_snapshots: um ponto por conta e dia da curva de patrimônio (dias já encerrados);
+- fx_ticks: cada cotação do dólar gravada;
+- fx_candles: candles horários do dólar (horas já encerradas);
+- stock_bars: barras intradiárias das ações (depois que deixam de ser atualizadas).
+
+Cada execução exporta apenas o que foi gravado desde a marca d'água anterior, lendo o
+banco em blocos e escrevendo cada bloco assim que lido, então a memória usada não
+depende do tamanho do histórico. Os arquivos só ficam visíveis (sem o prefixo ".")
+depois que o conjunto inteiro foi gravado, junto com a nova marca d'água.
+
+Uso:
+    python -m src.services.export_service [--target data/exports] [--every 3600]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+from src.entities.dollar_db import get_dollar_candles, get_dollar_changes, init_db, iter_dollar_range
+from src.entities.equity_db import EquityCurveRepository
+from src.entities.stock_db import StockDataRepository
+from src.services.bulk_io_service import CHUNK_SIZE, DATASETS, BulkIOService
+
+EXPORT_DIR = "data/exports"
+WATERMARKS_FILE = "_watermarks.json"
+# Barras mais recentes que isso ainda podem ser atualizadas pelo coletor
+BAR_SETTLE = timedelta(hours=1)
+# Partições com arquivo aberto ao mesmo tempo (os dados chegam ordenados por data)
+MAX_OPEN_PARTITIONS = 4
+
+# Colunas e tipos (como em bulk_io_service.DATASETS) de cada conjunto exportado
+SCHEMAS = {
+    "portfolio_snapshots": {"day": "date", "account": "str", "value_usd": "float", "flow_usd": "float",
+                            "fx": "float"},
+    "fx_ticks": DATASETS["dollar"],
+    "fx_candles": {"hour": "datetime", "open": "float", "high": "float", "low": "float", "close": "float",
+                   "ticks": "int"},
+    "stock_bars": DATASETS["stock_data"],
+}
+# Coluna usada para a partição por data
+PARTITION_COLUMNS = {
+    "portfolio_snapshots": "day",
+    "fx_ticks": "date_hour",
+    "fx_candles": "hour",
+    "stock_bars": "date",
+}
+
+
+class _PartitionedWriter:
+    """Escreve blocos de um conjunto em arquivos Parquet por data, sem juntar os blocos em memória."""
+
+    def __init__(self, root: Path, dataset: str, run_id: str):
+        self.root = root / dataset
+        self.dataset = dataset
+        self.run_id = run_id
+        bulk_io = BulkIOService()
+        self.schema = bulk_io._arrow().schema(
+            [(name, bulk_io._arrow_type(kind)) for name, kind in SCHEMAS[dataset].items()])
+        self.rows = 0
+        self._writers = {}
+        self._written: List[Path] = []
+
+    def write(self, frame: pd.DataFrame) -> None:
+        pa, pq = BulkIOService._arrow(), BulkIOService._parquet()
+        partitions = frame[PARTITION_COLUMNS[self.dataset]].dt.strftime("%Y-%m-%d")
+        for day, part in frame.groupby(partitions, sort=False):
+            writer = self._writers.pop(day, None) or self._open(day, pq)
+            # Mais recente no fim: a partição menos usada é a primeira a ser fechada
+            self._writers[day] = writer
+            writer.write_table(pa.Table.from_pandas(part, schema=self.schema, preserve_index=False))
+            while len(self._writers) > MAX_OPEN_PARTITIONS:
+                self._writers.pop(next(iter(self._writers))).close()
+        self.rows += len(frame)
+
+    def _open(self, day: str, pq):
+        directory = self.root / f"dt={day}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f".part-{self.run_id}-{len(self._written):05d}.parquet"
+        self._written.append(path)
+        return pq.ParquetWriter(path, self.schema)
+
+    def commit(self) -> int:
+        """Fecha os arquivos e os torna visíveis (remove o prefixo "."). Retorna quantos foram gravados."""
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        for path in self._written:
+            path.rename(path.with_name(path.name[1:]))
+        return len(self._written)
+
+    def abort(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        for path in self._written:
+            path.unlink(missing_ok=True)
+
+
+class ExportService:
+    """Exporta os dados do dashboard para conjuntos Parquet particionados por data, incrementalmente."""
+
+    def __init__(self, target: str = EXPORT_DIR, chunk_size: int = CHUNK_SIZE):
+        self.root = Path(target)
+        self.chunk_size = chunk_size
+        self.stock_repo = StockDataRepository()
+        self.equity_repo = EquityCurveRepository()
+
+    def export_all(self, datasets: Iterable[str] = SCHEMAS) -> Dict[str, int]:
+        """Exporta cada conjunto desde a sua marca d'água. Retorna as linhas exportadas por conjunto.
+
+        Um erro em um conjunto é registrado no log e não impede os demais.
+        """
+        watermarks = self.load_watermarks()
+        exported = {}
+        for dataset in datasets:
+            if dataset not in SCHEMAS:
+                raise ValueError(f"Conjunto de dados inválido: {dataset}. Opções: {', '.join(SCHEMAS)}")
+            # Com microssegundos: duas execuções no mesmo segundo não podem sobrescrever os arquivos uma da outra
+            run_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+            writer = _PartitionedWriter(self.root, dataset, run_id)
+            try:
+                mark, chunks = getattr(self, f"_{dataset}")(watermarks.get(dataset, {}))
+                for rows in chunks:
+                    writer.write(self._frame(dataset, rows))
+                files = writer.commit()
+            except Exception as e:
+                writer.abort()
+                logging.error(f"Erro ao exportar {dataset}: {e}")
+                continue
+            watermarks[dataset] = mark
+            self._save_watermarks(watermarks)
+            exported[dataset] = writer.rows
+            logging.info(f"Exportação de {dataset}: {writer.rows} linha(s) em {files} arquivo(s)")
+        return exported
+
+    # ------------------------------------------------------------------ conjuntos
+    # Cada um retorna (nova marca d'água, blocos de linhas a exportar)
+
+    def _portfolio_snapshots(self, mark: dict):
+        # Só dias encerrados: o dia de hoje ainda muda a cada cotação
+        after = mark.get("day", "")
+        today = date.today().isoformat()
+        points = [point for point in self.equity_repo.get_points(after) if after < point[0] < today]
+        new_mark = {"day": points[-1][0]} if points else mark
+        return new_mark, self._chunked(points)
+
+    def _fx_ticks(self, mark: dict):
+        init_db()
+        after_id = mark.get("id", 0)
+        until_id, _ = get_dollar_changes(after_id)
+        return {"id": until_id}, iter_dollar_range(after_id, until_id, self.chunk_size)
+
+    def _fx_candles(self, mark: dict):
+        init_db()
+        current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+        start = datetime.fromisoformat(mark["hour"]) + timedelta(hours=1) if "hour" in mark \
+            else datetime(1970, 1, 1)
+        # Candles agregados no SQLite: uma linha por hora, sem a hora em andamento
+        candles = [candle for candle in get_dollar_candles(start)
+                   if datetime.fromisoformat(candle[0]) < current_hour]
+        new_mark = {"hour": candles[-1][0]} if candles else mark
+        return new_mark, self._chunked(candles)
+
+    def _stock_bars(self, mark: dict):
+        after_id = mark.get("id", 0)
+        after_date = datetime.fromisoformat(mark["date"]) if "date" in mark else datetime.min
+        until_id = self.stock_repo.get_max_id()
+        until_date = max(after_date, datetime.now() - BAR_SETTLE)
+        chunks = self.stock_repo.iter_settled_bars(after_id, until_id, after_date, until_date, self.chunk_size)
+        return {"id": until_id, "date": until_date.isoformat()}, chunks
+
+    # ------------------------------------------------------------------ utils
+
+    def _chunked(self, rows: list):
+        for start in range(0, len(rows), self.chunk_size):
+            yield rows[start:start + self.chunk_size]
+
+    @staticmethod
+    def _frame(dataset: str, rows) -> pd.DataFrame:
+        frame = pd.DataFrame.from_records(rows, columns=list(SCHEMAS[dataset]))
+        for name, kind in SCHEMAS[dataset].items():
+            if kind in ("datetime", "date"):
+                frame[name] = pd.to_datetime(frame[name], format="mixed")
+            elif kind == "float":
+                frame[name] = pd.to_numeric(frame[name], errors="coerce").astype("float64")
+            elif kind == "int":
+                frame[name] = frame[name].astype("int64")
+        return frame
+
+    def load_watermarks(self) -> dict:
+        path = self.root / WATERMARKS_FILE
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_watermarks(self, watermarks: dict) -> None:
+        # Gravação atômica (arquivo temporário + rename), como o status do coletor
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / WATERMARKS_FILE
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(watermarks, f, indent=4)
+        os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportação incremental dos dados do dashboard para Parquet")
+    parser.add_argument("--target", default=EXPORT_DIR, help="Diretório dos conjuntos exportados")
+    parser.add_argument("--datasets", nargs="+", choices=list(SCHEMAS), default=list(SCHEMAS),
+                        help="Conjuntos a exportar (padrão: todos)")
+    parser.add_argument("--every", type=float, default=None,
+                        help="Repete a exportação a cada N segundos (padrão: exporta uma vez e sai)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    service = ExportService(args.target)
+    while True:
+        service.export_all(args.datasets)
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import logging
+from datetime import date, datetime
+
+from src.entities.ledger_db import LedgerRepository, Trade
+from src.model.account import DEFAULT_ACCOUNT, account_of
+
+# Método de custo usado no cálculo do preço médio e do lucro realizado
+COST_METHOD = "fifo"
+# Marca (em ledger_meta) da importação única dos ativos cadastrados antes do ledger
+ASSETS_SEEDED = "assets_seeded"
+
+
+class LedgerService:
+    """Service for the trade ledger (buys, sells, fees and splits)."""
+
+    def __init__(self, cost_method: str = COST_METHOD):
+        self.ledger_repo = LedgerRepository(cost_method=cost_method)
+
+    def register_trade(self, symbol, trade_type, quantity, price, trade_date, fees=0.0, notes="",
+                       account=DEFAULT_ACCOUNT):
+        """Register a trade and update the symbol's position in the account."""
+        try:
+            trade_date = datetime.combine(trade_date, datetime.min.time()) \
+                if not isinstance(trade_date, datetime) else trade_date
+            self.ledger_repo.record_trade(Trade(
+                symbol=symbol.upper(),
+                trade_type=trade_type,
+                quantity=float(quantity),
+                price=float(price),
+                fees=float(fees),
+                trade_date=trade_date,
+                notes=notes,
+                account=account
+            ))
+            return True, f"Transação de {symbol.upper()} registrada com sucesso!"
+        except ValueError as e:
+            return False, str(e)
+
+    def get_positions(self):
+        """Return the current positions indexed by (account, symbol)."""
+        return {(position.account, position.symbol): position for position in self.ledger_repo.get_positions()}
+
+    def seed_from_assets(self, assets):
+        """Record the initial purchase of assets that have no trades yet.
+
+        Called when assets are registered; the check for existing trades happens in
+        the same write transaction, so concurrent calls seed an asset only once.
+        Returns the number of seeded assets.
+        """
+        trades = [
+            Trade(
+                symbol=asset["symbol"],
+                trade_type="buy",
+                quantity=float(asset["shares"]),
+                price=float(asset["purchase_price"]),
+                trade_date=self._purchase_date(asset),
+                notes="Posição inicial importada do cadastro de ativos",
+                account=account_of(asset)
+            )
+            for asset in assets
+            if float(asset.get("shares") or 0) > 0
+        ]
+        if not trades:
+            return 0
+        return len(self.ledger_repo.record_trades(trades, if_absent=True))
+
+    def migrate_assets(self, assets):
+        """Seed, once per ledger, the assets registered before the ledger existed."""
+        if self.ledger_repo.get_meta(ASSETS_SEEDED) is not None:
+            return 0
+        seeded = self.seed_from_assets(assets)
+        self.ledger_repo.set_meta(ASSETS_SEEDED, datetime.now().isoformat())
+        return seeded
+
+    @staticmethod
+    def _purchase_date(asset):
+        """Purchase date of a registered asset; today when it is missing or invalid."""
+        try:
+            return datetime.fromisoformat(asset.get("purchase_date") or "")
+        except (TypeError, ValueError):
+            logging.warning(f"Data de compra inválida para {asset['symbol']} ({asset.get('purchase_date')!r}): "
+                            "usando a data de hoje na posição inicial")
+            return datetime.combine(date.today(), datetime.min.time())
+
+    def delete_symbol(self, symbol, account=DEFAULT_ACCOUNT):
+        """Remove the ledger history of a symbol in an account."""
+        self.ledger_repo.delete_symbol(symbol, account)
@@ -0,0 +1,99 @@
+import math
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from src.entities.dollar_db import get_dollar_candles, init_db
+from src.services.ttl_cache import get_cache
+
+# Limite de tokens do contexto injetado na descrição das tarefas
+TOKEN_BUDGET = 600
+# Horas de candles do dólar incluídas no contexto
+CANDLE_HOURS = 6
+# Segundos em que um contexto calculado é reaproveitado
+CONTEXT_TTL = 30.0
+# Contextos diferentes (um por conjunto de símbolos) mantidos em memória
+MAX_CONTEXTS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens (~4 caracteres por token), suficiente para respeitar o orçamento."""
+    return math.ceil(len(text) / 4)
+
+
+class LLMContextBuilder:
+    """Resume carteira, estatísticas e candles do dólar em um texto compacto para os prompts.
+
+    Os dados vêm do banco e das camadas já existentes (nenhuma consulta aos provedores),
+    então o agente recebe os números na descrição da tarefa em vez de chamar ferramentas
+    para descobri-los. As seções entram por prioridade até o orçamento de tokens; a
+    carteira é listada das maiores posições para as menores e o restante é resumido.
+    """
+
+    def __init__(self, token_budget: int = TOKEN_BUDGET, ttl: float = CONTEXT_TTL):
+        self.token_budget = token_budget
+        self.ttl = ttl
+        self._cache = get_cache("llm_context", ttl=ttl, maxsize=MAX_CONTEXTS)
+
+    def build(self, symbols: Optional[List[str]] = None) -> str:
+        """Contexto para os símbolos informados (todos os ativos se None), reaproveitado por `ttl` segundos."""
+        key = tuple(sorted(symbols)) if symbols is not None else None
+        return self._cache.get_or_set(key, lambda: self._fit(
+            [self._fx_section(), self._candles_section(), *self._portfolio_sections(symbols)]))
+
+    def _fit(self, sections: List[str]) -> str:
+        lines = [f"Dados em {datetime.now().strftime('%d/%m/%Y %H:%M')}:"]
+        used = estimate_tokens(lines[0])
+        skipped = 0
+        for section in filter(None, sections):
+            cost = estimate_tokens(section) + 1
+            if used + cost > self.token_budget:
+                skipped += 1
+                continue
+            lines.append(section)
+            used += cost
+        if skipped:
+            lines.append(f"(+{skipped} item(ns) omitido(s) pelo limite de contexto)")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _fx_section() -> str:
+        from src.resources import get_currency_api
+        stats = get_currency_api().get_currency_stats()
+        if stats['last'] is None:
+            return ""
+        return (f"USD/BRL {stats['last']:.4f} (var {stats['change']:+.4f}; sessão {stats['session_change_pct']:+.2f}%; "
+                f"dia {stats['day_low']:.4f}-{stats['day_high']:.4f}; SMA20 {stats['sma_20']:.4f}; "
+                f"SMA100 {stats['sma_100']:.4f}; EWMA20 {stats['ewma_20']:.4f})")
+
+    @staticmethod
+    def _candles_section() -> str:
+        init_db()
+        candles = get_dollar_candles(datetime.now() - timedelta(hours=CANDLE_HOURS))
+        if not candles:
+            return ""
+        rows = [f"{bucket[11:16]} {opening:.4f}/{high:.4f}/{low:.4f}/{closing:.4f}"
+                for bucket, opening, high, low, closing, _ in candles]
+        return "USD/BRL por hora (abre/máx/mín/fecha): " + "; ".join(rows)
+
+    @staticmethod
+    def _portfolio_sections(symbols: Optional[List[str]]) -> List[str]:
+        from src.resources import get_asset_service
+        portfolio = get_asset_service().get_portfolio_data()
+        if symbols is not None:
+            portfolio = [asset for asset in portfolio if asset['Symbol'] in symbols]
+        if not portfolio:
+            return []
+
+        total_value = sum(asset['Market Value ($)'] for asset in portfolio)
+        total_cost = sum(asset['Total Cost ($)'] for asset in portfolio)
+        gain_pct = (total_value - total_cost) / total_cost * 100 if total_cost else 0.0
+        sections = [f"Carteira: {len(portfolio)} ativo(s), valor ${total_value:,.2f}, custo ${total_cost:,.2f}, "
+                    f"ganho {gain_pct:+.2f}%. Ativo: qtd, preço, dia %, total %, último dividendo"]
+        several_accounts = len({asset['Account'] for asset in portfolio}) > 1
+        for asset in sorted(portfolio, key=lambda asset: asset['Market Value ($)'], reverse=True):
+            stale = " (cotação antiga)" if asset['Stale'] else ""
+            account = f" [{asset['Account']}]" if several_accounts else ""
+            sections.append(f"{asset['Symbol']}{account}: {asset['Shares']:g}, ${asset['Last Price']:.2f}, "
+                            f"{asset['Day Gain UNRL (%)']:+.2f}%, {asset['Tot Gain UNRL (%)']:+.2f}%, "
+                            f"${asset['Tot Div']:.2f}{stale}")
+        return sections
@@ -0,0 +1,329 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Optional
+
+import yfinance as yf
+
+from src.entities.dollar_db import get_latest_dollar, init_db
+from src.entities.stock_db import StockDataRepository
+from src.resources import get_response_cache
+from src.services.circuit_breaker import CircuitOpenError, get_breaker
+from src.services.provider_gateway import get_gateway
+from src.services import provider_tape
+from src.services.dollar_service import CurrencyApi
+from src.services.response_cache_service import DIVIDENDS, MISS, QUOTE
+
+YFINANCE = "yfinance"
+AWESOMEAPI = "awesomeapi"
+
+INTRADAY_INTERVAL = "1m"
+# Até quando o yfinance guarda barras de cada intervalo e o maior período aceito por consulta
+INTRADAY_LIMITS = {
+    "1m": (timedelta(days=29), timedelta(days=7)),
+    "5m": (timedelta(days=59), timedelta(days=59)),
+}
+
+
+@dataclass
+class ServedValue:
+    """Último valor conhecido de um dado de mercado, com a sua origem e idade."""
+    value: Any
+    fetched_at: datetime
+    source: str  # 'provider' ou 'db'
+    stale_after: float = 60.0
+
+    @property
+    def age_seconds(self) -> float:
+        return (datetime.now() - self.fetched_at).total_seconds()
+
+    @property
+    def stale(self) -> bool:
+        return self.age_seconds > self.stale_after
+
+
+def provider_call(provider: str, kind: str, key, fetch: Callable):
+    """Resposta de `fetch` pelo cache em disco e pelo gateway do provedor.
+
+    Uma resposta ainda válida no cache (ver TTLS) não gera requisição. Na falta dela, a
+    consulta passa pelo gateway, que junta pedidos iguais e limita a taxa, e a resposta é
+    gravada no cache. Durante a gravação ou reprodução de uma fita o cache é ignorado.
+    """
+    if provider_tape.is_active():
+        return get_gateway(provider).call(key, fetch)
+    cache = get_response_cache()
+    value = cache.get(provider, key)
+    if value is not MISS:
+        return value
+
+    def fetch_and_store():
+        value = fetch()
+        cache.put(provider, kind, key, value)
+        return value
+
+    return get_gateway(provider).call(key, fetch_and_store)
+
+
+def yf_history(symbol: str, **params):
+    """`yf.Ticker(symbol).history(**params)` pelo cache e pelo gateway do yfinance.
+
+    Consultas idênticas simultâneas (mesmo símbolo e parâmetros) viram uma só requisição
+    e recebem o mesmo DataFrame, que não deve ser alterado no lugar. Faixas com horário
+    (`start`/`end` datetime, as barras intradiárias desde a última gravada) mudam a cada
+    ciclo e nunca seriam lidas de novo: vão direto ao gateway, sem passar pelo cache em disco.
+    """
+    key = ("history", symbol, tuple(sorted(params.items())))
+    fetch = lambda: yf.Ticker(symbol).history(**params)
+    if isinstance(params.get("start"), datetime) or isinstance(params.get("end"), datetime):
+        return get_gateway(YFINANCE).call(key, fetch)
+    kind = DIVIDENDS if params.get("actions") else QUOTE
+    return provider_call(YFINANCE, kind, key, fetch)
+
+
+def yf_actions(symbol: str):
+    """`yf.Ticker(symbol).actions` pelo cache e pelo gateway do yfinance."""
+    return provider_call(YFINANCE, DIVIDENDS, ("actions", symbol), lambda: yf.Ticker(symbol).actions)
+
+
+def fetch_intraday_bars(symbol: str, interval: str = INTRADAY_INTERVAL, since: datetime = None) -> list:
+    """Busca barras intradiárias no yfinance como linhas de STOCK_COLUMNS.
+
+    Cada barra é identificada pelo horário informado pelo provedor (convertido para o
+    horário local), então buscar a mesma barra de novo apenas a atualiza. Com `since`,
+    busca a partir da última barra salva (que pode ter sido gravada ainda incompleta),
+    cobrindo o período em que o coletor ficou parado, até o limite do yfinance.
+    """
+    lookback, span = INTRADAY_LIMITS[interval]
+    if since is None:
+        frames = [yf_history(symbol, period="1d", interval=interval)]
+    else:
+        now = datetime.now()
+        start = max(since, now - lookback)
+        frames = []
+        while True:
+            # Intervalos longos são divididos no tamanho máximo aceito por consulta
+            end = start + span
+            frames.append(yf_history(symbol, start=start.astimezone(), end=end.astimezone() if end < now else None,
+                                     interval=interval))
+            if end >= now:
+                break
+            start = end
+
+    local_tz = datetime.now().astimezone().tzinfo
+    rows = []
+    for hist in frames:
+        hist = hist.dropna(subset=['Close'])
+        if hist.empty:
+            continue
+        index = hist.index
+        if index.tz is not None:
+            index = index.tz_convert(local_tz).tz_localize(None)
+        for timestamp, (open_, high, low, close, volume) in zip(
+                index.to_pydatetime(), hist[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=False)):
+            rows.append((symbol, float(close), int(volume), float(high), float(low), float(open_),
+                         float(close), timestamp.isoformat()))
+    return rows
+
+
+def fetch_corporate_actions(symbol: str, since: datetime = None) -> list:
+    """Busca dividendos e desdobramentos no yfinance como (data, tipo, valor).
+
+    Com `since`, busca apenas os eventos posteriores a essa data.
+    """
+    if since is None:
+        actions = yf_actions(symbol)
+    else:
+        start = since.date() + timedelta(days=1)
+        if start > date.today():
+            return []
+        actions = yf_history(symbol, start=start, interval="1d", actions=True)
+
+    rows = []
+    for column, action_type in (('Dividends', 'dividend'), ('Stock Splits', 'split')):
+        if actions is None or column not in actions:
+            continue
+        events = actions[column][actions[column] != 0]
+        for timestamp, value in events.items():
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.tz_localize(None)
+            rows.append((timestamp.to_pydatetime(), action_type, float(value)))
+    return rows
+
+
+def fetch_currency(coin: str) -> dict:
+    """Busca a cotação de uma moeda na AwesomeAPI."""
+    def fetch():
+        currency = CurrencyApi().get_currency(coin=coin)
+        if coin not in currency:
+            raise ValueError(f"Resposta inesperada da AwesomeAPI para {coin}: {currency}")
+        return currency
+
+    return provider_call(AWESOMEAPI, QUOTE, ("currency", coin), fetch)
+
+
+class MarketDataService:
+    """Camada de acesso a dados de mercado com stale-while-revalidate.
+
+    As leituras nunca esperam pelo provedor: retornam o último valor conhecido
+    (memória ou banco) e, se ele estiver velho, agendam uma revalidação em
+    segundo plano. Cada provedor tem um circuit breaker que suspende as chamadas
+    durante o cool-down após falhas consecutivas.
+    """
+
+    def __init__(self, refresh_after: float = 3.0, stale_after: float = 60.0, max_workers: int = 4,
+                 read_only: bool = False):
+        self.refresh_after = refresh_after
+        self.stale_after = stale_after
+        self.read_only = read_only
+        self.stock_repo = StockDataRepository()
+        self._values = {}
+        self._loaded_at = {}
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="revalidate")
+
+    def get_quote(self, symbol: str) -> Optional[ServedValue]:
+        """Cotação do dia de uma ação (close, open, high, low, volume)."""
+        return self._serve(
+            key=("quote", symbol),
+            provider=YFINANCE,
+            fetch=lambda: self._fetch_quote(symbol),
+            load_fallback=lambda: self._load_quote(symbol),
+            on_fresh=None,
+        )
+
+    def get_fx(self, coin: str = 'USDBRL') -> Optional[ServedValue]:
+        """Cotação de uma moeda no formato da AwesomeAPI ({coin: {...}})."""
+        # O banco só guarda a cotação USD-BRL
+        persisted = coin == 'USDBRL'
+        return self._serve(
+            key=("fx", coin),
+            provider=AWESOMEAPI,
+            fetch=lambda: fetch_currency(coin),
+            load_fallback=(lambda: self._load_fx(coin)) if persisted else (lambda: None),
+            on_fresh=self._save_fx if persisted else None,
+        )
+
+    def revalidate(self, key, provider: str, fetch: Callable, on_fresh: Callable = None) -> bool:
+        """Agenda a atualização de `key` em segundo plano. Retorna False se já estiver em andamento.
+
+        No modo somente leitura nenhum provedor é chamado e a chamada é ignorada.
+        """
+        if self.read_only:
+            return False
+        with self._lock:
+            if key in self._inflight:
+                return False
+            self._inflight.add(key)
+        self._executor.submit(self._revalidate, key, provider, fetch, on_fresh)
+        return True
+
+    def close(self) -> None:
+        """Encerra o pool de revalidação sem esperar as consultas em andamento."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _serve(self, key, provider: str, fetch: Callable, load_fallback: Callable,
+               on_fresh: Callable) -> Optional[ServedValue]:
+        with self._lock:
+            current = self._values.get(key)
+            loaded_at = self._loaded_at.get(key)
+
+        if self.read_only:
+            # O coletor grava no banco: relê o último valor a cada `refresh_after` segundos
+            if current is None or loaded_at is None or time.monotonic() - loaded_at > self.refresh_after:
+                current = self._from_fallback(key, load_fallback, replace=True) or current
+            return current
+
+        if current is None:
+            current = self._from_fallback(key, load_fallback)
+
+        if current is None or current.age_seconds > self.refresh_after:
+            self.revalidate(key, provider, fetch, on_fresh)
+        return current
+
+    def _from_fallback(self, key, load_fallback: Callable, replace: bool = False) -> Optional[ServedValue]:
+        try:
+            loaded = load_fallback()
+        except Exception as e:
+            logging.error(f"Erro ao carregar último valor de {key} do banco: {e}")
+            return None
+        if loaded is None:
+            return None
+
+        value, fetched_at = loaded
+        served = ServedValue(value, fetched_at, "db", self.stale_after)
+        with self._lock:
+            self._loaded_at[key] = time.monotonic()
+            if replace:
+                self._values[key] = served
+                return served
+            # Outra thread pode já ter revalidado enquanto o banco era lido
+            return self._values.setdefault(key, served)
+
+    def _revalidate(self, key, provider: str, fetch: Callable, on_fresh: Callable) -> None:
+        try:
+            value = get_breaker(provider).call(fetch)
+            if value is None:
+                # O provedor respondeu, mas sem dados (símbolo inválido, deslistado ou novo):
+                # não é falha do provedor e não conta para abrir o circuito
+                logging.warning(f"Sem dados de {provider} para {key}")
+                return
+            with self._lock:
+                self._values[key] = ServedValue(value, datetime.now(), "provider", self.stale_after)
+            if on_fresh:
+                on_fresh(value)
+        except CircuitOpenError:
+            logging.debug(f"Revalidação de {key} ignorada: circuito {provider} aberto")
+        except Exception as e:
+            logging.error(f"Erro ao revalidar {key} em {provider}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def _fetch_quote(self, symbol: str) -> Optional[dict]:
+        # Grava as barras novas e monta a cotação a partir delas (None se o símbolo não tem dados)
+        bars = fetch_intraday_bars(symbol, since=self.stock_repo.get_last_bar_date(symbol))
+        self.stock_repo.upsert_bars(bars)
+        loaded = self._load_quote(symbol)
+        return loaded[0] if loaded else None
+
+    def _load_quote(self, symbol: str):
+        summary = self.stock_repo.get_session_summary(symbol)
+        if summary is None:
+            return None
+        bar_time = summary.pop('date')
+        return summary, bar_time
+
+    def _load_fx(self, coin: str):
+        init_db()
+        row = get_latest_dollar()
+        if row is None:
+            return None
+        _, code, codein, name, high, low, var_bid, pct_change, bid, ask, date_hour = row
+        value = {coin: {
+            'code': code,
+            'codein': codein,
+            'name': name,
+            'high': high,
+            'low': low,
+            'varBid': var_bid,
+            'pctChange': pct_change,
+            'bid': bid,
+            'ask': ask,
+        }}
+        return value, datetime.fromisoformat(str(date_hour))
+
+    def _save_fx(self, value: dict) -> None:
+        CurrencyApi().put_currency(value)
+
+
+# PROVIDER_MODE=record|replay grava ou reproduz as respostas dos provedores (ver provider_tape)
+provider_tape.install_from_env()
+
+# Com o coletor (python -m src.collector) rodando, o dashboard apenas lê o banco.
+# MARKET_DATA_MODE=live faz o próprio processo consultar os provedores.
+market_data_service = MarketDataService(read_only=os.getenv("MARKET_DATA_MODE", "read_only") != "live")
@@ -1,127 +1,150 @@
 import pandas as pd
 import streamlit as st
-import yfinance as yf
-import plotly.express as px
 
-from functools import lru_cache
-
-from src.services.dollar_service import CurrencyApi
-from src.services.asset_service import AssetService
-
-currency_api = CurrencyApi()
-asset_service = AssetService()
+from datetime import date, datetime, time, timedelta
+
+from src.resources import (get_asset_service, get_caixa_repository, get_currency_api, get_dollar_chart_service,
+                           get_equity_service)
+from src.services.asset_service import CONSOLIDATED
+from src.services.equity_service import BENCHMARKS
+from src.services.market_data_service import market_data_service
+
+# Instâncias compartilhadas por todo o processo (ver src/resources.py)
+currency_api = get_currency_api()
+asset_service = get_asset_service()
+dollar_chart = get_dollar_chart_service()
+equity_service = get_equity_service()
+
+# Janelas do gráfico do dólar (None: período escolhido pelo usuário)
+JANELAS_DOLAR = {
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+    "1w": timedelta(weeks=1),
+    "1m": timedelta(days=30),
+    "Personalizado": None,
+}
 
 class PortfolioService:
     def get_cotacao(self):
         try:
-            # Get current quote
-            current_quote = float(currency_api.get_save_currency(coin='USDBRL')['USDBRL']['bid'])
-            
-            # Get daily data to calculate variation
-            currency_daily = currency_api.get_daily_currency()
-            if currency_daily and len(currency_daily) > 1:
-                # Get previous quote (second most recent)
-                previous_quote = float(currency_daily[1][0])  # [1] for second item, [0] for bid value
-                
-                # Calculate variation
-                variation = current_quote - previous_quote
-                
-                return current_quote, variation
-            
-            return current_quote, 0.00
-            
-        except (ValueError, TypeError, IndexError):
-            return 0.00, 0.00  # Fallback em caso de erro
-
-    def get_total_value(self) -> float:
-        """Calcula o valor total do portfólio em dólares"""
-        portfolio_data = asset_service.get_portfolio_data()
-        if not portfolio_data:
-            return 0.0
-        
-        total_value = 0.0
-        for asset in portfolio_data:
-            if 'Market Value ($)' in asset and asset['Market Value ($)']:
-                try:
-                    # Remove any formatting and convert to float
-                    value = float(str(asset['Market Value ($)']).replace('$', '').replace(',', ''))
-                    total_value += value
-                except (ValueError, TypeError):
-                    continue
-        
-        return total_value
-
-    def dolar_metrica(self):
-        """Exibe os dados diários da cotação do dólar em um gráfico de linha com botões de zoom no Streamlit."""
-        # Obtém os dados diários
-        currency_daily = currency_api.get_daily_currency()
-
-        if currency_daily:
-            # Converte a lista de tuplas para DataFrame, especificando as colunas
-            df = pd.DataFrame(currency_daily, columns=['bid', 'date_hour'])
-
-            # Converte 'bid' para float (ou Decimal, se preferir precisão)
-            df['bid'] = df['bid'].apply(lambda x: float(x) if pd.notna(x) else 0.0)
-
-            # Filtra os valores onde 'bid' não é 0
-            df = df[df['bid'] != 0.0]
-
-            # Converte 'date_hour' para datetime para o eixo X
-            df['date_hour'] = pd.to_datetime(df['date_hour'], format='mixed')
-
-            # Ordena por 'date_hour' para manter a ordem cronológica (do mais antigo para o mais recente)
-            df = df.sort_values('date_hour', ascending=True)
+            # Último valor conhecido; a atualização acontece em segundo plano
+            served = market_data_service.get_fx('USDBRL')
+            if served is None:
+                return 0.00, 0.00
+            current_quote = float(served.value['USDBRL']['bid'])
 
-            with st.expander("Variação do Dólar/Real"):
-                # Verifica se há dados após o filtro
-                if not df.empty:
-                    # Filtrar os dados das últimas 4 horas
-                    df_recente = df[df['date_hour'] > pd.Timestamp.now() - pd.Timedelta(hours=1)]
+            # A variação vem das estatísticas incrementais, sem consultar o histórico
+            stats = currency_api.get_currency_stats()
+            return current_quote, stats['change']
 
-                    # Exibe o gráfico de linha com botões de zoom
-                    fig = px.line(df_recente, x='date_hour', y='bid',
-                                  labels={'bid': 'Cotação', 'date_hour': 'Data/Hora'})
+        except (ValueError, TypeError, IndexError, KeyError):
+            return 0.00, 0.00  # Fallback em caso de erro
 
-                    st.plotly_chart(fig, use_container_width=True, width=100, height=100)
-                else:
-                    st.warning("Nenhum dado válido disponível para a cotação após filtrar valores zero.")
-        else:
-            st.warning("Nenhum dado diário disponível para a cotação.")
+    def get_account_totals(self, portfolio_data=None):
+        """Totais por conta e consolidados, com o caixa de cada conta (ver AssetService.get_account_summaries)."""
+        return asset_service.get_account_summaries(portfolio_data, get_caixa_repository().get_balances())
 
+    @staticmethod
+    def conta_selecionada() -> str:
+        """Conta escolhida no dashboard (CONSOLIDATED: todas)."""
+        return st.session_state.get("conta", CONSOLIDATED)
 
-    @lru_cache(maxsize=128)  # Adiciona caching para evitar chamadas repetidas
-    def get_stock_data(self, symbol):
-        """Busca dados de uma ação específica do Yahoo Finance com caching."""
-        try:
-            stock = yf.Ticker(symbol)
-            # Usa dados diários em vez de minuto a minuto para maior velocidade
-            hist = stock.history(period="1d")
-            last_price = hist['Close'].iloc[-1] if not hist.empty else stock.fast_info['lastPrice']
-            dividends = stock.dividends.tail(1).sum() if not stock.dividends.empty else 0.0
-            return {
-                'last_price': last_price,
-                'dividends': dividends
-            }
-        except Exception as e:
-            st.error(f"Erro ao buscar dados para {symbol}: {e}")
-            return {'last_price': None, 'dividends': 0.0}
+    def dolar_metrica(self):
+        """Exibe a cotação do dólar na janela escolhida em um gráfico de linha no Streamlit.
+
+        Só as cotações da janela são lidas do banco (filtradas e ordenadas pelo SQLite), a
+        série é reduzida a um número fixo de pontos e a figura fica em cache entre reruns.
+        """
+        with st.expander("Variação do Dólar/Real"):
+            self.dolar_estatisticas()
+
+            janela = st.radio("Janela", list(JANELAS_DOLAR), horizontal=True, key="janela_dolar")
+            if JANELAS_DOLAR[janela] is not None:
+                fig = dollar_chart.figure(JANELAS_DOLAR[janela])
+            else:
+                hoje = date.today()
+                periodo = st.date_input("Período", value=(hoje - timedelta(days=7), hoje),
+                                        max_value=hoje, key="periodo_dolar")
+                if len(periodo) != 2:
+                    st.info("Selecione a data final do período.")
+                    return
+                inicio = datetime.combine(periodo[0], time.min)
+                fim = datetime.combine(periodo[1], time.max)
+                fig = dollar_chart.figure(start=inicio, end=fim)
+
+            if fig is not None:
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.warning("Nenhuma cotação do dólar no período selecionado.")
+
+
+    def evolucao_carteira(self):
+        """Exibe a evolução diária do patrimônio e o retorno comparado aos índices de referência."""
+        with st.expander("Evolução da Carteira"):
+            conta = self.conta_selecionada()
+            curva = equity_service.curve(None if conta == CONSOLIDATED else conta)
+            if curva.empty:
+                st.info("Registre transações para acompanhar a evolução da carteira.")
+                return
+
+            st.line_chart(curva[["value_usd", "value_brl"]].rename(
+                columns={"value_usd": "Patrimônio ($)", "value_brl": "Patrimônio (R$)"}))
+
+            retorno = curva[["twr"]].rename(columns={"twr": "Carteira"})
+            indices = equity_service.benchmarks(curva.index).rename(columns=BENCHMARKS)
+            st.line_chart(retorno.join(indices))
+            st.caption("Retorno acumulado em base 100, sem o efeito de compras e vendas. "
+                       "Índices de referência a partir do primeiro fechamento gravado pelo coletor.")
+
+    def dolar_estatisticas(self):
+        """Exibe as métricas incrementais do dólar (médias móveis, mín/máx e variação da sessão)."""
+        stats = currency_api.get_currency_stats()
+        if stats['last'] is None:
+            return
 
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Variação da Sessão", f"R${stats['session_change']:+.4f}",
+                      delta=f"{stats['session_change_pct']:+.2f}%")
+        with col2:
+            st.metric("Máxima / Mínima do Dia", f"R${stats['day_high']:.4f} / R${stats['day_low']:.4f}")
+        with col3:
+            st.metric("Média Móvel (20 / 100)", f"R${stats['sma_20']:.4f} / R${stats['sma_100']:.4f}")
+        with col4:
+            st.metric("EWMA (20)", f"R${stats['ewma_20']:.4f}",
+                      delta=f"{stats['last'] - stats['ewma_20']:+.4f}")
+        st.caption(f"Mín/Máx das últimas 20 cotações: R${stats['min_20']:.4f} / R${stats['max_20']:.4f}")
 
     def portfolio(self):
-        """Exibe uma tabela de portfólio financeiro dinâmica com dados otimizados do Yahoo Finance, mantendo cores (vermelho para negativo, verde para positivo) no componente padrão do Streamlit."""
+        """Exibe uma tabela de portfólio financeiro dinâmica com dados otimizados do Yahoo Finance, mantendo cores (vermelho para negativo, verde para positivo) no componente padrão do Streamlit.
+
+        Retorna os totais por conta e consolidados (get_account_totals) da mesma agregação,
+        para que o restante do dashboard não recalcule a carteira.
+        """
         # Get portfolio data from the asset service
         portfolio_data = asset_service.get_portfolio_data()
+
+        # Totais de todas as contas em uma única agregação, sobre as mesmas cotações
+        totals = self.get_account_totals(portfolio_data)
         
         if not portfolio_data:
             st.info("Nenhum ativo cadastrado. Adicione ativos na aba de Configurações.")
-            return
+            return totals
+        accounts = [account for account in totals.index if account != CONSOLIDATED]
+        conta = CONSOLIDATED
+        if len(accounts) > 1:
+            conta = st.selectbox("Conta", [CONSOLIDATED, *accounts], key="conta")
         
         # Convert to DataFrame
         df = pd.DataFrame(portfolio_data)
+        if conta != CONSOLIDATED:
+            df = df[df['Account'] == conta]
+        elif len(accounts) <= 1:
+            df = df.drop(columns=['Account'])
         
         # Format numeric columns
         numeric_columns = ['Shares', 'Last Price', 'Ac/Share', 'Total Cost ($)', 'Market Value ($)',
-                           'Tot Div', 'Day Gain UNRL ($)', 'Tot Gain UNRL ($)']
+                           'Tot Div', 'Day Gain UNRL ($)', 'Tot Gain UNRL ($)', 'Realized ($)']
         for col in numeric_columns:
             if col in df.columns:
                 df[col] = df[col].apply(lambda x: f"{x:,.2f}" if pd.notna(x) and x != '' else x)
@@ -159,14 +182,9 @@ class PortfolioService:
         # Display the table in Streamlit
         st.dataframe(styled_df, use_container_width=True, hide_index=True)
         
-        # Display portfolio summary
-        summary = asset_service.get_portfolio_summary()
-        
-        # Get CAIXA value
-        from src.entities.caixa_db import CaixaRepository
-        caixa_repo = CaixaRepository()
-        caixa = caixa_repo.get_latest_caixa()
-        caixa_value = float(caixa.valor) if caixa else 0.0
+        # Display portfolio summary (selected account or consolidated)
+        summary = totals.loc[conta]
+        caixa_value = summary['cash']
         
         # Calculate total value including CAIXA
         total_value_with_caixa = summary['total_value'] + caixa_value
@@ -182,3 +200,21 @@ class PortfolioService:
             st.metric("Retorno Total", f"{summary['total_gain_percent']:.2f}%")
         with col5:
             st.metric("Valor do Caixa", f"${caixa_value:,.2f}")
+
+        if conta == CONSOLIDATED and len(accounts) > 1:
+            por_conta = totals.assign(patrimonio=totals['total_value'] + totals['cash'])
+            st.dataframe(por_conta[['asset_count', 'total_value', 'cash', 'patrimonio', 'total_cost', 'total_gain',
+                                    'total_gain_percent', 'day_gain', 'realized']].rename(columns={
+                'asset_count': 'Ativos',
+                'total_value': 'Valor de Mercado ($)',
+                'cash': 'Caixa ($)',
+                'patrimonio': 'Valor Total ($)',
+                'total_cost': 'Custo Total ($)',
+                'total_gain': 'Ganho/Perda ($)',
+                'total_gain_percent': 'Retorno (%)',
+                'day_gain': 'Ganho do Dia ($)',
+                'realized': 'Realizado ($)',
+            }), use_container_width=True, column_config={
+                "_index": st.column_config.TextColumn("Conta"),
+            })
+        return totals
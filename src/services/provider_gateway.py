@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Hashable
+
+# Limite de cada provedor: (requisições por segundo, rajada máxima)
+RATE_LIMITS = {
+    "yfinance": (2.0, 5),
+    "awesomeapi": (1.0, 3),
+}
+DEFAULT_RATE_LIMIT = (1.0, 1)
+# Esperas guardadas para as métricas
+WAIT_SAMPLES = 1000
+
+
+class TokenBucket:
+    """Balde de fichas: libera até `burst` chamadas de uma vez e `rate` por segundo depois disso."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserva uma ficha e retorna quantos segundos esperar até poder usá-la."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self) -> float:
+        """Espera uma ficha. Retorna o tempo esperado em segundos."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class ProviderGateway:
+    """Porta única de saída para um provedor: junta pedidos iguais e limita a taxa global.
+
+    Chamadas com a mesma chave feitas enquanto a primeira ainda está em andamento não
+    geram uma nova requisição: esperam e recebem o mesmo resultado (ou a mesma exceção).
+    As requisições que de fato saem passam pelo balde de fichas do provedor, compartilhado
+    por todas as threads do processo.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.requests = 0
+        self.coalesced = 0
+        self.failures = 0
+        self._inflight = {}
+        self._waiting = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def call(self, key: Hashable, func: Callable, *args, **kwargs):
+        """Executa `func(*args, **kwargs)` uma única vez por `key` em andamento."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+            self._waiting += 1
+
+        if not leader:
+            try:
+                return future.result()
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+        try:
+            wait = self.bucket.acquire()
+            with self._lock:
+                self._waiting -= 1
+                self.requests += 1
+                self._waits.append(wait)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                with self._lock:
+                    self.failures += 1
+                future.set_exception(e)
+                raise
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def metrics(self) -> dict:
+        """Requisições feitas, pedidos atendidos por outra chamada, fila e espera pela taxa."""
+        with self._lock:
+            waits = sorted(self._waits)
+            metrics = {
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "failures": self.failures,
+                "inflight": len(self._inflight),
+                "queue_depth": self._waiting,
+            }
+        metrics["wait_p50"] = waits[len(waits) // 2] if waits else 0.0
+        metrics["wait_p95"] = waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0
+        metrics["wait_max"] = waits[-1] if waits else 0.0
+        return metrics
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(name: str) -> ProviderGateway:
+    """Retorna o gateway compartilhado do provedor `name`."""
+    with _gateways_lock:
+        if name not in _gateways:
+            rate, burst = RATE_LIMITS.get(name, DEFAULT_RATE_LIMIT)
+            _gateways[name] = ProviderGateway(name, rate, burst)
+        return _gateways[name]
+
+
+def gateway_metrics() -> dict:
+    """Métricas de todos os gateways criados no processo."""
+    with _gateways_lock:
+        gateways = list(_gateways.values())
+    return {gateway.name: gateway.metrics() for gateway in gateways}
+
@@ -0,0 +1,267 @@
+"""Gravação e reprodução das respostas dos provedores (yfinance e AwesomeAPI).
+
+Com PROVIDER_MODE=record, cada resposta de `yf.Ticker.history`, `yf.Ticker.dividends`,
+`yf.Ticker.actions` e `CurrencyApi.get_currency` é gravada em PROVIDER_TAPE
+(um diretório com um arquivo JSON Lines), junto com o instante da chamada.
+
+Com PROVIDER_MODE=replay, as mesmas chamadas são respondidas a partir da gravação,
+sem acesso à rede, com o relógio da gravação acelerado por REPLAY_SPEED (390 reproduz
+um pregão de 6h30 em um minuto). Cada chamada recebe a resposta mais recente gravada
+até o instante virtual, e `history` devolve apenas as barras já "fechadas" nesse instante.
+
+Uso:
+    PROVIDER_MODE=record PROVIDER_TAPE=data/tapes/pregao python -m src.collector
+    PROVIDER_MODE=replay PROVIDER_TAPE=data/tapes/pregao REPLAY_SPEED=390 python -m src.collector
+    python -m src.services.provider_tape data/tapes/pregao
+"""
+import bisect
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import yfinance as yf
+
+from src.services.dollar_service import CurrencyApi
+
+TAPE_VERSION = 1
+CALLS_FILE = "calls.jsonl"
+META_FILE = "meta.json"
+DEFAULT_SPEED = 1.0
+
+# Métodos originais, guardados na primeira instalação
+_originals = {}
+_active = None
+
+
+def _history_params(args, kwargs) -> dict:
+    params = dict(kwargs)
+    if args:
+        params.setdefault("period", args[0])
+    return params
+
+
+def _frame_to_json(frame: pd.DataFrame) -> dict:
+    # O fuso do índice é guardado à parte: o JSON só preserva o deslocamento de cada data
+    tz = getattr(frame.index, "tz", None)
+    return {"tz": str(tz) if tz is not None else None,
+            "frame": frame.to_json(orient="split", date_format="iso", date_unit="us")}
+
+
+def _frame_from_json(data: dict) -> pd.DataFrame:
+    frame = pd.read_json(io.StringIO(data["frame"]), orient="split", convert_dates=False)
+    if len(frame.index):
+        frame.index = pd.to_datetime(frame.index, utc=True)
+        if data["tz"]:
+            frame.index = frame.index.tz_convert(data["tz"])
+    return frame
+
+
+def _series_to_json(series: pd.Series) -> dict:
+    return _frame_to_json(series.to_frame(name=series.name or "value"))
+
+
+def _series_from_json(data: dict) -> pd.Series:
+    frame = _frame_from_json(data)
+    return frame.iloc[:, 0] if len(frame.columns) else pd.Series(dtype=float)
+
+
+class TapeRecorder:
+    """Grava as respostas dos provedores em `path`, uma linha JSON por chamada."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = self.path / META_FILE
+        if meta_path.exists():
+            # Continua uma gravação existente mantendo o mesmo relógio
+            self.started_at = datetime.fromisoformat(json.loads(meta_path.read_text())["started_at"])
+        else:
+            self.started_at = datetime.now()
+            meta_path.write_text(json.dumps({"version": TAPE_VERSION, "started_at": self.started_at.isoformat()}))
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, key: str, data) -> None:
+        line = json.dumps({
+            "t": (datetime.now() - self.started_at).total_seconds(),
+            "kind": kind,
+            "key": key,
+            "data": data,
+        })
+        with self._lock:
+            with open(self.path / CALLS_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def history(self, ticker, args, kwargs) -> pd.DataFrame:
+        frame = _originals["history"](ticker, *args, **kwargs)
+        params = _history_params(args, kwargs)
+        self.record("history", f"{ticker.ticker}|{params.get('interval', '1d')}", _frame_to_json(frame))
+        return frame
+
+    def dividends(self, ticker) -> pd.Series:
+        series = _originals["dividends"].fget(ticker)
+        self.record("dividends", ticker.ticker, _series_to_json(series))
+        return series
+
+    def actions(self, ticker) -> pd.DataFrame:
+        frame = _originals["actions"].fget(ticker)
+        self.record("actions", ticker.ticker, _frame_to_json(frame))
+        return frame
+
+    def currency(self, api, coin: str) -> dict:
+        response = _originals["get_currency"](api, coin)
+        self.record("currency", coin, response)
+        return response
+
+
+class TapePlayer:
+    """Reproduz uma gravação com o relógio acelerado por `speed`."""
+
+    def __init__(self, path, speed: float = DEFAULT_SPEED):
+        self.path = Path(path)
+        meta = json.loads((self.path / META_FILE).read_text())
+        if meta.get("version") != TAPE_VERSION:
+            raise ValueError(f"Versão de gravação não suportada: {meta.get('version')}")
+        self.recorded_start = datetime.fromisoformat(meta["started_at"])
+        self.speed = speed
+        self.started = time.monotonic()
+
+        # (tipo, chave) -> instantes e respostas, em ordem cronológica
+        self._calls = {}
+        with open(self.path / CALLS_FILE, encoding="utf-8") as f:
+            for line in f:
+                call = json.loads(line)
+                offsets, responses = self._calls.setdefault((call["kind"], call["key"]), ([], []))
+                offsets.append(call["t"])
+                responses.append(call["data"])
+        self.duration = max((offsets[-1] for offsets, _ in self._calls.values()), default=0.0)
+        self._bars = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        """Segundos da gravação já reproduzidos (limitados à duração da gravação)."""
+        return min(self.duration, (time.monotonic() - self.started) * self.speed)
+
+    def virtual_now(self) -> datetime:
+        return self.recorded_start + timedelta(seconds=self.elapsed())
+
+    def response(self, kind: str, key: str):
+        """Resposta mais recente gravada até o instante virtual (ou a primeira, no início)."""
+        if (kind, key) not in self._calls:
+            raise LookupError(f"Sem gravação de {kind} para {key} em {self.path}")
+        offsets, responses = self._calls[(kind, key)]
+        index = bisect.bisect_right(offsets, self.elapsed()) - 1
+        return responses[max(index, 0)]
+
+    def history(self, ticker, args, kwargs) -> pd.DataFrame:
+        params = _history_params(args, kwargs)
+        bars = self._all_bars(f"{ticker.ticker}|{params.get('interval', '1d')}")
+        if bars.empty:
+            return bars
+
+        now = pd.Timestamp(self.virtual_now()).tz_localize(datetime.now().astimezone().tzinfo)
+        bars = bars[bars.index <= now]
+        if params.get("start") is not None:
+            bars = bars[bars.index >= self._timestamp(params["start"])]
+            if params.get("end") is not None:
+                bars = bars[bars.index < self._timestamp(params["end"])]
+        elif len(bars):
+            # period: devolve apenas o último pregão até o instante virtual
+            last_day = bars.index[-1].normalize()
+            bars = bars[bars.index >= last_day]
+        return bars
+
+    def dividends(self, ticker) -> pd.Series:
+        return _series_from_json(self.response("dividends", ticker.ticker))
+
+    def actions(self, ticker) -> pd.DataFrame:
+        return _frame_from_json(self.response("actions", ticker.ticker))
+
+    def currency(self, api, coin: str) -> dict:
+        return self.response("currency", coin)
+
+    def _all_bars(self, key: str) -> pd.DataFrame:
+        """Todas as barras gravadas de um símbolo/intervalo, sem repetições."""
+        with self._lock:
+            if key not in self._bars:
+                if ("history", key) not in self._calls:
+                    raise LookupError(f"Sem gravação de history para {key} em {self.path}")
+                frames = [_frame_from_json(data) for data in self._calls[("history", key)][1]]
+                frames = [frame for frame in frames if not frame.empty]
+                bars = pd.concat(frames) if frames else pd.DataFrame()
+                if not bars.empty:
+                    bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+                self._bars[key] = bars
+            return self._bars[key]
+
+    @staticmethod
+    def _timestamp(value) -> pd.Timestamp:
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.tz_localize(datetime.now().astimezone().tzinfo)
+        return timestamp
+
+
+def install(mode: str, path, speed: float = DEFAULT_SPEED):
+    """Passa as chamadas aos provedores pelo gravador (`record`) ou pelo reprodutor (`replay`)."""
+    global _active
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Modo inválido: {mode}. Opções: record, replay")
+
+    if not _originals:
+        _originals.update(
+            history=yf.Ticker.history,
+            dividends=yf.Ticker.dividends,
+            actions=yf.Ticker.actions,
+            get_currency=CurrencyApi.get_currency,
+        )
+    tape = TapeRecorder(path) if mode == "record" else TapePlayer(path, speed)
+
+    yf.Ticker.history = lambda ticker, *args, **kwargs: tape.history(ticker, args, kwargs)
+    yf.Ticker.dividends = property(tape.dividends)
+    yf.Ticker.actions = property(tape.actions)
+    CurrencyApi.get_currency = lambda api, coin: tape.currency(api, coin)
+    _active = tape
+    logging.info(f"Provedores em modo {mode} ({path})")
+    return tape
+
+
+def uninstall() -> None:
+    """Restaura as chamadas originais aos provedores."""
+    global _active
+    if _originals:
+        yf.Ticker.history = _originals["history"]
+        yf.Ticker.dividends = _originals["dividends"]
+        yf.Ticker.actions = _originals["actions"]
+        CurrencyApi.get_currency = _originals["get_currency"]
+    _active = None
+
+
+def is_active() -> bool:
+    """Se as chamadas aos provedores estão sendo gravadas ou reproduzidas."""
+    return _active is not None
+
+
+def install_from_env():
+    """Instala a gravação ou a reprodução conforme PROVIDER_MODE (live, o padrão, não faz nada)."""
+    mode = os.getenv("PROVIDER_MODE", "live")
+    if mode == "live" or _active is not None:
+        return _active
+    path = os.getenv("PROVIDER_TAPE")
+    if not path:
+        raise ValueError("PROVIDER_TAPE deve indicar o diretório da gravação")
+    return install(mode, path, float(os.getenv("REPLAY_SPEED", DEFAULT_SPEED)))
+
+
+if __name__ == "__main__":
+    # Resumo de uma gravação: python -m src.services.provider_tape data/tapes/pregao
+    player = TapePlayer(sys.argv[1])
+    print(f"Gravação iniciada em {player.recorded_start:%d/%m/%Y %H:%M:%S}, duração {player.duration:.0f}s")
+    for (kind, key), (offsets, _) in sorted(player._calls.items()):
+        print(f"  {kind:<10} {key:<20} {len(offsets)} chamada(s)")
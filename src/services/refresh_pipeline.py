@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+# Consultas simultâneas de um ciclo (o gateway de cada provedor ainda limita a taxa)
+REFRESH_WORKERS = 8
+
+
+@dataclass
+class TickResult:
+    results: Dict[str, Any] = field(default_factory=dict)  # tarefa -> valor retornado
+    failed: List[str] = field(default_factory=list)
+    stale: List[str] = field(default_factory=list)  # perderam o prazo: seguem com o último valor gravado
+    seconds: float = 0.0
+
+    def ok(self, prefix: str = "") -> List[str]:
+        """Tarefas concluídas com sucesso (resultado verdadeiro), opcionalmente só as de um prefixo."""
+        return [name for name, value in self.results.items() if value and name.startswith(prefix)]
+
+
+class RefreshPipeline:
+    """Executa as tarefas de um ciclo de atualização ao mesmo tempo, com prazo por ciclo.
+
+    Cada tarefa é uma chamada bloqueante às APIs existentes (StockService, DividendService,
+    cotação do dólar), executada em um pool de threads e aguardada com asyncio. O ciclo
+    termina quando todas acabam ou quando o prazo vence, o que vier primeiro: uma consulta
+    lenta não atrasa as outras nem o próximo ciclo. O que não terminou no prazo é marcado
+    como atrasado e continua em segundo plano; enquanto isso o dashboard exibe o último
+    valor gravado, e a tarefa não é repetida nos ciclos seguintes até terminar.
+    """
+
+    def __init__(self, max_workers: int = REFRESH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self._running: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def run(self, jobs: Dict[str, Callable[[], Any]], deadline: float) -> TickResult:
+        """Executa `jobs` (nome -> função sem argumentos) com prazo de `deadline` segundos."""
+        return asyncio.run(self.gather(jobs, deadline))
+
+    async def gather(self, jobs: Dict[str, Callable[[], Any]], deadline: float) -> TickResult:
+        began = time.monotonic()
+        result = TickResult()
+        tasks = {}
+        for name, job in jobs.items():
+            future = self._submit(name, job)
+            if future is None:
+                # Ainda em andamento desde um ciclo anterior
+                result.stale.append(name)
+                continue
+            tasks[asyncio.ensure_future(asyncio.wrap_future(future))] = name
+
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=deadline)
+            for task in done:
+                name = tasks[task]
+                if task.exception() is not None:
+                    logging.error(f"Erro na atualização de {name}: {task.exception()}")
+                    result.failed.append(name)
+                else:
+                    result.results[name] = task.result()
+                    if not task.result():
+                        result.failed.append(name)
+            for task in pending:
+                # A thread continua; só o ciclo deixa de esperar por ela
+                task.cancel()
+                result.stale.append(tasks[task])
+        if result.stale:
+            logging.warning(f"Atualização fora do prazo de {deadline:.1f}s: {', '.join(sorted(result.stale))}")
+        result.seconds = time.monotonic() - began
+        return result
+
+    def _submit(self, name: str, job: Callable[[], Any]):
+        with self._lock:
+            running = self._running.get(name)
+            if running is not None and not running.done():
+                return None
+            future = self._running[name] = self._executor.submit(job)
+        future.add_done_callback(lambda done, name=name: self._finished(name, done))
+        return future
+
+    def _finished(self, name: str, future: Future) -> None:
+        with self._lock:
+            if self._running.get(name) is future:
+                del self._running[name]
+
+    def close(self) -> None:
+        """Encerra o pool sem esperar as consultas em andamento."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
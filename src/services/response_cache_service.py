@@ -0,0 +1,110 @@
+"""Cache em disco das respostas dos provedores (yfinance e AwesomeAPI).
+
+Reiniciar o Streamlit ou o coletor não repete as consultas ainda válidas: cada resposta
+fica gravada em `data/db/provider_cache.db` pelo tempo definido para o seu tipo de dado.
+
+Linha de comando:
+    python -m src.services.response_cache_service stats
+    python -m src.services.response_cache_service purge [--kind dividends] [--expired]
+"""
+import argparse
+import logging
+import os
+import pickle
+import threading
+
+from src.entities.response_cache_db import ResponseCacheRepository
+
+QUOTE = "quote"
+DIVIDENDS = "dividends"
+
+# Validade de cada tipo de dado, em segundos. Não há tipo de metadados (validade de uma
+# semana): nenhuma consulta lê metadados dos provedores (yf.Ticker.info), os nomes dos
+# ativos vêm do cadastro.
+TTLS = {
+    QUOTE: 5,
+    DIVIDENDS: 24 * 60 * 60,
+}
+DEFAULT_MAX_BYTES = int(float(os.getenv("PROVIDER_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+MISS = object()
+
+
+class ResponseCache:
+    """Respostas dos provedores em disco, com validade por tipo de dado e tamanho máximo.
+
+    Uma falha ao ler ou gravar o cache não interrompe a consulta: a resposta é buscada
+    (ou retornada) normalmente e o erro vai para o log.
+    """
+
+    def __init__(self, repository: ResponseCacheRepository = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.repository = repository or ResponseCacheRepository()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(provider: str, key) -> str:
+        return f"{provider}:{key!r}"
+
+    def get(self, provider: str, key):
+        """Resposta ainda válida de `key`, ou MISS."""
+        try:
+            payload = self.repository.get(self._key(provider, key))
+            value = MISS if payload is None else pickle.loads(payload)
+        except Exception as e:
+            logging.error(f"Erro ao ler o cache de {provider}: {e}")
+            value = MISS
+        with self._lock:
+            if value is MISS:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, provider: str, kind: str, key, value) -> None:
+        try:
+            evicted = self.repository.put(self._key(provider, key), kind, pickle.dumps(value), TTLS[kind],
+                                          self.max_bytes)
+        except Exception as e:
+            logging.error(f"Erro ao gravar o cache de {provider}: {e}")
+            return
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache em disco das respostas dos provedores")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Entradas e tamanho por tipo de dado")
+    purge = commands.add_parser("purge", help="Remove entradas do cache")
+    purge.add_argument("--kind", choices=sorted(TTLS), help="Remove apenas um tipo de dado")
+    purge.add_argument("--expired", action="store_true", help="Remove apenas as entradas vencidas")
+    args = parser.parse_args()
+
+    repository = ResponseCacheRepository()
+    if args.command == "purge":
+        removed = repository.purge(kind=args.kind, expired_only=args.expired)
+        print(f"{removed} entrada(s) removida(s)")
+        return
+
+    stats = repository.get_stats()
+    if not stats:
+        print("Cache vazio")
+        return
+    for kind, kind_stats in stats.items():
+        print(f"{kind:<10} {kind_stats['entries']:>6} entrada(s)  {kind_stats['bytes'] / 1024:>10.1f} KiB  "
+              f"{kind_stats['expired']:>6} vencida(s)  validade {TTLS.get(kind, 0)}s")
+    total = sum(kind_stats['bytes'] for kind_stats in stats.values())
+    print(f"Total: {total / 1024 / 1024:.1f} MiB de {DEFAULT_MAX_BYTES / 1024 / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
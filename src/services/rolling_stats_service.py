@@ -0,0 +1,210 @@
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+
+class RollingWindow:
+    """Janela deslizante de tamanho fixo com média, mínimo e máximo em O(1) amortizado.
+
+    A média usa uma soma corrente e o mínimo/máximo usam deques monotônicas,
+    então nenhum valor da janela é percorrido a cada atualização.
+    """
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("O tamanho da janela deve ser maior que zero")
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.seq = 0
+        # Pares (seq, valor): _mins é crescente e _maxs é decrescente
+        self._mins = deque()
+        self._maxs = deque()
+
+    def push(self, value: float) -> None:
+        value = float(value)
+        self.values.append(value)
+        self.total += value
+
+        while self._mins and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((self.seq, value))
+        while self._maxs and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((self.seq, value))
+
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+        oldest = self.seq - self.size + 1
+        if self._mins[0][0] < oldest:
+            self._mins.popleft()
+        if self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+
+        self.seq += 1
+        # Recalcula a soma a cada volta completa para não acumular erro de ponto flutuante
+        if self.seq % self.size == 0:
+            self.total = sum(self.values)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / len(self.values) if self.values else None
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._mins[0][1] if self._mins else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._maxs[0][1] if self._maxs else None
+
+    def to_state(self) -> dict:
+        return {
+            "size": self.size,
+            "seq": self.seq,
+            "values": list(self.values),
+            "mins": [list(item) for item in self._mins],
+            "maxs": [list(item) for item in self._maxs],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RollingWindow":
+        window = cls(state["size"])
+        window.seq = state["seq"]
+        window.values = deque(state["values"])
+        window.total = sum(window.values)
+        window._mins = deque(tuple(item) for item in state["mins"])
+        window._maxs = deque(tuple(item) for item in state["maxs"])
+        return window
+
+
+class Ewma:
+    """Média móvel exponencial definida pelo span (alpha = 2 / (span + 1))."""
+
+    def __init__(self, span: int):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+
+    def push(self, value: float) -> None:
+        value = float(value)
+        self.value = value if self.value is None else self.alpha * value + (1 - self.alpha) * self.value
+
+    def to_state(self) -> dict:
+        return {"span": self.span, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Ewma":
+        ewma = cls(state["span"])
+        ewma.value = state["value"]
+        return ewma
+
+
+class RollingStats:
+    """Estatísticas incrementais de uma série de cotações.
+
+    Cada nova cotação atualiza médias móveis, EWMA, mínimo/máximo das janelas,
+    máxima/mínima do dia e a variação da sessão em O(1). O estado completo pode
+    ser serializado com `to_state` e restaurado com `from_state`.
+    """
+
+    STATE_VERSION = 1
+
+    def __init__(self, windows=(20, 100), ewma_spans=(20,)):
+        self.windows = {size: RollingWindow(size) for size in windows}
+        self.ewmas = {span: Ewma(span) for span in ewma_spans}
+        self.count = 0
+        self.last = None
+        self.previous = None
+        self.updated_at = None
+        self.session_date = None
+        self.session_open = None
+        self.day_high = None
+        self.day_low = None
+
+    def push(self, value: float, when: datetime = None) -> dict:
+        """Adiciona uma cotação e retorna o snapshot atualizado."""
+        value = float(value)
+        when = when or datetime.now()
+
+        for window in self.windows.values():
+            window.push(value)
+        for ewma in self.ewmas.values():
+            ewma.push(value)
+
+        session_date = when.date().isoformat()
+        if session_date != self.session_date:
+            self.session_date = session_date
+            self.session_open = value
+            self.day_high = value
+            self.day_low = value
+        else:
+            self.day_high = max(self.day_high, value)
+            self.day_low = min(self.day_low, value)
+
+        self.previous = self.last
+        self.last = value
+        self.updated_at = when.isoformat()
+        self.count += 1
+        return self.snapshot()
+
+    def snapshot(self) -> dict:
+        """Retorna as métricas atuais sem percorrer o histórico."""
+        change = self.last - self.previous if self.last is not None and self.previous is not None else 0.0
+        session_change = self.last - self.session_open if self.last is not None else 0.0
+        session_change_pct = (session_change / self.session_open) * 100 if self.session_open else 0.0
+
+        metrics = {
+            "last": self.last,
+            "previous": self.previous,
+            "change": change,
+            "session_open": self.session_open,
+            "session_change": session_change,
+            "session_change_pct": session_change_pct,
+            "day_high": self.day_high,
+            "day_low": self.day_low,
+            "count": self.count,
+            "updated_at": self.updated_at,
+        }
+        for size, window in self.windows.items():
+            metrics[f"sma_{size}"] = window.mean
+            metrics[f"min_{size}"] = window.min
+            metrics[f"max_{size}"] = window.max
+        for span, ewma in self.ewmas.items():
+            metrics[f"ewma_{span}"] = ewma.value
+        return metrics
+
+    def to_state(self) -> dict:
+        return {
+            "version": self.STATE_VERSION,
+            "windows": [window.to_state() for window in self.windows.values()],
+            "ewmas": [ewma.to_state() for ewma in self.ewmas.values()],
+            "count": self.count,
+            "last": self.last,
+            "previous": self.previous,
+            "updated_at": self.updated_at,
+            "session_date": self.session_date,
+            "session_open": self.session_open,
+            "day_high": self.day_high,
+            "day_low": self.day_low,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RollingStats":
+        if state.get("version") != cls.STATE_VERSION:
+            raise ValueError(f"Versão de estado não suportada: {state.get('version')}")
+        stats = cls(windows=(), ewma_spans=())
+        for window_state in state["windows"]:
+            window = RollingWindow.from_state(window_state)
+            stats.windows[window.size] = window
+        for ewma_state in state["ewmas"]:
+            ewma = Ewma.from_state(ewma_state)
+            stats.ewmas[ewma.span] = ewma
+        for attr in ("count", "last", "previous", "updated_at", "session_date",
+                     "session_open", "day_high", "day_low"):
+            setattr(stats, attr, state[attr])
+        return stats
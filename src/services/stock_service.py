@@ -1,39 +1,31 @@
-import yfinance as yf
-from datetime import datetime
-from src.entities.stock_db import StockData, StockDataRepository
+from datetime import datetime, timedelta
+
+from src.entities.stock_db import StockDataRepository
+from src.services.circuit_breaker import CircuitOpenError, get_breaker
+from src.services.market_data_service import INTRADAY_INTERVAL, YFINANCE, fetch_intraday_bars
 
 class StockService:
     def __init__(self):
         self.stock_repo = StockDataRepository()
 
     def update_stock_data(self, symbol: str) -> bool:
-        """Atualiza os dados de uma ação no banco de dados"""
+        """Grava as barras intradiárias novas de uma ação (aguarda o provedor)
+
+        Busca desde a última barra salva, então cada poll só acrescenta as barras que o
+        mercado fechou desde então e uma parada do coletor é preenchida no próximo ciclo.
+        """
         try:
-            # Busca dados da ação usando yfinance
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period="1d")
-            
-            if not hist.empty:
-                latest_data = hist.iloc[-1]
-                
-                # Cria objeto StockData
-                stock_data = StockData(
-                    id=None,
-                    symbol=symbol,
-                    price=float(latest_data['Close']),
-                    volume=int(latest_data['Volume']),
-                    high=float(latest_data['High']),
-                    low=float(latest_data['Low']),
-                    open=float(latest_data['Open']),
-                    close=float(latest_data['Close']),
-                    date=datetime.now()
-                )
-                
-                # Salva no banco de dados
-                self.stock_repo.save_stock_data(stock_data)
-                return True
+            since = self.stock_repo.get_last_bar_date(symbol)
+            # Busca as barras no yfinance, protegido pelo circuit breaker
+            bars = get_breaker(YFINANCE).call(fetch_intraday_bars, symbol, INTRADAY_INTERVAL, since)
+
+            # Barras já salvas são apenas atualizadas (chave: símbolo + horário da barra)
+            self.stock_repo.upsert_bars(bars)
+            return True
+
+        except CircuitOpenError:
+            print(f"Provedor {YFINANCE} indisponível, {symbol} não foi atualizado")
             return False
-            
         except Exception as e:
             print(f"Erro ao atualizar dados de {symbol}: {str(e)}")
             return False
@@ -42,7 +34,7 @@ class StockService:
         """Obtém o histórico de uma ação"""
         try:
             end_date = datetime.now()
-            start_date = end_date.replace(day=end_date.day - days)
+            start_date = end_date - timedelta(days=days)
             
             return self.stock_repo.get_stock_data(
                 symbol=symbol,
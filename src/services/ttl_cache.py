@@ -0,0 +1,140 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import pandas as pd
+
+MISS = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Tamanho aproximado de `value` em bytes (DataFrames e coleções incluem o conteúdo)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """Cache em memória com validade, limite de entradas e de bytes, e estatísticas.
+
+    As entradas vencem `ttl` segundos depois de gravadas (None: só saem por invalidação
+    ou por falta de espaço). Passando do limite de entradas ou de bytes, as menos usadas
+    recentemente são descartadas. `invalidate`, `invalidate_where` e `clear` são os
+    pontos de invalidação para quem altera os dados de origem.
+    """
+
+    def __init__(self, name: str, ttl: Optional[float] = None, maxsize: int = 128, max_bytes: int = None,
+                 sizeof: Callable[[Any], int] = estimate_size):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # chave -> (valor, vencimento, bytes)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = MISS) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Maior que o cache inteiro: não vale descartar tudo para guardá-lo
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Valor em cache de `key` ou, na falta dele, o resultado de `loader()` (que é guardado)."""
+        value = self.get(key)
+        if value is MISS:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove as entradas cuja chave satisfaz `predicate`. Retorna quantas foram removidas."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        self.bytes -= self._entries.pop(key)[2]
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, **config) -> TTLCache:
+    """Retorna o cache compartilhado `name`, criado com `config` na primeira chamada."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = TTLCache(name, **config)
+        return _caches[name]
+
+
+def cache_stats() -> dict:
+    """Estatísticas de todos os caches criados no processo."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -0,0 +1,108 @@
+import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.services.equity_service import BENCHMARKS
+
+# Consultas simultâneas do aquecimento
+WARMUP_WORKERS = 8
+# Bibliotecas que o Streamlit só importa no primeiro gráfico ou tabela estilizada
+LAZY_IMPORTS = ("altair", "pandas.io.formats.style")
+
+
+class WarmupService:
+    """Aquecimento dos caches do processo do dashboard, em paralelo e em segundo plano.
+
+    Carrega do banco o último valor conhecido de cada cotação (dólar, ativos e índices)
+    e prepara os dados que o primeiro rerun exibe (estatísticas e gráfico do dólar,
+    dividendos e curva de patrimônio), além de importar as bibliotecas de gráficos que
+    o Streamlit só carrega no primeiro uso. Sem o coletor
+    (MARKET_DATA_MODE=live), a mesma leitura agenda a atualização nos provedores de tudo
+    que estiver velho, então o refresh também acontece em paralelo. Um rerun que chega
+    durante o aquecimento espera por ele em vez de repetir as mesmas leituras.
+    """
+
+    IDLE = "idle"
+    RUNNING = "running"
+    READY = "ready"
+
+    def __init__(self, max_workers: int = WARMUP_WORKERS):
+        self.max_workers = max_workers
+        self.state = self.IDLE
+        self.started_at = None
+        self.duration = None
+        self.tasks = 0
+        self.failed: List[str] = []
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        """Inicia o aquecimento em uma thread. Retorna False se ele já foi iniciado neste processo."""
+        with self._lock:
+            if self.state != self.IDLE:
+                return False
+            self.state = self.RUNNING
+            self.started_at = time.time()
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera o fim do aquecimento (se ele foi iniciado). Retorna se os caches estão prontos."""
+        if self.state == self.IDLE:
+            return False
+        return self._ready.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "tasks": self.tasks,
+            "failed": list(self.failed),
+        }
+
+    def _run(self) -> None:
+        began = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="warmup") as executor:
+                futures = {executor.submit(task): name for name, task in self._snapshot_tasks()}
+                wait(futures)
+                for future, name in futures.items():
+                    self.tasks += 1
+                    if future.exception() is not None:
+                        self.failed.append(name)
+                        logging.error(f"Erro no aquecimento ({name}): {future.exception()}")
+        except Exception as e:
+            logging.error(f"Erro no aquecimento: {e}")
+        finally:
+            self.duration = time.monotonic() - began
+            self.state = self.READY
+            self._ready.set()
+            logging.info(f"Aquecimento concluído em {self.duration:.2f}s ({self.tasks} tarefa(s), "
+                         f"{len(self.failed)} com erro)")
+
+    @staticmethod
+    def _snapshot_tasks() -> List[Tuple[str, Callable]]:
+        from src.resources import get_asset_service, get_currency_api, get_dividend_service, \
+            get_dollar_chart_service, get_equity_service
+        from src.services.market_data_service import market_data_service
+        from src.services.portifolio_service import JANELAS_DOLAR
+
+        symbols = get_asset_service().get_symbols()
+        symbols += [symbol for symbol in BENCHMARKS if symbol not in symbols]
+        # Janela inicial do gráfico do dólar
+        window = next(iter(JANELAS_DOLAR.values()))
+        tasks: Dict[str, Callable] = {
+            "dolar": lambda: market_data_service.get_fx('USDBRL'),
+            "estatisticas_dolar": get_currency_api().get_currency_stats,
+            "grafico_dolar": lambda: get_dollar_chart_service().figure(window),
+            "dividendos": get_dividend_service().get_latest_dividends,
+            "curva_patrimonio": get_equity_service().curve,
+            "bibliotecas": lambda: [importlib.import_module(module) for module in LAZY_IMPORTS],
+        }
+        for symbol in symbols:
+            tasks[symbol] = lambda symbol=symbol: market_data_service.get_quote(symbol)
+        return list(tasks.items())
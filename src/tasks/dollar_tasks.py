@@ -3,9 +3,13 @@ from crewai import Task
 
 class CurrencyTasks:
 
-    def currency_task(self, agent):
+    def currency_task(self, agent, context: str = None):
+        description = "Analisa econverte um valor em reais (BRL) para dólares (USD) com base na cotação atual."
+        if context:
+            # Com os dados no prompt o agente não precisa consultar a cotação pela ferramenta
+            description += f"\n\nUse estes dados já coletados:\n{context}"
         return Task(
-            description="Analisa econverte um valor em reais (BRL) para dólares (USD) com base na cotação atual.",
+            description=description,
             expected_output="O valor de R$ 100,00 equivale a aproximadamente US$ 18,18 (cotação: 5,50).",
             agent=agent
         )
\ No newline at end of file
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Os repositórios usam caminhos relativos (data/db/..., finance.db): cada teste roda em um diretório vazio."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,43 @@
+from src.entities.alert_db import AlertRule
+from src.services.alert_service import _RuleBook
+
+
+def _fire(book, previous, value):
+    fired, rearmed = book.evaluate(previous, value)
+    for rule in fired:
+        rule.armed = False
+    for rule in rearmed:
+        rule.armed = True
+    return [rule.id for rule in fired], [rule.id for rule in rearmed]
+
+
+def test_rule_fires_once_until_it_moves_back_past_the_hysteresis():
+    book = _RuleBook(above=True)
+    book.add(AlertRule(kind="price_above", symbol="AAPL", threshold=100.0, hysteresis=2.0, id=1))
+
+    assert _fire(book, None, 99.0) == ([], [])
+    assert _fire(book, 99.0, 101.0) == ([1], [])
+    # Oscila em torno do limite sem sair da histerese: não dispara de novo
+    assert _fire(book, 101.0, 99.0) == ([], [])
+    assert _fire(book, 99.0, 100.5) == ([], [])
+    # Recua além da histerese: volta a ficar armada e dispara no próximo cruzamento
+    assert _fire(book, 100.5, 97.5) == ([], [1])
+    assert _fire(book, 97.5, 100.0) == ([1], [])
+
+
+def test_below_rules_mirror_above_rules():
+    book = _RuleBook(above=False)
+    book.add(AlertRule(kind="price_below", symbol="AAPL", threshold=50.0, hysteresis=1.0, id=1))
+    book.add(AlertRule(kind="price_below", symbol="AAPL", threshold=40.0, hysteresis=1.0, id=2))
+
+    assert _fire(book, 55.0, 45.0) == ([1], [])
+    assert _fire(book, 45.0, 39.0) == ([2], [])
+    assert _fire(book, 39.0, 50.5) == ([], [2])
+    assert _fire(book, 50.5, 51.5) == ([], [1])
+
+
+def test_first_observation_fires_rules_already_crossed():
+    book = _RuleBook(above=True)
+    book.add(AlertRule(kind="price_above", symbol="AAPL", threshold=100.0, id=1))
+    book.add(AlertRule(kind="price_above", symbol="AAPL", threshold=120.0, id=2))
+    assert _fire(book, None, 110.0) == ([1], [])
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from src.entities.caixa_db import CaixaRepository
+
+
+def test_keyset_pages_cover_every_row_once():
+    repo = CaixaRepository()
+    start = datetime(2024, 1, 1)
+    # Registros com a mesma data exercitam o desempate pelo id
+    rows = [{"valor": i, "date": start + timedelta(days=i // 3), "account": "Principal"} for i in range(25)]
+    repo.save_caixa_batch(rows)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, cursor = repo.get_caixa_page(limit=4, before=cursor)
+        seen.extend(page)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 7
+    assert len(seen) == 25
+    assert len({row[0] for row in seen}) == 25
+    keys = [(row[2], row[0]) for row in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_pages_respect_period_and_account():
+    repo = CaixaRepository()
+    start = datetime(2024, 1, 1)
+    repo.save_caixa_batch([
+        {"valor": i, "date": start + timedelta(days=i), "account": "Principal" if i % 2 else "Corretora"}
+        for i in range(10)
+    ])
+
+    page, cursor = repo.get_caixa_page(limit=10, start=start + timedelta(days=2), end=start + timedelta(days=8),
+                                       account="Principal")
+    assert cursor is None
+    assert [int(row[1]) for row in page] == [7, 5, 3]
@@ -0,0 +1,61 @@
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from src.entities.stock_db import StockDataRepository
+from src.services.export_service import ExportService
+
+DATASETS = ("portfolio_snapshots", "stock_bars")
+
+
+def _bar(symbol, when, close=100.0):
+    return (symbol, close, 1000, close, close, close, close, when.isoformat())
+
+
+def _exported(service, dataset):
+    return pd.read_parquet(service.root / dataset)
+
+
+def test_second_run_exports_only_new_rows(workdir):
+    stock_repo = StockDataRepository()
+    old = datetime.now().replace(microsecond=0) - timedelta(days=3)
+    stock_repo.upsert_bars([_bar("AAPL", old + timedelta(minutes=i)) for i in range(5)])
+    # Ainda pode ser atualizada pelo coletor: fica para a próxima exportação
+    stock_repo.upsert_bars([_bar("AAPL", datetime.now())])
+
+    service = ExportService(str(workdir / "exports"))
+    today = date.today()
+    service.equity_repo.replace_from("", [
+        ((today - timedelta(days=2)).isoformat(), "Principal", 1000.0, 0.0, 5.0),
+        ((today - timedelta(days=1)).isoformat(), "Principal", 1010.0, 0.0, 5.0),
+        (today.isoformat(), "Principal", 1020.0, 0.0, 5.0),
+    ], [], {})
+
+    assert service.export_all(DATASETS) == {"portfolio_snapshots": 2, "stock_bars": 5}
+    assert service.export_all(DATASETS) == {"portfolio_snapshots": 0, "stock_bars": 0}
+
+    # Barra antiga preenchida depois da exportação: sai na próxima, uma única vez
+    stock_repo.upsert_bars([_bar("MSFT", old)])
+    assert service.export_all(DATASETS) == {"portfolio_snapshots": 0, "stock_bars": 1}
+
+    assert len(_exported(service, "stock_bars")) == 6
+    assert len(_exported(service, "portfolio_snapshots")) == 2
+    watermarks = service.load_watermarks()
+    assert watermarks["portfolio_snapshots"] == {"day": (today - timedelta(days=1)).isoformat()}
+    assert watermarks["stock_bars"]["id"] == stock_repo.get_max_id()
+
+
+def test_failed_export_keeps_the_watermark(workdir, monkeypatch):
+    StockDataRepository().upsert_bars([_bar("AAPL", datetime.now() - timedelta(days=1))])
+    service = ExportService(str(workdir / "exports"))
+
+    def broken(frame):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr("src.services.export_service._PartitionedWriter.write", lambda self, frame: broken(frame))
+    assert service.export_all(["stock_bars"]) == {}
+    assert "stock_bars" not in service.load_watermarks()
+
+    monkeypatch.undo()
+    monkeypatch.chdir(workdir)
+    assert service.export_all(["stock_bars"]) == {"stock_bars": 1}
@@ -0,0 +1,86 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.entities.ledger_db import LedgerRepository, Trade
+from src.services.ledger_service import LedgerService
+
+
+def _trade(trade_type, quantity, price, day, symbol="AAPL", fees=0.0):
+    return Trade(symbol=symbol, trade_type=trade_type, quantity=quantity, price=price,
+                 trade_date=datetime(2024, 1, day), fees=fees)
+
+
+def test_fifo_sell_consumes_the_oldest_lots():
+    repo = LedgerRepository()
+    repo.record_trade(_trade("buy", 10, 100.0, 1))
+    repo.record_trade(_trade("buy", 10, 120.0, 2))
+    repo.record_trade(_trade("sell", 15, 130.0, 3))
+
+    position = repo.get_position("AAPL")
+    assert position.shares == pytest.approx(5)
+    assert position.cost_basis == pytest.approx(5 * 120.0)
+    assert position.realized_pnl == pytest.approx(15 * 130.0 - (10 * 100.0 + 5 * 120.0))
+
+
+def test_sell_larger_than_the_position_is_rejected():
+    repo = LedgerRepository()
+    repo.record_trade(_trade("buy", 5, 100.0, 1))
+    with pytest.raises(ValueError):
+        repo.record_trade(_trade("sell", 6, 100.0, 2))
+    assert repo.get_position("AAPL").shares == pytest.approx(5)
+
+
+def test_split_keeps_the_cost_basis():
+    repo = LedgerRepository()
+    repo.record_trade(_trade("buy", 10, 100.0, 1))
+    repo.record_trade(_trade("split", 2, 0.0, 2))
+    repo.record_trade(_trade("sell", 5, 60.0, 3))
+
+    position = repo.get_position("AAPL")
+    assert position.shares == pytest.approx(15)
+    assert position.average_cost == pytest.approx(50.0)
+    assert position.realized_pnl == pytest.approx(5 * (60.0 - 50.0))
+
+
+def test_retroactive_trade_rebuilds_the_position():
+    repo = LedgerRepository()
+    repo.record_trade(_trade("buy", 10, 100.0, 1))
+    repo.record_trade(_trade("split", 2, 0.0, 10))
+    # Compra anterior ao desdobramento: também precisa ser desdobrada
+    repo.record_trade(_trade("buy", 10, 80.0, 5))
+
+    position = repo.get_position("AAPL")
+    assert position.shares == pytest.approx(40)
+    assert position.cost_basis == pytest.approx(10 * 100.0 + 10 * 80.0)
+    assert position.last_trade_date == datetime(2024, 1, 10)
+
+    # O agregado incremental coincide com o reprocessamento do livro inteiro
+    repo.rebuild_all()
+    rebuilt = repo.get_position("AAPL")
+    assert (rebuilt.shares, rebuilt.cost_basis) == pytest.approx((position.shares, position.cost_basis))
+
+
+def test_concurrent_seeding_records_the_asset_once():
+    asset = {"symbol": "AAPL", "shares": 10, "purchase_price": 100.0, "purchase_date": "2024-01-02"}
+    services = [LedgerService(), LedgerService()]
+    barrier = threading.Barrier(len(services))
+    errors = []
+
+    def seed(service):
+        try:
+            barrier.wait()
+            service.seed_from_assets([asset])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=seed, args=(service,)) for service in services]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert services[0].ledger_repo.get_position("AAPL").shares == pytest.approx(10)
+    assert services[0].ledger_repo.get_summary()[0] == 1
@@ -0,0 +1,72 @@
+import threading
+
+from src.services.provider_gateway import ProviderGateway
+
+CALLERS = 8
+
+
+def _call_together(gateway, key, func, release):
+    """Faz CALLERS chamadas simultâneas de `func` pelo gateway. Retorna os resultados e as exceções.
+
+    `func` deve esperar por `release`, liberado só quando todas as chamadas estão em andamento.
+    """
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(gateway.call(key, func))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    while gateway.metrics()["coalesced"] < CALLERS - 1:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_with_the_same_key_run_once():
+    gateway = ProviderGateway("test", rate=100.0, burst=100)
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "quote"
+
+    results, errors = _call_together(gateway, "AAPL", fetch, release)
+    assert not errors
+    assert results == ["quote"] * CALLERS
+    assert len(calls) == 1
+    assert gateway.metrics()["requests"] == 1
+    assert gateway.metrics()["inflight"] == 0
+
+
+def test_failure_is_shared_and_not_cached():
+    gateway = ProviderGateway("test", rate=100.0, burst=100)
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("provedor fora do ar")
+
+    results, errors = _call_together(gateway, "AAPL", fail, release)
+    assert not results
+    assert len(errors) == CALLERS
+    assert gateway.metrics()["failures"] == 1
+
+    # A próxima chamada vai de novo ao provedor
+    assert gateway.call("AAPL", lambda: "quote") == "quote"
+    assert gateway.metrics()["requests"] == 2
+
+
+def test_different_keys_are_not_coalesced():
+    gateway = ProviderGateway("test", rate=100.0, burst=100)
+    assert gateway.call("AAPL", lambda: 1) == 1
+    assert gateway.call("MSFT", lambda: 2) == 2
+    assert gateway.metrics()["coalesced"] == 0
@@ -0,0 +1,42 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services.rolling_stats_service import RollingStats
+
+
+def test_state_round_trip_continues_like_the_original():
+    start = datetime(2024, 1, 2, 10, 0)
+    values = [5.0 + 0.1 * ((i * 7) % 11) for i in range(150)]
+
+    original = RollingStats(windows=(5, 20), ewma_spans=(10,))
+    for i, value in enumerate(values[:100]):
+        original.push(value, start + timedelta(minutes=i))
+
+    # O estado é gravado como JSON no banco
+    restored = RollingStats.from_state(json.loads(json.dumps(original.to_state())))
+    assert restored.snapshot() == original.snapshot()
+
+    for i, value in enumerate(values[100:], start=100):
+        when = start + timedelta(minutes=i)
+        assert restored.push(value, when) == pytest.approx(original.push(value, when))
+
+
+def test_windows_match_a_full_recomputation():
+    values = [3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0]
+    stats = RollingStats(windows=(3,), ewma_spans=())
+    for value in values:
+        snapshot = stats.push(value, datetime(2024, 1, 2))
+    assert snapshot["sma_3"] == pytest.approx(sum(values[-3:]) / 3)
+    assert snapshot["min_3"] == min(values[-3:])
+    assert snapshot["max_3"] == max(values[-3:])
+    assert snapshot["day_high"] == max(values)
+    assert snapshot["day_low"] == min(values)
+
+
+def test_unknown_state_version_is_rejected():
+    state = RollingStats().to_state()
+    state["version"] = 99
+    with pytest.raises(ValueError):
+        RollingStats.from_state(state)
@@ -0,0 +1,33 @@
+from src.services.ttl_cache import MISS, TTLCache
+
+
+def test_byte_limit_evicts_the_least_recently_used():
+    cache = TTLCache("test", maxsize=100, max_bytes=30, sizeof=len)
+    cache.set("a", "x" * 10)
+    cache.set("b", "x" * 10)
+    cache.set("c", "x" * 10)
+    assert cache.get("a") is not MISS  # "b" passa a ser a menos usada
+
+    cache.set("d", "x" * 10)
+    assert cache.get("b") is MISS
+    assert all(cache.get(key) is not MISS for key in ("a", "c", "d"))
+    assert cache.stats()["bytes"] == 30
+    assert cache.stats()["evictions"] == 1
+
+
+def test_value_larger_than_the_cache_is_not_stored():
+    cache = TTLCache("test", max_bytes=30, sizeof=len)
+    cache.set("a", "x" * 10)
+    cache.set("big", "x" * 31)
+    assert cache.get("big") is MISS
+    assert cache.get("a") == "x" * 10
+    assert cache.stats()["bytes"] == 10
+
+
+def test_replacing_and_invalidating_keep_the_byte_count():
+    cache = TTLCache("test", max_bytes=100, sizeof=len)
+    cache.set("a", "x" * 10)
+    cache.set("a", "x" * 20)
+    assert cache.stats()["bytes"] == 20
+    cache.invalidate("a")
+    assert cache.stats()["bytes"] == 0